@@ -0,0 +1,165 @@
+"""Batch contour fetch benchmark: one connection per request vs the shared HTTP client.
+
+Run with the Python interpreter shipped with QGIS, from the repository root:
+
+    python benchmarks/bench_contours.py [--communes 40] [--latency 0.05] [--handshake 0.02]
+
+A local stand-in of geo.api.gouv.fr serves square contours, gzip-compressed and with
+an ETag, and counts the TCP connections it accepts; handshake seconds are spent on
+each new connection, as a TLS handshake would. The same communes are fetched with
+urllib (one request at a time, a connection each, as commune_api used to), then with
+fetch_commune_geometries into an empty cache, then again once the cached contours
+have expired, which only revalidates them (HTTP 304).
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from core.cache import CommuneCache  # noqa: E402
+from core.commune_api import fetch_commune_geometries, set_api_base, set_cache  # noqa: E402
+from core.http_client import get_client  # noqa: E402
+
+
+def _contour(code: str) -> bytes:
+    n = int(code)
+    x, y = 2.0 + (n % 100) * 0.05, 45.0 + (n // 100 % 100) * 0.05
+    ring = [[x, y], [x + 0.04, y], [x + 0.04, y + 0.04], [x, y + 0.04], [x, y]]
+    return json.dumps({"code": code, "geometry": {"type": "Polygon", "coordinates": [ring]}}).encode()
+
+
+class ApiStandIn:
+    """Serve /communes/<code> contours on http://127.0.0.1:<port> from a background thread.
+
+    Counts accepted connections, requests and 304 answers. Keeps connections alive.
+    """
+
+    def __init__(self, latency: float = 0.0, handshake: float = 0.0):
+        self.latency = latency
+        self.handshake = handshake
+        self.connections = 0
+        self.requests = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                standin._count("connections")
+                time.sleep(standin.handshake)
+
+            def do_GET(self):
+                standin._count("requests")
+                time.sleep(standin.latency)
+                code = urllib.parse.urlparse(self.path).path.rsplit("/", 1)[-1]
+                if not code.isdigit():
+                    self.send_error(404)
+                    return
+                body = _contour(code)
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    standin._count("not_modified")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def reset(self):
+        with self._lock:
+            self.connections = self.requests = self.not_modified = 0
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="api-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+def fetch_urllib(base: str, codes: list[str]):
+    for code in codes:
+        with urllib.request.urlopen(f"{base}/communes/{code}?geometry=contour&format=geojson", timeout=10) as r:
+            json.loads(r.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--communes", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--handshake", type=float, default=0.02)
+    args = parser.parse_args()
+
+    codes = [f"{21000 + n}" for n in range(args.communes)]
+    with ApiStandIn(args.latency, args.handshake) as standin, tempfile.TemporaryDirectory() as tmp:
+        cache = CommuneCache(os.path.join(tmp, "cache.sqlite"))
+        set_cache(cache)
+        set_api_base(standin.url)
+        client = get_client()
+        try:
+            runs = [("urllib", lambda: fetch_urllib(standin.url, codes))]
+            runs.append(("client", lambda: fetch_commune_geometries(codes)))
+            runs.append(("revalidate", lambda: fetch_commune_geometries(codes)))
+            print(f"{'run':<12} {'time (s)':>9} {'connections':>12} {'requests':>9} {'304':>5} {'errors':>7}")
+            for name, run in runs:
+                if name == "revalidate":
+                    # Expire every cached contour: the next fetch sends conditional requests
+                    cache.ttl = -1
+                standin.reset()
+                start = time.perf_counter()
+                result = run()
+                elapsed = time.perf_counter() - start
+                errors = len(result[1]) if result else 0
+                print(
+                    f"{name:<12} {elapsed:>9.3f} {standin.connections:>12} {standin.requests:>9} "
+                    f"{standin.not_modified:>5} {errors:>7}"
+                )
+        finally:
+            client.close()
+            set_api_base(None)
+            set_cache(None)
+
+
+if __name__ == "__main__":
+    main()
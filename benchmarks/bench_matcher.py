@@ -0,0 +1,83 @@
+"""Compare the plain QgsGeometry.intersects test with CommuneMatcher.
+
+Run with the Python interpreter shipped with QGIS, from the repository root:
+
+    python benchmarks/bench_matcher.py [--vertices 5000] [--grid 200]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from qgis.core import QgsApplication, QgsGeometry, QgsPointXY, QgsRectangle  # noqa: E402
+
+from core.geometry import CommuneMatcher  # noqa: E402
+
+
+def synthetic_commune(vertices: int, seed: int = 1) -> QgsGeometry:
+    """A jagged, concave ring of the given number of vertices around (0, 0), radius ~1000."""
+    rng = random.Random(seed)
+    points = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        radius = 1000 * (1 + 0.25 * math.sin(7 * angle)) + rng.uniform(-20, 20)
+        points.append(QgsPointXY(radius * math.cos(angle), radius * math.sin(angle)))
+    return QgsGeometry.fromPolygonXY([points])
+
+
+def parcel_grid(bbox: QgsRectangle, cells: int) -> list[QgsGeometry]:
+    """Square "parcels" tiling the bbox, like a dense cadastre layer."""
+    step_x = bbox.width() / cells
+    step_y = bbox.height() / cells
+    parcels = []
+    for i in range(cells):
+        for j in range(cells):
+            x = bbox.xMinimum() + i * step_x
+            y = bbox.yMinimum() + j * step_y
+            parcels.append(QgsGeometry.fromRect(QgsRectangle(x, y, x + step_x * 0.9, y + step_y * 0.9)))
+    return parcels
+
+
+def bench(label: str, test, parcels: list[QgsGeometry]) -> tuple[float, int]:
+    start = time.perf_counter()
+    kept = sum(1 for p in parcels if test(p))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {elapsed * 1000:9.1f} ms  {kept} kept")
+    return elapsed, kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vertices", type=int, default=5000)
+    parser.add_argument("--grid", type=int, default=200)
+    args = parser.parse_args()
+
+    app = QgsApplication([], False)
+    app.initQgis()
+
+    commune = synthetic_commune(args.vertices)
+    bbox = commune.boundingBox()
+    bbox.grow(bbox.width() * 0.1)
+    parcels = parcel_grid(bbox, args.grid)
+    print(f"{args.vertices} vertices, {len(parcels)} candidates")
+
+    plain_time, plain_kept = bench("plain", commune.intersects, parcels)
+    start = time.perf_counter()
+    matcher = CommuneMatcher(commune)
+    setup = time.perf_counter() - start
+    matcher_time, matcher_kept = bench("matcher", matcher.intersects, parcels)
+    print(f"matcher setup    {setup * 1000:9.1f} ms")
+    print(f"speedup          {plain_time / (matcher_time + setup):9.1f}x")
+
+    app.exitQgis()
+    if plain_kept != matcher_kept:
+        sys.exit(f"Mismatch: plain kept {plain_kept}, matcher kept {matcher_kept}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""End-to-end benchmark: intersect_commune, CSV and PDF export against a local WFS stand-in.
+
+Run with the Python interpreter shipped with QGIS, from the repository root:
+
+    python benchmarks/bench_pipeline.py --output bench.json [--vertices 200,2000,20000]
+        [--layers 4] [--features 2500] [--latency 0.05] [--page-size 0] [--copies 1] [--repeat 3]
+        [--pdf [--pdf-vector] [--pdf-simplify 1]]
+    python benchmarks/bench_pipeline.py --output new.json --compare bench.json
+
+Synthetic communes of each complexity are intersected with synthetic square-parcel
+layers served by wfs_standin. Every repetition uses fresh layers, an empty commune
+variant cache and capabilities cache, and a coverage index in a temporary directory
+(never the one of the QGIS profile), so nothing is served from a previous run. With --copies, each layer
+is added that many times, the copies filtered by a subset string, as in projects
+styling the same WFS source several ways. PDF cases also record the file size and
+the vertices drawn (see core.export.PdfStats). Medians are written to the JSON file with
+the git commit, for comparison across commits.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from bench_matcher import synthetic_commune  # noqa: E402
+from qgis.core import (  # noqa: E402
+    Qgis,
+    QgsApplication,
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsGeometry,
+    QgsProject,
+    QgsVectorLayer,
+)
+from wfs_standin import StandInLayer, WfsStandIn  # noqa: E402
+
+from core.coverage import CoverageIndex  # noqa: E402
+from core.export import SIMPLIFY_PIXELS, export_results_to_csv, export_results_to_pdf  # noqa: E402
+from core.geometry import get_variant_cache  # noqa: E402
+from core.intersector import intersect_commune  # noqa: E402
+from core.memstats import PeakMemory  # noqa: E402
+from core.tile_cache import TileCache  # noqa: E402
+from core.wfs_capabilities import clear_capabilities  # noqa: E402
+
+# Dijon, in Lambert-93
+CENTER = (855000.0, 6690000.0)
+COMMUNE_RADIUS = 3.0  # synthetic_commune has a radius of ~1000 units: ~3 km communes
+
+
+def commune_geometries(vertices: int) -> tuple[QgsGeometry, QgsGeometry]:
+    """A synthetic commune in EPSG:2154 and in the plugin's commune CRS (EPSG:4326)."""
+    local = synthetic_commune(vertices)
+    ring = [(p.x() * COMMUNE_RADIUS + CENTER[0], p.y() * COMMUNE_RADIUS + CENTER[1]) for p in local.vertices()]
+    local = QgsGeometry.fromWkt("POLYGON((" + ", ".join(f"{x} {y}" for x, y in ring) + "))")
+    wgs84 = QgsGeometry(local)
+    wgs84.transform(
+        QgsCoordinateTransform(
+            QgsCoordinateReferenceSystem("EPSG:2154"), QgsCoordinateReferenceSystem("EPSG:4326"), QgsProject.instance()
+        )
+    )
+    return local, wgs84
+
+
+def parcel_layers(count: int, features: int, commune_2154: QgsGeometry, commune_wgs84: QgsGeometry):
+    """Layers of square parcels tiling the commune bbox grown by 20%, each shifted a little."""
+    bbox = commune_2154.boundingBox()
+    bbox.grow(max(bbox.width(), bbox.height()) * 0.2)
+    wgs84 = commune_wgs84.boundingBox()
+    wgs84.grow(max(wgs84.width(), wgs84.height()) * 0.3)
+    cells = max(1, math.ceil(math.sqrt(features)))
+    step_x, step_y = bbox.width() / cells, bbox.height() / cells
+    layers = []
+    for n in range(count):
+        shift = n * 0.1
+        rings = []
+        for i in range(cells):
+            for j in range(cells):
+                x = bbox.xMinimum() + (i + shift) * step_x
+                y = bbox.yMinimum() + (j + shift) * step_y
+                w, h = step_x * 0.8, step_y * 0.8
+                rings.append((len(rings) + 1, [(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y)]))
+        layers.append(
+            StandInLayer(
+                f"layer_{n}",
+                rings,
+                (wgs84.xMinimum(), wgs84.yMinimum(), wgs84.xMaximum(), wgs84.yMaximum()),
+            )
+        )
+    return layers
+
+
+def wfs_layers(standin: WfsStandIn, copies: int = 1) -> list[QgsVectorLayer]:
+    layers = []
+    for name in standin.layers:
+        uri = f"url='{standin.url}' typename='bench:{name}' version='2.0.0' srsname='EPSG:2154'"
+        for copy in range(copies):
+            layer = QgsVectorLayer(uri, f"{name} ({copy + 1})" if copies > 1 else name, "WFS")
+            if not layer.isValid():
+                sys.exit(f"Invalid WFS layer {name} ({uri})")
+            if copy:
+                layer.setSubsetString(f'"id" > {copy}')
+            layers.append(layer)
+    return layers
+
+
+def run_case(standin: WfsStandIn, commune: QgsGeometry, repeat: int, pdf: dict | None, copies: int = 1) -> dict:
+    """Medians of repeat runs; pdf holds export_results_to_pdf options, None to skip the PDF."""
+    samples = {"intersect_seconds": [], "csv_seconds": [], "pdf_seconds": [], "peak_memory_mb": []}
+    pdf_stats = []
+    kept = 0
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            get_variant_cache().clear()
+            clear_capabilities()
+            coverage = CoverageIndex(os.path.join(tmp, "coverage.sqlite"))
+            layers = wfs_layers(standin, copies)
+            with PeakMemory() as memory:
+                start = time.perf_counter()
+                results = intersect_commune(commune, layers, coverage=coverage)
+                samples["intersect_seconds"].append(time.perf_counter() - start)
+            if memory.peak_delta is not None:
+                samples["peak_memory_mb"].append(memory.peak_delta / 1024 / 1024)
+            kept = sum(r.featureCount() for r in results)
+
+            start = time.perf_counter()
+            export_results_to_csv(results, tmp)
+            samples["csv_seconds"].append(time.perf_counter() - start)
+            if pdf is not None and results:
+                tiles = TileCache(os.path.join(tmp, "tiles.mbtiles"), offline=True)
+                start = time.perf_counter()
+                stats = export_results_to_pdf(
+                    results, "Commune", commune, os.path.join(tmp, "rapport.pdf"), tile_cache=tiles, **pdf
+                )
+                samples["pdf_seconds"].append(time.perf_counter() - start)
+                pdf_stats.append(stats)
+
+    case = {name: round(statistics.median(values), 4) for name, values in samples.items() if values}
+    case["features_kept"] = kept
+    if pdf_stats:
+        case["pdf_render_seconds"] = round(statistics.median(s.render_seconds for s in pdf_stats), 4)
+        case["pdf_export_seconds"] = round(statistics.median(s.export_seconds for s in pdf_stats), 4)
+        case["pdf_bytes"] = pdf_stats[-1].file_bytes
+        case["pdf_vertices"] = pdf_stats[-1].vertices
+        case["pdf_simplified_vertices"] = pdf_stats[-1].simplified_vertices
+    case["features_per_second"] = round(
+        sum(len(layer.features) for layer in standin.layers.values()) / case["intersect_seconds"], 1
+    )
+    return case
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current: dict, previous_path: str):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    before = {case["vertices"]: case for case in previous["cases"]}
+    print(f"\nvs {previous_path} ({previous.get('commit') or '?'}):")
+    for case in current["cases"]:
+        old = before.get(case["vertices"])
+        if old is None:
+            continue
+        for metric in ("intersect_seconds", "csv_seconds", "pdf_seconds", "pdf_bytes"):
+            if metric in case and metric in old and old[metric]:
+                ratio = case[metric] / old[metric]
+                change = f"{old[metric]:8.3f} -> {case[metric]:8.3f}  x{ratio:.2f}"
+                print(f"  {case['vertices']:>6} vertices  {metric:<18} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", required=True, help="Fichier JSON de résultats")
+    parser.add_argument("--vertices", default="200,2000,20000", help="Complexités de commune (sommets)")
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--features", type=int, default=2500, help="Entités par couche")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence par requête WFS (s)")
+    parser.add_argument("--page-size", type=int, default=0, help="Pagination WFS (0 : aucune)")
+    parser.add_argument("--copies", type=int, default=1, help="Couches du projet par source WFS")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pdf", action="store_true", help="Mesurer aussi l'export PDF")
+    parser.add_argument("--pdf-vector", action="store_true", help="PDF avec résultats vectoriels")
+    parser.add_argument("--pdf-simplify", type=float, default=SIMPLIFY_PIXELS, help="Simplification PDF (pixels)")
+    parser.add_argument("--compare", help="Résultats précédents à comparer")
+    args = parser.parse_args()
+
+    app = QgsApplication([], False)
+    app.initQgis()
+
+    report = {
+        "commit": _git_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "qgis": Qgis.version(),
+        "python": platform.python_version(),
+        "params": {
+            "layers": args.layers,
+            "features": args.features,
+            "latency": args.latency,
+            "page_size": args.page_size,
+            "copies": args.copies,
+            "pdf_vector": args.pdf_vector,
+            "pdf_simplify": args.pdf_simplify,
+            "repeat": args.repeat,
+        },
+        "cases": [],
+    }
+    pdf = {"raster_layers": not args.pdf_vector, "simplify_pixels": args.pdf_simplify} if args.pdf else None
+    for vertices in (int(v) for v in args.vertices.split(",")):
+        commune_2154, commune_wgs84 = commune_geometries(vertices)
+        layers = parcel_layers(args.layers, args.features, commune_2154, commune_wgs84)
+        with WfsStandIn(layers, latency=args.latency, page_size=args.page_size) as standin:
+            case = {"vertices": vertices, **run_case(standin, commune_wgs84, args.repeat, pdf, args.copies)}
+            case["wfs_requests"] = dict(standin.requests)
+        report["cases"].append(case)
+        print(json.dumps(case, ensure_ascii=False))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        compare(report, args.compare)
+
+    app.exitQgis()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare peak memory of memory-layer results and GeoPackage (ResultStore) results.
+
+Run with the Python interpreter shipped with QGIS, from the repository root, once per
+mode (peak memory is per process):
+
+    python benchmarks/bench_result_modes.py --mode memory [--features 2000] [--vertices 2000]
+    python benchmarks/bench_result_modes.py --mode gpkg
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from bench_matcher import synthetic_commune  # noqa: E402
+from qgis.core import (  # noqa: E402
+    QgsApplication,
+    QgsFeature,
+    QgsGeometry,
+    QgsPointXY,
+    QgsVectorLayer,
+)
+
+from core.intersector import intersect_commune  # noqa: E402
+from core.memstats import PeakMemory, current_rss  # noqa: E402
+from core.result_store import RESULT_GPKG, RESULT_MEMORY, ResultStore  # noqa: E402
+
+
+def big_polygons(count: int, vertices: int) -> QgsVectorLayer:
+    """A memory layer of detailed polygons scattered over the synthetic commune."""
+    layer = QgsVectorLayer("Polygon?crs=EPSG:4326&field=id:integer", "polygones", "memory")
+    features = []
+    side = math.ceil(math.sqrt(count))
+    for i in range(count):
+        cx = -1000 + 2000 * (i % side) / side
+        cy = -1000 + 2000 * (i // side) / side
+        ring = [
+            QgsPointXY(cx + 40 * math.cos(2 * math.pi * k / vertices), cy + 40 * math.sin(2 * math.pi * k / vertices))
+            for k in range(vertices)
+        ]
+        feat = QgsFeature(layer.fields())
+        feat.setGeometry(QgsGeometry.fromPolygonXY([ring]))
+        feat.setAttributes([i])
+        features.append(feat)
+    layer.dataProvider().addFeatures(features)
+    layer.updateExtents()
+    return layer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=[RESULT_MEMORY, RESULT_GPKG], default=RESULT_MEMORY)
+    parser.add_argument("--features", type=int, default=2000)
+    parser.add_argument("--vertices", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = QgsApplication([], False)
+    app.initQgis()
+
+    layer = big_polygons(args.features, args.vertices)
+    commune = synthetic_commune(5000)
+    store = ResultStore() if args.mode == RESULT_GPKG else None
+
+    start = time.perf_counter()
+    with PeakMemory() as memory:
+        results = intersect_commune(commune, [layer], result_store=store)
+        kept = sum(r.featureCount() for r in results)
+    elapsed = time.perf_counter() - start
+
+    mib = 1024 * 1024
+    print(f"mode             {args.mode}")
+    print(f"kept             {kept} / {args.features}")
+    print(f"time             {elapsed * 1000:9.1f} ms")
+    if memory.peak_delta is None:
+        print("peak memory      unavailable on this platform")
+    else:
+        print(f"source layer RSS {memory.baseline / mib:9.1f} MiB")
+        print(f"peak growth      {memory.peak_delta / mib:9.1f} MiB")
+        print(f"after run        {(current_rss() - memory.baseline) / mib:9.1f} MiB")
+
+    del results
+    app.exitQgis()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Minimal WFS 2.0 server for benchmarks: serves in-memory polygon layers as GML 3.2.
+
+Supports GetCapabilities, DescribeFeatureType and GetFeature with BBOX, STARTINDEX,
+COUNT and RESULTTYPE=hits; other filters are ignored (the plugin's local test still
+runs). Every request waits latency seconds first. Layers are in EPSG:2154 and are
+plain Python data, so this module does not need QGIS.
+"""
+
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NS = "http://secateur.bench"
+CRS_URN = "urn:ogc:def:crs:EPSG::2154"
+
+
+@dataclass
+class StandInLayer:
+    """A polygon layer: features are (fid, exterior ring [(x, y), ...]) in EPSG:2154."""
+
+    name: str
+    features: list[tuple[int, list[tuple[float, float]]]]
+    wgs84_bbox: tuple[float, float, float, float]
+    bboxes: list[tuple[float, float, float, float]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.bboxes = [
+            (min(x for x, _ in ring), min(y for _, y in ring), max(x for x, _ in ring), max(y for _, y in ring))
+            for _fid, ring in self.features
+        ]
+
+
+def _capabilities(url: str, layers: dict[str, StandInLayer], page_size: int, update_sequence: str) -> str:
+    def operation(name, extra=""):
+        return (
+            f'<ows:Operation name="{name}"><ows:DCP><ows:HTTP><ows:Get xlink:href="{url}"/>'
+            f"</ows:HTTP></ows:DCP>{extra}</ows:Operation>"
+        )
+
+    output_format = (
+        '<ows:Parameter name="outputFormat"><ows:AllowedValues>'
+        "<ows:Value>application/gml+xml; version=3.2</ows:Value></ows:AllowedValues></ows:Parameter>"
+    )
+    paging = ""
+    if page_size:
+        paging = (
+            '<ows:Constraint name="ImplementsResultPaging"><ows:NoValues/>'
+            "<ows:DefaultValue>TRUE</ows:DefaultValue></ows:Constraint>"
+            f'<ows:Constraint name="CountDefault"><ows:NoValues/><ows:DefaultValue>{page_size}'
+            "</ows:DefaultValue></ows:Constraint>"
+        )
+    feature_types = "".join(
+        f"<wfs:FeatureType><wfs:Name>bench:{layer.name}</wfs:Name><wfs:Title>{layer.name}</wfs:Title>"
+        f"<wfs:DefaultCRS>{CRS_URN}</wfs:DefaultCRS><ows:WGS84BoundingBox>"
+        f"<ows:LowerCorner>{layer.wgs84_bbox[0]} {layer.wgs84_bbox[1]}</ows:LowerCorner>"
+        f"<ows:UpperCorner>{layer.wgs84_bbox[2]} {layer.wgs84_bbox[3]}</ows:UpperCorner>"
+        "</ows:WGS84BoundingBox></wfs:FeatureType>"
+        for layer in layers.values()
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<wfs:WFS_Capabilities version="2.0.0" updateSequence="{update_sequence}" '
+        'xmlns:wfs="http://www.opengis.net/wfs/2.0" xmlns:ows="http://www.opengis.net/ows/1.1" '
+        'xmlns:fes="http://www.opengis.net/fes/2.0" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'xmlns:bench="{NS}">'
+        "<ows:ServiceIdentification><ows:Title>Secateur benchmark</ows:Title>"
+        "<ows:ServiceType>WFS</ows:ServiceType><ows:ServiceTypeVersion>2.0.0</ows:ServiceTypeVersion>"
+        "</ows:ServiceIdentification>"
+        "<ows:OperationsMetadata>"
+        + operation("GetCapabilities")
+        + operation("DescribeFeatureType")
+        + operation("GetFeature", output_format)
+        + paging
+        + "</ows:OperationsMetadata>"
+        f"<wfs:FeatureTypeList>{feature_types}</wfs:FeatureTypeList>"
+        "<fes:Filter_Capabilities><fes:Spatial_Capabilities><fes:GeometryOperands>"
+        '<fes:GeometryOperand name="gml:Envelope"/><fes:GeometryOperand name="gml:Polygon"/>'
+        '</fes:GeometryOperands><fes:SpatialOperators><fes:SpatialOperator name="BBOX"/>'
+        '<fes:SpatialOperator name="Intersects"/></fes:SpatialOperators></fes:Spatial_Capabilities>'
+        "</fes:Filter_Capabilities>"
+        "</wfs:WFS_Capabilities>"
+    )
+
+
+def _schema(layer: StandInLayer) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:gml="http://www.opengis.net/gml/3.2" '
+        f'xmlns:bench="{NS}" targetNamespace="{NS}" elementFormDefault="qualified">'
+        '<xsd:import namespace="http://www.opengis.net/gml/3.2" '
+        'schemaLocation="http://schemas.opengis.net/gml/3.2.1/gml.xsd"/>'
+        f'<xsd:complexType name="{layer.name}Type"><xsd:complexContent>'
+        '<xsd:extension base="gml:AbstractFeatureType"><xsd:sequence>'
+        '<xsd:element name="id" type="xsd:int"/>'
+        '<xsd:element name="nom" type="xsd:string"/>'
+        '<xsd:element name="geom" type="gml:SurfacePropertyType"/>'
+        "</xsd:sequence></xsd:extension></xsd:complexContent></xsd:complexType>"
+        f'<xsd:element name="{layer.name}" type="bench:{layer.name}Type" substitutionGroup="gml:AbstractFeature"/>'
+        "</xsd:schema>"
+    )
+
+
+def _member(layer: StandInLayer, fid: int, ring: list[tuple[float, float]]) -> str:
+    pos_list = " ".join(f"{x:.2f} {y:.2f}" for x, y in ring)
+    return (
+        f'<wfs:member><bench:{layer.name} gml:id="{layer.name}.{fid}">'
+        f"<bench:id>{fid}</bench:id><bench:nom>Entité {fid}</bench:nom>"
+        f'<bench:geom><gml:Polygon gml:id="{layer.name}.{fid}.g" srsName="{CRS_URN}">'
+        f"<gml:exterior><gml:LinearRing><gml:posList>{pos_list}</gml:posList></gml:LinearRing></gml:exterior>"
+        f"</gml:Polygon></bench:geom></bench:{layer.name}></wfs:member>"
+    )
+
+
+def _get_feature(layer: StandInLayer, params: dict[str, str]) -> str:
+    selected = range(len(layer.features))
+    bbox = params.get("bbox")
+    if bbox:
+        xmin, ymin, xmax, ymax = (float(v) for v in bbox.split(",")[:4])
+        selected = [
+            i
+            for i in selected
+            if not (
+                layer.bboxes[i][0] > xmax
+                or layer.bboxes[i][2] < xmin
+                or layer.bboxes[i][1] > ymax
+                or layer.bboxes[i][3] < ymin
+            )
+        ]
+    matched = len(selected)
+    header = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0" '
+        f'xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:bench="{NS}" '
+        f'timeStamp="{time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}" numberMatched="{matched}" '
+    )
+    if params.get("resulttype", "").lower() == "hits":
+        return header + 'numberReturned="0"/>'
+    start = int(params.get("startindex", 0) or 0)
+    count = int(params.get("count", 0) or 0)
+    page = list(selected)[start : start + count if count else None]
+    members = "".join(_member(layer, *layer.features[i]) for i in page)
+    return header + f'numberReturned="{len(page)}">{members}</wfs:FeatureCollection>'
+
+
+class WfsStandIn:
+    """Serve layers on http://127.0.0.1:<port>/wfs from a background thread.
+
+    Use as a context manager; url is set once started. Request counts per request
+    type are kept in requests.
+    """
+
+    def __init__(self, layers: list[StandInLayer], latency: float = 0.0, page_size: int = 0, port: int = 0):
+        self.layers = {layer.name: layer for layer in layers}
+        self.latency = latency
+        self.page_size = page_size
+        self.update_sequence = "1"
+        self.requests: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/wfs"
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = urllib.parse.urlparse(self.path).query
+                params = {k.lower(): v for k, v in urllib.parse.parse_qsl(query)}
+                request = params.get("request", "").lower()
+                with standin._lock:
+                    standin.requests[request] = standin.requests.get(request, 0) + 1
+                if standin.latency:
+                    time.sleep(standin.latency)
+                typename = (params.get("typenames") or params.get("typename") or "").split(":")[-1]
+                layer = standin.layers.get(typename)
+                if request == "getcapabilities":
+                    body = _capabilities(standin.url, standin.layers, standin.page_size, standin.update_sequence)
+                elif request == "describefeaturetype" and layer is not None:
+                    body = _schema(layer)
+                elif request == "getfeature" and layer is not None:
+                    body = _get_feature(layer, params)
+                else:
+                    self.send_error(400, "Unsupported request")
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="wfs-standin", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
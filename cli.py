@@ -0,0 +1,221 @@
+"""Headless command line: intersect communes against the WFS layers of a QGIS project.
+
+Run with the Python interpreter shipped with QGIS, without starting the QGIS GUI:
+
+    python cli.py projet.qgz 21231 21054 --output resultats/ [--pdf] [--workers 4] [--server-filter]
+    python cli.py projet.qgz 242100410 --output resultats/   # every commune of an EPCI
+    python cli.py projet.qgz 21 --output resultats/ --stream gpkg   # no memory layers
+    python cli.py projet.qgz 21231 --output resultats/ --pdf --offline   # cached basemap tiles only
+    python cli.py projet.qgz 21231 --output resultats/ --results gpkg   # results written to resultats.gpkg
+    python cli.py projet.qgz 21231 --output resultats/ --pdf --pdf-vector --pdf-simplify 0   # exact vector PDF
+
+Communes are processed in parallel by a pool of worker processes, each with its own
+QgsApplication and copy of the project. Per-stage timings, the peak memory growth of
+the intersection, per-layer profiles (see core.profiling) and PDF report costs
+(core.export.PdfStats) are printed as JSON.
+"""
+
+import argparse
+import dataclasses
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# No display needed, not even for PDF rendering
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_app = None
+
+
+def _init_worker(project_path: str, offline: bool = False):
+    """Start QGIS (no GUI) and load the project once per worker process."""
+    global _app
+    from qgis.core import QgsApplication, QgsProject
+
+    _app = QgsApplication([], False)
+    _app.initQgis()
+    if not QgsProject.instance().read(project_path):
+        raise RuntimeError(f"Impossible de lire le projet {project_path}")
+
+    from core.tile_cache import get_tile_cache
+
+    get_tile_cache().offline = offline
+
+
+def _resolve(spec: str) -> list[dict]:
+    from core.commune_api import resolve_communes
+
+    return resolve_communes(spec)
+
+
+def _run_commune(
+    commune: dict,
+    output_dir: str,
+    pdf: bool,
+    server_filter: bool,
+    stream: str | None,
+    results_mode: str,
+    clip: bool,
+    pdf_vector: bool = False,
+    pdf_simplify: float | None = None,
+) -> dict:
+    from core.commune_api import fetch_commune_geometry
+    from core.export import _safe_filename, export_results_to_csv, export_results_to_pdf, export_stream
+    from core.http_client import HttpError
+    from core.intersector import FILTER_BBOX, FILTER_SERVER, find_wfs_layers, intersect_commune
+    from core.memstats import PeakMemory
+    from core.profiling import profile_row
+    from core.result_store import RESULT_GPKG, ResultStore
+
+    filter_mode = FILTER_SERVER if server_filter else FILTER_BBOX
+    timings = {}
+
+    def timed(stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[stage] = round(time.perf_counter() - start, 3)
+        return result
+
+    code, nom = commune["code"], commune["nom"]
+    try:
+        geom = timed("geometry", fetch_commune_geometry, code)
+    except HttpError as e:
+        return {"code": code, "nom": nom, "error": e.message, "url": e.url, "timings": timings}
+    if geom is None or geom.isEmpty():
+        return {"code": code, "nom": nom, "error": "géométrie introuvable", "timings": timings}
+
+    layers = timed("find_layers", find_wfs_layers)
+    folder = os.path.join(output_dir, _safe_filename(f"{code} {nom}"))
+
+    if stream:
+        written = timed("stream", export_stream, geom, layers, folder, stream, filter_mode=filter_mode, clip=clip)
+        return {"code": code, "nom": nom, "layers": len(layers), "files": len(written), "timings": timings}
+
+    store = None
+    if results_mode == RESULT_GPKG:
+        os.makedirs(folder, exist_ok=True)
+        store_path = os.path.join(folder, "resultats.gpkg")
+        if os.path.exists(store_path):
+            os.remove(store_path)
+        store = ResultStore(store_path)
+    profile = []
+    with PeakMemory() as memory:
+        results = timed(
+            "intersect",
+            intersect_commune,
+            geom,
+            layers,
+            filter_mode=filter_mode,
+            result_store=store,
+            clip=clip,
+            stats_callback=lambda name, stats: profile.append(profile_row(name, stats)),
+        )
+    timed("csv", export_results_to_csv, results, folder)
+    pdf_stats = None
+    if pdf and results:
+        options = {"raster_layers": not pdf_vector}
+        if pdf_simplify is not None:
+            options["simplify_pixels"] = pdf_simplify
+        pdf_stats = timed(
+            "pdf", export_results_to_pdf, results, nom, geom, os.path.join(folder, "rapport.pdf"), **options
+        )
+
+    return {
+        "code": code,
+        "nom": nom,
+        "layers": len(layers),
+        "result_layers": len(results),
+        "features": sum(r.featureCount() for r in results),
+        "results": results_mode,
+        "peak_memory_mb": None if memory.peak_delta is None else round(memory.peak_delta / 1024 / 1024, 1),
+        "timings": timings,
+        "profile": profile,
+        "pdf": None if pdf_stats is None else {k: round(v, 3) for k, v in dataclasses.asdict(pdf_stats).items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ecosphères Secateur en ligne de commande")
+    parser.add_argument("project", help="Fichier projet QGIS (.qgs/.qgz)")
+    parser.add_argument("communes", nargs="+", help="Codes INSEE, ou un code EPCI/département")
+    parser.add_argument("--output", required=True, help="Dossier de sortie")
+    parser.add_argument("--pdf", action="store_true", help="Générer aussi un rapport PDF par commune")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Nombre de processus")
+    parser.add_argument("--server-filter", action="store_true", help="Filtre spatial côté serveur (WFS)")
+    parser.add_argument(
+        "--stream",
+        choices=["csv", "gpkg", "parquet"],
+        help="Écrire les résultats au fil de l'intersection, sans couches mémoire (incompatible avec --pdf)",
+    )
+    parser.add_argument(
+        "--clip", action="store_true", help="Découper les entités à la commune (surfaces, longueurs, parts)"
+    )
+    parser.add_argument(
+        "--results",
+        choices=["memory", "gpkg"],
+        default="memory",
+        help="Résultats en couches mémoire ou écrits dans un GeoPackage par commune (sans copie en mémoire)",
+    )
+    parser.add_argument(
+        "--offline", action="store_true", help="Fond de carte PDF à partir des tuiles en cache uniquement"
+    )
+    parser.add_argument(
+        "--pdf-vector", action="store_true", help="Résultats dessinés en vecteurs dans le PDF (au lieu d'images)"
+    )
+    parser.add_argument(
+        "--pdf-simplify",
+        type=float,
+        help="Simplification des géométries du PDF, en pixels de sortie (0 : pleine résolution ; défaut 1)",
+    )
+    args = parser.parse_args(argv)
+    if args.stream and args.pdf:
+        parser.error("--stream et --pdf sont incompatibles")
+
+    project = os.path.abspath(args.project)
+    os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    # spawn: each worker starts a clean interpreter, QGIS is never imported in this process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=max(1, args.workers),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(project, args.offline),
+    ) as pool:
+        communes = pool.submit(_resolve, " ".join(args.communes)).result()
+        futures = [
+            pool.submit(
+                _run_commune,
+                c,
+                args.output,
+                args.pdf,
+                args.server_filter,
+                args.stream,
+                args.results,
+                args.clip,
+                args.pdf_vector,
+                args.pdf_simplify,
+            )
+            for c in communes
+        ]
+        reports = [f.result() for f in as_completed(futures)]
+
+    reports.sort(key=lambda r: r["code"])
+    summary = {
+        "project": project,
+        "workers": args.workers,
+        "communes": reports,
+        "total_seconds": round(time.perf_counter() - start, 3),
+    }
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+    return 1 if any("error" in r for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
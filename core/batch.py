@@ -0,0 +1,98 @@
+import os
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsFeature,
+    QgsFeedback,
+    QgsGeometry,
+    QgsSpatialIndex,
+)
+
+from .export import _safe_filename, export_results_to_csv
+from .geometry import CommuneMatcher, get_variant_cache
+from .intersector import (
+    DEFAULT_MAX_PER_HOST,
+    LayerJob,
+    build_result_layer,
+    run_layer_jobs,
+)
+
+
+class CommuneAssigner:
+    """Dispatch features to the communes they intersect, in one layer CRS.
+
+    Commune bounding boxes go into a QgsSpatialIndex (R-tree); each feature is only
+    tested exactly against the few communes whose bbox it touches.
+    """
+
+    def __init__(
+        self,
+        geoms: dict[str, QgsGeometry],
+        crs: QgsCoordinateReferenceSystem,
+        transform: QgsCoordinateTransform | None,
+    ):
+        self._codes = list(geoms)
+        self._matchers = []
+        self._index = QgsSpatialIndex()
+        variants = get_variant_cache()
+        for i, code in enumerate(self._codes):
+            geom = variants.get(geoms[code], crs, transform).geom
+            self._matchers.append(CommuneMatcher(geom))
+            self._index.addFeature(i, geom.boundingBox())
+
+    def assign(self, feat: QgsFeature) -> list[str]:
+        geom = feat.geometry()
+        return [
+            self._codes[i] for i in self._index.intersects(geom.boundingBox()) if self._matchers[i].intersects(geom)
+        ]
+
+
+def intersect_communes_batch(
+    commune_geoms: dict[str, QgsGeometry],
+    jobs: list[LayerJob],
+    progress_callback=None,
+    max_per_host: int = DEFAULT_MAX_PER_HOST,
+    feedback: QgsFeedback | None = None,
+) -> dict[str, list[tuple[LayerJob, list[QgsFeature]]]]:
+    """Intersect many communes against each layer, fetching every layer only once.
+
+    jobs come from prepare_layer_jobs (main thread); the rest can run in any thread.
+    Each layer is queried over the union of the communes, then its features are
+    dispatched to communes with a CommuneAssigner. Returns {code: [(job, features)]},
+    keeping only non-empty results, in layer order.
+    progress_callback(done, total, name) is called each time a layer finishes.
+    """
+    union = QgsGeometry.unaryUnion(list(commune_geoms.values()))
+    # One assigner per layer CRS: communes are reprojected once, not once per layer
+    assigners: dict[str, CommuneAssigner] = {}
+
+    per_commune: dict[str, dict[int, tuple[LayerJob, list[QgsFeature]]]] = {code: {} for code in commune_geoms}
+    results = run_layer_jobs(jobs, union, max_per_host, feedback)
+    for done, (job, features) in enumerate(results, start=1):
+        authid = job.crs.authid()
+        if authid not in assigners:
+            assigners[authid] = CommuneAssigner(commune_geoms, job.crs, job.transform)
+        assigner = assigners[authid]
+
+        for feat in features:
+            for code in assigner.assign(feat):
+                per_commune[code].setdefault(job.index, (job, []))[1].append(feat)
+        if progress_callback:
+            progress_callback(done, len(jobs), job.name)
+
+    return {code: [matches[i] for i in sorted(matches)] for code, matches in per_commune.items() if matches}
+
+
+def export_batch_to_csv(
+    batch_results: dict[str, list[tuple[LayerJob, list[QgsFeature]]]],
+    commune_names: dict[str, str],
+    output_dir: str,
+) -> list[str]:
+    """Write one sub-directory per commune ("<code> <nom>") with one CSV per layer."""
+    written = []
+    for code, matches in batch_results.items():
+        folder = os.path.join(output_dir, _safe_filename(f"{code} {commune_names.get(code, '')}"))
+        layers = [build_result_layer(job, features) for job, features in matches]
+        written.extend(export_results_to_csv(layers, folder))
+    return written
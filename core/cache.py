@@ -0,0 +1,154 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from .storage import connect
+
+# Commune contours change about once a year
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and unify separators, for accent-insensitive matching."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.replace("-", " ").replace("'", " ").split())
+
+
+class CommuneCache:
+    """SQLite cache of geo.api.gouv.fr responses, plus an optional full commune list.
+
+    entries holds raw responses keyed by (kind, key), with TTL expiry and LRU eviction
+    once the total size exceeds max_bytes. Expired entries stored with HTTP validators
+    (ETag, Last-Modified) are kept for conditional requests (see get_stale and touch).
+    communes holds the preloaded dataset the offline search index is built from. Each
+    call opens its own connection, so it is safe across threads.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with connect(self.path) as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    PRIMARY KEY (kind, key)
+                );
+                CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+                CREATE TABLE IF NOT EXISTS communes (
+                    code TEXT PRIMARY KEY,
+                    nom TEXT NOT NULL,
+                    nom_norm TEXT NOT NULL,
+                    population INTEGER NOT NULL DEFAULT 0,
+                    codes_postaux TEXT NOT NULL DEFAULT ''
+                );
+                CREATE INDEX IF NOT EXISTS communes_nom_norm ON communes (nom_norm);
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "validators" not in columns:
+                # Caches created by earlier versions
+                conn.execute("ALTER TABLE entries ADD COLUMN validators TEXT NOT NULL DEFAULT ''")
+
+    def get(self, kind: str, key: str) -> str | None:
+        """Return the cached value, or None if missing or older than the TTL."""
+        now = time.time()
+        with connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT value, created, validators FROM entries WHERE kind = ? AND key = ?",
+                (kind, key),
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                if not row[2]:
+                    conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+                return None
+            conn.execute("UPDATE entries SET accessed = ? WHERE kind = ? AND key = ?", (now, kind, key))
+            return row[0]
+
+    def get_stale(self, kind: str, key: str) -> tuple[str, dict[str, str]] | None:
+        """Return (value, validators) of an entry kept for revalidation, whatever its age."""
+        with connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT value, validators FROM entries WHERE kind = ? AND key = ? AND validators != ''",
+                (kind, key),
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    def put(self, kind: str, key: str, value: str, validators: dict[str, str] | None = None):
+        now = time.time()
+        with self._lock, connect(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (kind, key, value, size, created, accessed, validators) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, key, value, len(value.encode()), now, now, json.dumps(validators) if validators else ""),
+            )
+            self._evict(conn, now)
+
+    def touch(self, kind: str, key: str):
+        """Mark an entry as fresh again (the server answered 304 Not Modified)."""
+        now = time.time()
+        with self._lock, connect(self.path) as conn:
+            conn.execute(
+                "UPDATE entries SET created = ?, accessed = ? WHERE kind = ? AND key = ?", (now, now, kind, key)
+            )
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM entries WHERE created < ? AND validators = ''", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used first, until back under the limit
+        for kind, key, size in conn.execute("SELECT kind, key, size FROM entries ORDER BY accessed").fetchall():
+            conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock, connect(self.path) as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM communes")
+
+    def store_communes(self, communes: list[dict]):
+        """Replace the preloaded commune list. Items: {"nom", "code", "population", "codesPostaux"}."""
+        rows = [
+            (
+                c["code"],
+                c["nom"],
+                normalize(c["nom"]),
+                c.get("population") or 0,
+                ",".join(c.get("codesPostaux") or []),
+            )
+            for c in communes
+        ]
+        with self._lock, connect(self.path) as conn:
+            conn.execute("DELETE FROM communes")
+            conn.executemany(
+                "INSERT OR REPLACE INTO communes (code, nom, nom_norm, population, codes_postaux) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def has_communes(self) -> bool:
+        with connect(self.path) as conn:
+            return conn.execute("SELECT 1 FROM communes LIMIT 1").fetchone() is not None
+
+    def all_communes(self) -> list[tuple[str, str, int, str]]:
+        """Return every preloaded commune as (code, nom, population, codes_postaux)."""
+        with connect(self.path) as conn:
+            return conn.execute("SELECT code, nom, population, codes_postaux FROM communes").fetchall()
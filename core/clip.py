@@ -0,0 +1,132 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransformContext,
+    QgsDistanceArea,
+    QgsFeature,
+    QgsField,
+    QgsFields,
+    QgsGeometry,
+    QgsWkbTypes,
+)
+from qgis.PyQt.QtCore import QVariant  # noqa: UP035
+
+# Attributes added to clipped results
+AREA_FIELD = "surface_commune_m2"
+LENGTH_FIELD = "longueur_commune_m"
+SHARE_FIELD = "part_commune_pct"
+
+# Measurements in geographic CRSs are made on GRS80 (RGF93, Lambert-93)
+ELLIPSOID = "EPSG:7019"
+
+DEFAULT_CLIP_WORKERS = os.cpu_count() or 4
+
+# Crossing features of one layer queued in the pool; submitting more first waits for the oldest
+MAX_PENDING_CLIPS = 4 * DEFAULT_CLIP_WORKERS
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _clip_pool() -> ThreadPoolExecutor:
+    """Pool shared by all layers: clipping is CPU-bound, one thread per core is enough."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=DEFAULT_CLIP_WORKERS, thread_name_prefix="secateur-clip")
+        return _pool
+
+
+def shutdown():
+    """Stop the pool's threads, dropping queued clips (plugin unload); the next clip starts a new pool."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def clip_fields(wkb_type) -> QgsFields:
+    """Attributes appended to clipped features: area (polygons) or length (lines), and share inside."""
+    fields = QgsFields()
+    geometry_type = QgsWkbTypes.geometryType(wkb_type)
+    if geometry_type == QgsWkbTypes.PolygonGeometry:
+        fields.append(QgsField(AREA_FIELD, QVariant.Double))
+    elif geometry_type == QgsWkbTypes.LineGeometry:
+        fields.append(QgsField(LENGTH_FIELD, QVariant.Double))
+    fields.append(QgsField(SHARE_FIELD, QVariant.Double))
+    return fields
+
+
+class CommuneClipper:
+    """Cut features to a commune polygon and measure the part inside. Thread-safe.
+
+    Features already classified as inside are only measured; crossing ones go to a
+    shared worker pool (submit), each pool thread using its own GEOS engine and
+    QgsDistanceArea. Output features have the given fields (source fields followed by
+    clip_fields) and multi-part geometries. Crossing features whose intersection has
+    a lower dimension (touching the boundary only) are dropped.
+    """
+
+    def __init__(self, geom: QgsGeometry, fields: QgsFields, wkb_type, crs: QgsCoordinateReferenceSystem):
+        self.geom = geom
+        self.fields = fields
+        self.geometry_type = QgsWkbTypes.geometryType(wkb_type)
+        self._crs = crs
+        self._local = threading.local()
+
+    def _tools(self):
+        local = self._local
+        if not hasattr(local, "engine"):
+            local.engine = QgsGeometry.createGeometryEngine(self.geom.constGet())
+            local.engine.prepareGeometry()
+            local.distance = QgsDistanceArea()
+            local.distance.setSourceCrs(self._crs, QgsCoordinateTransformContext())
+            local.distance.setEllipsoid(ELLIPSOID)
+        return local.engine, local.distance
+
+    def _measure(self, distance: QgsDistanceArea, geom: QgsGeometry) -> float:
+        if self.geometry_type == QgsWkbTypes.PolygonGeometry:
+            return distance.measureArea(geom)
+        if self.geometry_type == QgsWkbTypes.LineGeometry:
+            return distance.measureLength(geom)
+        return float(geom.constGet().nCoordinates())
+
+    def _output(self, feat: QgsFeature, geom: QgsGeometry, measure: float, share: float) -> QgsFeature:
+        geom.convertToMultiType()
+        out = QgsFeature(self.fields)
+        out.setGeometry(geom)
+        extra = [round(share, 2)]
+        if self.geometry_type in (QgsWkbTypes.PolygonGeometry, QgsWkbTypes.LineGeometry):
+            extra.insert(0, round(measure, 2))
+        out.setAttributes(feat.attributes() + extra)
+        return out
+
+    def inside(self, feat: QgsFeature) -> QgsFeature:
+        """A feature entirely inside the commune, with its measures."""
+        _engine, distance = self._tools()
+        geom = QgsGeometry(feat.geometry())
+        return self._output(feat, geom, self._measure(distance, geom), 100.0)
+
+    def clip(self, feat: QgsFeature) -> QgsFeature | None:
+        """The part of a crossing feature inside the commune, or None if it only touches it."""
+        engine, distance = self._tools()
+        full = feat.geometry()
+        clipped = QgsGeometry(engine.intersection(full.constGet()))
+        if clipped.isEmpty():
+            return None
+        if QgsWkbTypes.isMultiType(clipped.wkbType()) and clipped.type() != self.geometry_type:
+            # Mixed collections: keep the parts of the feature's own dimension
+            clipped.convertGeometryCollectionToSubclass(self.geometry_type)
+        if clipped.isEmpty() or clipped.type() != self.geometry_type:
+            return None
+        measure = self._measure(distance, clipped)
+        total = self._measure(distance, full)
+        return self._output(feat, clipped, measure, 100.0 * measure / total if total else 0.0)
+
+    def submit(self, feat: QgsFeature) -> Future:
+        """Clip a crossing feature in the shared pool; the future gives clip()'s result."""
+        return _clip_pool().submit(self.clip, QgsFeature(feat))
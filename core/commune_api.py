@@ -1,51 +1,189 @@
 import json
+import re
 import urllib.parse
-import urllib.request
 
 from qgis.core import QgsGeometry, QgsJsonUtils
 
+from .cache import CommuneCache
+from .commune_index import CommuneIndex
+from .http_client import HttpError, Response, get_client
+from .storage import default_path
+
 API_BASE = "https://geo.api.gouv.fr"
 
+_api_base = API_BASE
+
+_cache: CommuneCache | None = None
+_index: CommuneIndex | None = None
+
+
+def get_cache() -> CommuneCache:
+    """Return the shared commune cache, created in the QGIS profile dir on first use."""
+    global _cache
+    if _cache is None:
+        _cache = CommuneCache(default_path("communes.sqlite"))
+    return _cache
+
+
+def set_cache(cache: CommuneCache | None):
+    """Replace the shared cache (e.g. a temporary one pointed at a local API stand-in)."""
+    global _cache, _index
+    _cache = cache
+    _index = None
+
+
+def get_index() -> CommuneIndex | None:
+    """Return the offline search index if it has been loaded, else None (never blocks)."""
+    return _index
+
+
+def load_index(download: bool = True) -> CommuneIndex | None:
+    """Build the offline search index from the cached commune list.
+
+    If the list has never been preloaded, downloads it first when download is True.
+    Takes a few hundred milliseconds: call it from a background task.
+    """
+    global _index
+    cache = get_cache()
+    if not cache.has_communes():
+        if not download:
+            return None
+        preload_communes()
+        return _index
+    _index = CommuneIndex(cache.all_communes())
+    return _index
+
+
+def set_api_base(url: str | None):
+    """Send API calls to another server (e.g. a local stand-in); None restores API_BASE."""
+    global _api_base
+    _api_base = url or API_BASE
+
 
-def search_communes(text: str) -> list[dict]:
-    """Search communes by name. Returns [{"nom": "Dijon", "code": "21231"}, ...]."""
+def _api_url(path: str, params: dict) -> str:
+    return f"{_api_base}{path}?{urllib.parse.urlencode(params)}"
+
+
+def _store(kind: str, key: str, response: Response, stale, extract):
+    """Cache and return extract(JSON body), or the stale value when the server answered 304."""
+    cache = get_cache()
+    if response.not_modified and stale is not None:
+        cache.touch(kind, key)
+        return json.loads(stale[0])
+    try:
+        value = extract(response.json())
+    except (KeyError, TypeError) as e:
+        raise HttpError(response.url, "decode", f"Réponse inattendue : {e}", response.status) from e
+    cache.put(kind, key, json.dumps(value), response.validators)
+    return value
+
+
+def _cached_json(kind: str, key: str, url: str, timeout: float, extract):
+    """extract(JSON of url), from the cache while fresh, then revalidated with a conditional request.
+
+    Raises HttpError when the API can't be reached or answers with an error.
+    """
+    cached = get_cache().get(kind, key)
+    if cached is not None:
+        return json.loads(cached)
+    stale = get_cache().get_stale(kind, key)
+    response = get_client().get(url, timeout, stale[1] if stale is not None else None)
+    return _store(kind, key, response, stale, extract)
+
+
+def _names(data) -> list[dict]:
+    return [{"nom": c["nom"], "code": c["code"]} for c in data]
+
+
+def search_communes(text: str, limit: int | None = 5) -> list[dict]:
+    """Search communes by name, INSEE or postal code. Returns [{"nom": "Dijon", "code": "21231"}, ...].
+
+    Served from the offline index once loaded (see load_index), then from cached
+    responses, and only then from the API (which caps results at 5). Errors give [].
+    """
     if len(text) < 2:
         return []
-    params = urllib.parse.urlencode(
-        {
-            "nom": text,
-            "fields": "nom,code",
-            "limit": "5",
-        }
-    )
-    url = f"{API_BASE}/communes?{params}"
+    if _index is not None:
+        return _index.search(text, limit)
+
+    url = _api_url("/communes", {"nom": text, "fields": "nom,code", "limit": "5"})
     try:
-        with urllib.request.urlopen(url, timeout=5) as resp:
-            data = json.loads(resp.read().decode())
-        return [{"nom": c["nom"], "code": c["code"]} for c in data]
-    except Exception:
+        return _cached_json("search", text.strip().lower(), url, 5, _names)
+    except HttpError:
         return []
 
 
-def fetch_commune_geometry(code_insee: str) -> QgsGeometry | None:
-    """Fetch the commune contour as QgsGeometry, or None on error."""
-    params = urllib.parse.urlencode(
-        {
-            "geometry": "contour",
-            "format": "geojson",
-        }
+def resolve_communes(spec: str) -> list[dict]:
+    """Resolve a batch specification into [{"nom", "code"}, ...].
+
+    spec is either a list of INSEE codes (separated by spaces, commas or semicolons), an
+    EPCI SIREN code (9 digits) or a département code ("21", "2A", "974"). Raises
+    ValueError on an unrecognised token and HttpError if the API can't be reached.
+    """
+    tokens = [t.upper() for t in re.split(r"[\s,;]+", spec.strip()) if t]
+    if len(tokens) == 1 and re.fullmatch(r"\d{9}", tokens[0]):
+        return _group_members("epcis", tokens[0])
+    if len(tokens) == 1 and re.fullmatch(r"\d{2,3}|2[AB]", tokens[0]):
+        return _group_members("departements", tokens[0])
+
+    communes = []
+    for code in tokens:
+        if not re.fullmatch(r"\d[\dAB]\d{3}", code):
+            raise ValueError(f"Code INSEE invalide : {code}")
+        known = _index.get(code) if _index is not None else None
+        communes.append(known or {"nom": code, "code": code})
+    return communes
+
+
+def _name(data) -> str:
+    return data["nom"]
+
+
+def fetch_commune_name(code_insee: str) -> str:
+    """Name of a commune, from the offline index when loaded, else from the API (cached).
+
+    Raises HttpError when the API can't be reached or answers with an error.
+    """
+    known = _index.get(code_insee) if _index is not None else None
+    if known is not None:
+        return known["nom"]
+    return _cached_json("name", code_insee, _api_url(f"/communes/{code_insee}", {"fields": "nom"}), 10, _name)
+
+
+def _group_members(kind: str, code: str) -> list[dict]:
+    url = _api_url(f"/{kind}/{code}/communes", {"fields": "nom,code"})
+    return _cached_json(kind, code, url, 30, _names)
+
+
+def preload_communes() -> int:
+    """Download the full commune list into the cache and rebuild the offline index. Returns the count."""
+    global _index
+    url = _api_url("/communes", {"fields": "nom,code,population,codesPostaux"})
+    data = get_client().get(url, timeout=60).json()
+    get_cache().store_communes(data)
+    _index = CommuneIndex(
+        [(c["code"], c["nom"], c.get("population") or 0, ",".join(c.get("codesPostaux") or [])) for c in data]
     )
-    url = f"{API_BASE}/communes/{code_insee}?{params}"
+    return len(data)
+
+
+def _contour_url(code_insee: str) -> str:
+    return _api_url(f"/communes/{code_insee}", {"geometry": "contour", "format": "geojson"})
+
+
+def _contour(data) -> dict:
+    return data["geometry"]
+
+
+def _to_geometry(geometry: dict) -> QgsGeometry | None:
     try:
-        with urllib.request.urlopen(url, timeout=10) as resp:
-            data = json.loads(resp.read().decode())
         feature_collection = json.dumps(
             {
                 "type": "FeatureCollection",
                 "features": [
                     {
                         "type": "Feature",
-                        "geometry": data["geometry"],
+                        "geometry": geometry,
                         "properties": {},
                     }
                 ],
@@ -57,3 +195,55 @@ def fetch_commune_geometry(code_insee: str) -> QgsGeometry | None:
         return None
     except Exception:
         return None
+
+
+def fetch_commune_geometry(code_insee: str) -> QgsGeometry | None:
+    """Fetch the commune contour as QgsGeometry, or None if it can't be read.
+
+    Raises HttpError when the API can't be reached or answers with an error.
+    """
+    return _to_geometry(_cached_json("contour", code_insee, _contour_url(code_insee), 10, _contour))
+
+
+def fetch_commune_geometries(codes: list[str]) -> tuple[dict[str, QgsGeometry], dict[str, HttpError]]:
+    """Fetch many contours at once: (geometries, errors), both keyed by INSEE code.
+
+    Contours missing from the cache are requested concurrently over the shared
+    client's kept-alive connections.
+    """
+    cache = get_cache()
+    contours = {}
+    pending = []
+    for code in codes:
+        cached = cache.get("contour", code)
+        if cached is not None:
+            contours[code] = json.loads(cached)
+        else:
+            pending.append(code)
+
+    errors: dict[str, HttpError] = {}
+    stale = {code: cache.get_stale("contour", code) for code in pending}
+    responses = get_client().get_many(
+        [_contour_url(code) for code in pending],
+        timeout=10,
+        validators=[stale[code][1] if stale[code] is not None else None for code in pending],
+    )
+    for code, response in zip(pending, responses, strict=True):
+        if isinstance(response, HttpError):
+            errors[code] = response
+            continue
+        try:
+            contours[code] = _store("contour", code, response, stale[code], _contour)
+        except HttpError as e:
+            errors[code] = e
+
+    geometries = {}
+    for code in codes:
+        if code not in contours:
+            continue
+        geometry = _to_geometry(contours[code])
+        if geometry is None or geometry.isEmpty():
+            errors[code] = HttpError(_contour_url(code), "decode", "Contour illisible")
+        else:
+            geometries[code] = geometry
+    return geometries, errors
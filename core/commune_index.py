@@ -0,0 +1,89 @@
+import bisect
+import re
+
+from .cache import normalize
+
+_CODE_RE = re.compile(r"^\d[\dab]\d*$")
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f" {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class CommuneIndex:
+    """In-memory autocomplete index over all communes.
+
+    Names are matched accent- and case-insensitively: whole-name prefixes first, then
+    word prefixes and substrings (via a trigram index). Digit queries match INSEE code or
+    postal code prefixes. Results within each tier are ranked by population.
+    """
+
+    def __init__(self, communes: list[tuple[str, str, int, str]]):
+        # (code, nom, population, codes_postaux), sorted by decreasing population so
+        # that ids are also ranks
+        rows = sorted(communes, key=lambda c: -(c[2] or 0))
+        self._codes = [r[0] for r in rows]
+        self._names = [r[1] for r in rows]
+        self._norm = [normalize(r[1]) for r in rows]
+        self._id_by_code = {code: i for i, code in enumerate(self._codes)}
+
+        self._by_name = sorted((n, i) for i, n in enumerate(self._norm))
+        self._by_code = sorted(
+            [(r[0].lower(), i) for i, r in enumerate(rows)]
+            + [(cp, i) for i, r in enumerate(rows) for cp in r[3].split(",") if cp]
+        )
+        self._trigrams: dict[str, list[int]] = {}
+        for i, name in enumerate(self._norm):
+            for tri in _trigrams(name):
+                self._trigrams.setdefault(tri, []).append(i)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def get(self, code_insee: str) -> dict | None:
+        """Exact lookup by INSEE code."""
+        i = self._id_by_code.get(code_insee)
+        return None if i is None else {"nom": self._names[i], "code": self._codes[i]}
+
+    @staticmethod
+    def _prefix_range(items: list[tuple[str, int]], prefix: str) -> list[int]:
+        pos = bisect.bisect_left(items, (prefix, -1))
+        ids = []
+        while pos < len(items) and items[pos][0].startswith(prefix):
+            ids.append(items[pos][1])
+            pos += 1
+        return ids
+
+    def _substring_ids(self, query: str) -> list[int]:
+        # Every trigram of the query; one shorter than a trigram only matches word starts
+        grams = {query[i : i + 3] for i in range(len(query) - 2)} if len(query) >= 3 else {f" {query}"[:3]}
+        postings = [self._trigrams.get(g) for g in grams]
+        if not postings or any(p is None for p in postings):
+            return []
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates.intersection_update(p)
+        return sorted(i for i in candidates if query in self._norm[i])
+
+    def search(self, text: str, limit: int | None = None) -> list[dict]:
+        """Return [{"nom", "code"}, ...] best first; limit=None returns every match."""
+        query = normalize(text)
+        if not query:
+            return []
+
+        if _CODE_RE.match(query):
+            ids = sorted(set(self._prefix_range(self._by_code, query)))
+        else:
+            prefix = sorted(self._prefix_range(self._by_name, query))
+            seen = set(prefix)
+            # Word prefixes ("etienne" -> "Saint-Étienne") rank above inner substrings
+            inner = [i for i in self._substring_ids(query) if i not in seen]
+            words = [i for i in inner if f" {query}" in f" {self._norm[i]}"]
+            others = [i for i in inner if f" {query}" not in f" {self._norm[i]}"]
+            ids = prefix + words + others
+
+        if limit is not None:
+            ids = ids[:limit]
+        return [{"nom": self._names[i], "code": self._codes[i]} for i in ids]
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import threading
+import time
+
+from qgis.core import Qgis, QgsCsException, QgsFeedback, QgsGeometry
+
+from .geometry import get_variant_cache
+from .storage import connect, default_path
+from .wfs_capabilities import cached_capabilities, get_capabilities
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Vertices per side of a queried bbox, so that it keeps its shape once back in WGS84
+DENSIFY = 16
+
+# Exclusion reasons
+EXCLUDED_EXTENT = "extent"
+EXCLUDED_LEARNED = "learned"
+
+
+def queried_area(job, commune_geom: QgsGeometry) -> QgsGeometry | None:
+    """The bbox a job requests for commune_geom (in the layer CRS), as a WGS84 polygon."""
+    variant = get_variant_cache().get(commune_geom, job.crs, job.transform)
+    area = QgsGeometry.fromRect(variant.geom.boundingBox()).densifyByCount(DENSIFY)
+    if job.transform is not None:
+        try:
+            area.transform(job.transform, Qgis.TransformDirection.Reverse)
+        except QgsCsException:
+            return None
+    return area
+
+
+class CoverageIndex:
+    """Where a layer can't have features: its declared extent, and areas learned empty.
+
+    excluded() rules a job out for a commune when the layer's GetCapabilities
+    WGS84BoundingBox (or, failing that, its extent from the layer registry) misses the
+    commune bbox, or when the commune bbox lies within the area where earlier requests
+    returned nothing. Only paged fetches (see core.wfs_paging) teach empty areas: a
+    provider request that failed can't be told from an empty answer. Learned areas are
+    kept per layer source and subset string in SQLite and are dropped after ttl, or once
+    the service advertises another updateSequence. Safe across threads.
+    """
+
+    def __init__(self, path: str | None = None, ttl: float = DEFAULT_TTL):
+        self.path = path or default_path("coverage.sqlite")
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (empty area, update sequence, updated); None when nothing is known
+        self._areas: dict[str, tuple[QgsGeometry, str, float] | None] = {}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with connect(self.path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS empty_areas (
+                    key TEXT PRIMARY KEY,
+                    area BLOB NOT NULL,
+                    update_sequence TEXT NOT NULL DEFAULT '',
+                    updated REAL NOT NULL
+                )
+                """
+            )
+
+    @staticmethod
+    def key(job) -> str:
+        return hashlib.sha1(f"{job.uri}\0{job.subset}".encode()).hexdigest()
+
+    def _load(self, key: str) -> tuple[QgsGeometry, str, float] | None:
+        """Learned area of key, from memory or SQLite. Call with the lock held."""
+        if key not in self._areas:
+            with connect(self.path) as conn:
+                row = conn.execute(
+                    "SELECT area, update_sequence, updated FROM empty_areas WHERE key = ?", (key,)
+                ).fetchone()
+            entry = None
+            if row is not None:
+                area = QgsGeometry()
+                area.fromWkb(row[0])
+                entry = (area, row[1], row[2])
+            self._areas[key] = entry
+        return self._areas[key]
+
+    def _drop(self, key: str):
+        self._areas[key] = None
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM empty_areas WHERE key = ?", (key,))
+
+    def _empty_area(self, job, update_sequence: str) -> QgsGeometry | None:
+        key = self.key(job)
+        with self._lock:
+            entry = self._load(key)
+            if entry is None:
+                return None
+            area, sequence, updated = entry
+            if time.time() - updated > self.ttl or (sequence and update_sequence and sequence != update_sequence):
+                self._drop(key)
+                return None
+            return area
+
+    def excluded(self, job, commune_geom: QgsGeometry, feedback: QgsFeedback | None = None) -> str:
+        """Why job can't match commune_geom (EXCLUDED_EXTENT or EXCLUDED_LEARNED), or "".
+
+        May fetch the service's GetCapabilities (once per session and service URL), a
+        request that cancelling feedback aborts.
+        """
+        capabilities = get_capabilities(job.url, feedback=feedback) if job.url else None
+        declared = job.wgs84_extent
+        if capabilities is not None:
+            feature_type = capabilities.feature_type(job.typename)
+            if feature_type is not None and feature_type.wgs84_extent is not None:
+                declared = feature_type.wgs84_extent
+        bbox = commune_geom.boundingBox()
+        if declared is not None and not declared.intersects(bbox):
+            return EXCLUDED_EXTENT
+        area = self._empty_area(job, capabilities.update_sequence if capabilities is not None else "")
+        if area is not None and area.contains(QgsGeometry.fromRect(bbox)):
+            return EXCLUDED_LEARNED
+        return ""
+
+    def learn(self, job, commune_geom: QgsGeometry):
+        """Record the area a finished job requested when it was explicitly empty."""
+        stats = job.stats
+        # A layer served by another one's fetch doesn't know how many features it got
+        if not stats.pages or stats.error or stats.fetched_by or stats.features_fetched or stats.features_kept:
+            return
+        queried = queried_area(job, commune_geom)
+        if queried is None or queried.isEmpty():
+            return
+        capabilities = cached_capabilities(job.url)
+        sequence = capabilities.update_sequence if capabilities is not None else ""
+        key = self.key(job)
+        with self._lock:
+            entry = self._load(key)
+            if entry is None or entry[1] != sequence:
+                area, updated = queried, time.time()
+            else:
+                # Extended areas expire with their oldest part
+                area, updated = entry[0].combine(queried), entry[2]
+            self._areas[key] = (area, sequence, updated)
+            with connect(self.path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO empty_areas (key, area, update_sequence, updated) VALUES (?, ?, ?, ?)",
+                    (key, bytes(area.asWkb()), sequence, updated),
+                )
+
+    def clear(self):
+        with self._lock:
+            self._areas.clear()
+            with connect(self.path) as conn:
+                conn.execute("DELETE FROM empty_areas")
+
+
+_coverage: CoverageIndex | None = None
+
+
+def get_coverage_index() -> CoverageIndex:
+    global _coverage
+    if _coverage is None:
+        _coverage = CoverageIndex()
+    return _coverage
@@ -1,24 +1,69 @@
+import atexit
 import csv
 import os
 import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 
 from qgis.core import (
     QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsCoordinateTransformContext,
+    QgsCsException,
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsFields,
     QgsGeometry,
     QgsLayout,
     QgsLayoutExporter,
     QgsLayoutItemLabel,
     QgsLayoutItemMap,
+    QgsLayoutItemPicture,
+    QgsMapRendererParallelJob,
+    QgsMapSettings,
     QgsProject,
     QgsRasterLayer,
     QgsReadWriteContext,
     QgsReport,
     QgsReportSectionLayout,
+    QgsVectorFileWriter,
     QgsVectorLayer,
+    QgsVectorLayerFeatureSource,
+    QgsWkbTypes,
 )
-from qgis.PyQt.QtCore import QDate, QDateTime, QTime  # noqa: UP035
+from qgis.PyQt.QtCore import QDate, QDateTime, QSize, QTime, QVariant  # noqa: UP035
+from qgis.PyQt.QtGui import QColor, QImage, QPainter  # noqa: UP035
 from qgis.PyQt.QtXml import QDomDocument  # noqa: UP035
 
+from .clip import AREA_FIELD, LENGTH_FIELD
+from .intersector import FILTER_BBOX, prepare_layer_jobs, run_layer_jobs
+from .result_store import FID_COLUMN
+from .tile_cache import TileCache, get_tile_cache, zooms_for
+
+# Concurrent file writers for CSV export
+DEFAULT_WRITERS = 4
+
+# Resolution of the pre-rendered basemap and map images in the PDF report
+REPORT_DPI = 200
+
+# Report copies of the result layers are simplified to this many output pixels (0: full resolution)
+SIMPLIFY_PIXELS = 1.0
+
+# Report page template, parsed once (see template_document)
+_template: QDomDocument | None = None
+_template_lock = threading.Lock()
+
+# Basemap images already rendered in this session, by (crs, extent, size, dpi), least recently used dropped first
+MAX_BASEMAP_IMAGES = 8
+_basemap_images: OrderedDict[tuple, QImage] = OrderedDict()
+_basemap_lock = threading.Lock()
+_IMAGE_DIR = None
+
 
 def _format_value(val):
     if val is None:
@@ -32,45 +77,223 @@ def _format_value(val):
     return val
 
 
+def _format_plain(val):
+    return "" if val is None else val
+
+
+# Only temporal fields can hold Qt date/time objects that need formatting
+_TEMPORAL_TYPES = {QVariant.Date, QVariant.DateTime, QVariant.Time}
+
+
+def _field_converters(fields: QgsFields) -> list:
+    """One value converter per field, chosen once from the field type instead of per value."""
+    return [_format_value if field.type() in _TEMPORAL_TYPES else _format_plain for field in fields]
+
+
 def _safe_filename(name: str) -> str:
     """Turn a layer name into a safe filename (no path separators, etc.)."""
     return re.sub(r"[^\w\s\-()]", "_", name).strip()
 
 
+def _unique_filenames(names: list[str], suffix: str) -> list[str]:
+    """Safe filenames for names, with _2, _3... added to repeats so no two layers share a file."""
+    used = set()
+    filenames = []
+    for name in names:
+        base = _safe_filename(name)
+        filename, n = base + suffix, 1
+        # Compared case-insensitively, as on Windows and macOS file systems
+        while filename.lower() in used:
+            n += 1
+            filename = f"{base}_{n}{suffix}"
+        used.add(filename.lower())
+        filenames.append(filename)
+    return filenames
+
+
+def _write_csv(filepath: str, fields: QgsFields, features, indexes: list[int] | None = None) -> str:
+    if indexes is not None:
+        kept = QgsFields()
+        for i in indexes:
+            kept.append(fields.at(i))
+        fields = kept
+        features = (_Projected(feat, indexes) for feat in features)
+    converters = _field_converters(fields)
+    with open(filepath, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields.names())
+        writer.writerows([c(v) for c, v in zip(converters, feat.attributes(), strict=False)] for feat in features)
+    return filepath
+
+
+class _Projected:
+    """A feature seen through a subset of its attributes."""
+
+    __slots__ = ("_attributes",)
+
+    def __init__(self, feat: QgsFeature, indexes: list[int]):
+        attributes = feat.attributes()
+        self._attributes = [attributes[i] for i in indexes]
+
+    def attributes(self):
+        return self._attributes
+
+
+def _exported_indexes(layer: QgsVectorLayer) -> list[int] | None:
+    """Attributes to export, leaving out the FID column of GeoPackage-backed results; None for all."""
+    if layer.providerType() != "ogr":
+        return None
+    pk = set(layer.dataProvider().pkAttributeIndexes())
+    return [i for i in range(layer.fields().count()) if i not in pk] if pk else None
+
+
 def export_results_to_csv(
     result_layers: list[QgsVectorLayer],
     output_dir: str,
     progress_callback=None,
+    max_workers: int = DEFAULT_WRITERS,
 ) -> list[str]:
     """Export each result layer as a separate CSV file inside output_dir.
 
     Creates output_dir if it doesn't exist. Returns the list of written file paths.
-    progress_callback(current, total, name) is called before each layer.
+    Files are written concurrently from thread-safe feature sources.
+    progress_callback(current, total, name) is called as each file is done.
     """
     os.makedirs(output_dir, exist_ok=True)
     total = len(result_layers)
 
-    written = []
-    for i, layer in enumerate(result_layers):
-        layer_name = layer.name().removesuffix(" — résultat")
-        if progress_callback:
-            progress_callback(i, total, layer_name)
-
-        filename = _safe_filename(layer_name) + ".csv"
+    # Feature sources must be created on the layers' thread
+    tasks = []
+    names = [layer.name().removesuffix(" — résultat") for layer in result_layers]
+    for layer, layer_name, filename in zip(result_layers, names, _unique_filenames(names, ".csv"), strict=True):
         filepath = os.path.join(output_dir, filename)
+        tasks.append(
+            (layer_name, filepath, layer.fields(), _exported_indexes(layer), QgsVectorLayerFeatureSource(layer))
+        )
+
+    written = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(_write_csv, filepath, fields, source.getFeatures(QgsFeatureRequest()), indexes): (i, name)
+            for i, (name, filepath, fields, indexes, source) in enumerate(tasks)
+        }
+        for done, future in enumerate(as_completed(futures)):
+            i, name = futures[future]
+            written[i] = future.result()
+            if progress_callback:
+                progress_callback(done, total, name)
+
+    return [written[i] for i in sorted(written)]
+
+
+class CsvSink:
+    """Write one layer's matches to CSV as they are produced (see run_layer_job).
+
+    The file is only created on the first feature, like export_results_to_csv which
+    skips layers without results.
+    """
 
-        field_names = [field.name() for field in layer.fields()]
-
-        with open(filepath, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(field_names)
-            for feat in layer.getFeatures():
-                row = [_format_value(v) for v in feat.attributes()]
-                writer.writerow(row)
+    def __init__(self, filepath: str, fields: QgsFields):
+        self.filepath = filepath
+        self.fields = fields
+        self.count = 0
+        self._converters = _field_converters(fields)
+        self._file = None
+        self._writer = None
+
+    def add(self, feat: QgsFeature):
+        if self._writer is None:
+            self._file = open(self.filepath, "w", newline="", encoding="utf-8")  # noqa: SIM115
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.fields.names())
+        self._writer.writerow([c(v) for c, v in zip(self._converters, feat.attributes(), strict=False)])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class VectorFileSink:
+    """Write one layer's matches (geometry included) to a GeoPackage or Parquet file as they come."""
+
+    def __init__(self, filepath: str, driver: str, fields: QgsFields, wkb_type, crs):
+        self.filepath = filepath
+        self.count = 0
+        self._args = (fields, wkb_type, crs)
+        self._driver = driver
+        self._writer = None
+
+    def add(self, feat: QgsFeature):
+        if self._writer is None:
+            fields, wkb_type, crs = self._args
+            options = QgsVectorFileWriter.SaveVectorOptions()
+            options.driverName = self._driver
+            if self._driver == "GPKG":
+                # Source layers may have their own "fid" attribute
+                options.layerOptions = [f"FID={FID_COLUMN}"]
+            self._writer = QgsVectorFileWriter.create(
+                self.filepath, fields, wkb_type, crs, QgsCoordinateTransformContext(), options
+            )
+            self._check()
+        if not self._writer.addFeature(feat):
+            self._check()
+            raise RuntimeError(f"Écriture de {self.filepath} impossible")
+        self.count += 1
+
+    def _check(self):
+        if self._writer.hasError() != QgsVectorFileWriter.NoError:
+            raise RuntimeError(f"Écriture de {self.filepath} impossible : {self._writer.errorMessage()}")
+
+    def close(self):
+        # Deleting the writer flushes and closes the file
+        self._writer = None
+
+
+STREAM_FORMATS = {"csv": ".csv", "gpkg": ".gpkg", "parquet": ".parquet"}
+
+
+def export_stream(
+    commune_geom: QgsGeometry,
+    layers: list[QgsVectorLayer],
+    output_dir: str,
+    fmt: str = "csv",
+    progress_callback=None,
+    feedback=None,
+    filter_mode: str = FILTER_BBOX,
+    clip: bool = False,
+) -> list[str]:
+    """Intersect and write results straight to files, one per layer, without memory layers.
 
-        written.append(filepath)
+    Each intersection worker writes its own layer's file as features arrive, so peak
+    memory doesn't grow with the result size. fmt is "csv", "gpkg" or "parquet"
+    (Parquet needs GDAL >= 3.5). Returns the written file paths, in layer order.
+    progress_callback(done, total, name) is called each time a layer finishes.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    sinks = {}
+    jobs = prepare_layer_jobs(layers, filter_mode, clip)
+    # Chosen up front: sink_factory runs on the intersection workers
+    names = _unique_filenames([job.name for job in jobs], STREAM_FORMATS[fmt])
+    filenames = {job.index: name for job, name in zip(jobs, names, strict=True)}
+
+    def sink_factory(job):
+        filepath = os.path.join(output_dir, filenames[job.index])
+        if fmt == "csv":
+            sink = CsvSink(filepath, job.fields)
+        else:
+            driver = "GPKG" if fmt == "gpkg" else "Parquet"
+            sink = VectorFileSink(filepath, driver, job.fields, job.wkb_type, job.crs)
+        sinks[job.index] = sink
+        return sink
+
+    results = run_layer_jobs(jobs, commune_geom, feedback=feedback, sink_factory=sink_factory)
+    for done, (job, _features) in enumerate(results, start=1):
+        if progress_callback:
+            progress_callback(done, len(jobs), job.name)
 
-    return written
+    return [sinks[i].filepath for i in sorted(sinks) if sinks[i].count]
 
 
 def _load_template() -> QDomDocument:
@@ -82,14 +305,27 @@ def _load_template() -> QDomDocument:
     return doc
 
 
+def template_document() -> QDomDocument:
+    """The report_page.qpt template, read once per session (layouts only read it)."""
+    global _template
+    with _template_lock:
+        if _template is None:
+            _template = _load_template()
+        return _template
+
+
 def _make_page_layout(
     project: QgsProject,
     template_doc: QDomDocument,
     title: str,
     extent,
     visible_layers: list[QgsVectorLayer],
+    background: str | None = None,
 ) -> QgsLayout:
-    """Create a single-page QgsLayout from the template."""
+    """Create a single-page QgsLayout from the template.
+
+    background is an optional pre-rendered image placed under the (then transparent) map.
+    """
     layout = QgsLayout(project)
     layout.initializeDefaults()
     ctx = QgsReadWriteContext()
@@ -107,68 +343,265 @@ def _make_page_layout(
         map_item.zoomToExtent(extent)
         map_item.setLayers(visible_layers)
         map_item.setKeepLayerSet(True)
+        if background:
+            picture = QgsLayoutItemPicture(layout)
+            picture.setResizeMode(QgsLayoutItemPicture.Stretch)
+            picture.setPicturePath(background)
+            layout.addLayoutItem(picture)
+            picture.attemptMove(map_item.positionWithUnits())
+            picture.attemptResize(map_item.sizeWithUnits())
+            layout.moveItemToBottom(picture)
+            map_item.setBackgroundEnabled(False)
 
     return layout
 
 
-def _create_basemap() -> QgsRasterLayer:
-    """Create an IGN Plan IGN v2 basemap layer with low opacity."""
-    from urllib.parse import quote
-
-    tile_url = (
-        "https://data.geopf.fr/wmts"
-        "?REQUEST=GetTile&SERVICE=WMTS&VERSION=1.0.0"
-        "&TILEMATRIXSET=PM"
-        "&LAYER=GEOGRAPHICALGRIDSYSTEMS.PLANIGNV2"
-        "&STYLE=normal&FORMAT=image/png"
-        "&TILECOL={x}&TILEROW={y}&TILEMATRIX={z}"
-    )
-    # Encode & so it doesn't clash with QGIS URI parameter separators
-    uri = f"type=xyz&url={quote(tile_url, safe=':/?={}.')}&zmax=19&zmin=0"
-    layer = QgsRasterLayer(uri, "Plan IGN", "wms")
+def _map_settings(layers, crs, extent, size: QSize, dpi: int, transparent: bool) -> QgsMapSettings:
+    settings = QgsMapSettings()
+    settings.setLayers(layers)
+    settings.setDestinationCrs(crs)
+    settings.setExtent(extent)
+    settings.setOutputSize(size)
+    settings.setOutputDpi(dpi)
+    settings.setTransformContext(QgsProject.instance().transformContext())
+    settings.setBackgroundColor(QColor(0, 0, 0, 0) if transparent else QColor(255, 255, 255))
+    return settings
+
+
+def _render_all(settings_list: list[QgsMapSettings]) -> list[QImage]:
+    """Render several map images at once: every job runs its layers in parallel threads."""
+    jobs = [QgsMapRendererParallelJob(settings) for settings in settings_list]
+    for job in jobs:
+        job.start()
+    images = []
+    for job in jobs:
+        job.waitForFinished()
+        images.append(job.renderedImage())
+    return images
+
+
+def _image_dir() -> str:
+    global _IMAGE_DIR
+    if _IMAGE_DIR is None or not os.path.isdir(_IMAGE_DIR):
+        _IMAGE_DIR = tempfile.mkdtemp(prefix="secateur-")
+    return _IMAGE_DIR
+
+
+def clear_report_cache():
+    """Drop the cached basemap images and delete the report image directory (plugin unload, exit)."""
+    global _IMAGE_DIR
+    with _basemap_lock:
+        _basemap_images.clear()
+    if _IMAGE_DIR is not None:
+        shutil.rmtree(_IMAGE_DIR, ignore_errors=True)
+        _IMAGE_DIR = None
+
+
+atexit.register(clear_report_cache)
+
+
+def _basemap_image(crs, extent, size: QSize, dpi: int, tile_cache: TileCache) -> QImage:
+    """Basemap rendered for this extent and size, rendered once and reused across pages and exports.
+
+    Tiles are seeded into the tile cache first (downloaded unless it is offline) and
+    the image is drawn from the cache only.
+    """
+    key = (tile_cache.path, crs.authid(), extent.toString(8), size.width(), size.height(), dpi)
+    with _basemap_lock:
+        image = _basemap_images.get(key)
+        if image is not None:
+            _basemap_images.move_to_end(key)
+    if image is None:
+        to_wgs84 = QgsCoordinateTransform(crs, QgsCoordinateReferenceSystem("EPSG:4326"), QgsProject.instance())
+        wgs84_extent = to_wgs84.transformBoundingBox(extent)
+        seeded = tile_cache.seed(wgs84_extent, zooms_for(wgs84_extent, size.width()))
+        basemap = _create_basemap(tile_cache)
+        image = _render_all([_map_settings([basemap], crs, extent, size, dpi, transparent=False)])[0]
+        # Incomplete basemaps (offline, network errors) are redrawn next time
+        if not seeded["missing"]:
+            with _basemap_lock:
+                _basemap_images[key] = image
+                while len(_basemap_images) > MAX_BASEMAP_IMAGES:
+                    _basemap_images.popitem(last=False)
+    return image
+
+
+def _compose(background: QImage, foreground: QImage | None, path: str) -> str:
+    """Save background with foreground painted over it, as a PNG."""
+    image = QImage(background)
+    if foreground is not None:
+        painter = QPainter(image)
+        painter.drawImage(0, 0, foreground)
+        painter.end()
+    image.save(path, "PNG")
+    return path
+
+
+def _create_basemap(tile_cache: TileCache | None = None) -> QgsRasterLayer:
+    """Create an IGN Plan IGN v2 basemap layer with low opacity, read from the tile cache."""
+    layer = (tile_cache or get_tile_cache()).layer("Plan IGN")
     layer.setOpacity(0.5)
     return layer
 
 
+@dataclass
+class PdfStats:
+    """What a PDF report cost.
+
+    vertices counts the result layers' vertices in the report extent, before and after
+    simplification; timings are in seconds, render_seconds covering the pre-rendered
+    basemap and, with raster layers, result layers.
+    """
+
+    vertices: int = 0
+    simplified_vertices: int = 0
+    simplify_seconds: float = 0.0
+    render_seconds: float = 0.0
+    export_seconds: float = 0.0
+    file_bytes: int = 0
+
+
+def _simplified_features(source: QgsVectorLayerFeatureSource, rect, tolerance: float):
+    """Features of source in rect with geometries simplified to tolerance: (features, vertices before, after)."""
+    features = []
+    before = after = 0
+    for feat in source.getFeatures(QgsFeatureRequest().setFilterRect(rect)):
+        geom = feat.geometry()
+        if not geom.isNull():
+            before += geom.constGet().nCoordinates()
+            simplified = geom.simplify(tolerance)
+            # Features smaller than the tolerance would vanish: keep them as they are
+            if not simplified.isNull() and not simplified.isEmpty():
+                geom = simplified
+            after += geom.constGet().nCoordinates()
+            feat.setGeometry(geom)
+        features.append(feat)
+    return features, before, after
+
+
+def _report_layers(
+    result_layers: list[QgsVectorLayer], crs, extent, size: QSize, simplify_pixels: float, stats: PdfStats
+) -> list[QgsVectorLayer]:
+    """Copies of result_layers for the report: features in extent only, simplified to the
+    output resolution (simplify_pixels pixels of size), with the layers' style.
+
+    Built once per report and shared by all its pages; layers are simplified
+    concurrently. Layers whose CRS the extent can't be transformed to are used as is.
+    """
+    start = time.perf_counter()
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=DEFAULT_WRITERS) as executor:
+        for i, layer in enumerate(result_layers):
+            transform = QgsCoordinateTransform(crs, layer.crs(), QgsProject.instance())
+            try:
+                rect = transform.transformBoundingBox(extent)
+            except QgsCsException:
+                continue
+            tolerance = rect.width() / size.width() * simplify_pixels
+            jobs[i] = executor.submit(_simplified_features, QgsVectorLayerFeatureSource(layer), rect, tolerance)
+
+    copies = []
+    for i, layer in enumerate(result_layers):
+        if i not in jobs:
+            copies.append(layer)
+            continue
+        features, before, after = jobs[i].result()
+        stats.vertices += before
+        stats.simplified_vertices += after
+        copy = QgsVectorLayer(
+            f"{QgsWkbTypes.displayString(layer.wkbType())}?crs={layer.crs().authid()}", layer.name(), "memory"
+        )
+        copy.dataProvider().addAttributes(layer.fields().toList())
+        copy.updateFields()
+        copy.dataProvider().addFeatures(features)
+        copy.setRenderer(layer.renderer().clone())
+        copy.setOpacity(layer.opacity())
+        copies.append(copy)
+    stats.simplify_seconds = time.perf_counter() - start
+    return copies
+
+
+def _clip_summary(layer: QgsVectorLayer) -> str:
+    """Total area or length inside the commune of a clipped result layer, as a title suffix ("" otherwise)."""
+    fields = layer.fields()
+    for name, unit, scale in ((AREA_FIELD, "ha", 1e-4), (LENGTH_FIELD, "km", 1e-3)):
+        i = fields.indexOf(name)
+        if i < 0:
+            continue
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([i])
+        total = sum(feat[i] or 0 for feat in layer.getFeatures(request)) * scale
+        return f" — {total:.2f} {unit} dans la commune".replace(".", ",")
+    return ""
+
+
 def export_results_to_pdf(
     result_layers: list[QgsVectorLayer],
     commune_name: str,
     commune_geom: QgsGeometry,
     output_path: str,
     progress_callback=None,
-):
+    raster_layers: bool = True,
+    dpi: int = REPORT_DPI,
+    tile_cache: TileCache | None = None,
+    simplify_pixels: float = SIMPLIFY_PIXELS,
+) -> PdfStats:
     """Export a multi-page PDF report: overview page + one page per result layer.
 
+    The basemap is rendered once for the report extent and reused as every page's
+    background. With raster_layers, the result layers of all pages are also rendered
+    up front, concurrently, so the report export only places images; otherwise they
+    stay vector map layers drawn over the basemap. Pages draw copies of the result
+    layers simplified to simplify_pixels output pixels (see _report_layers), shared
+    by all pages; 0 draws the result layers themselves. Basemap tiles come from
+    tile_cache (default: the shared one), so an offline cache still produces a report.
+    Clipped results (see core.clip) show their total area or length in the page title.
     progress_callback(current, total, name) is called before each page is built.
+    Returns the report's PdfStats.
     """
     project = QgsProject.instance()
-    template_doc = _load_template()
-    basemap = _create_basemap()
-    # Register basemap so QgsLayoutItemMap can render it
-    project.addMapLayer(basemap, False)
+    template_doc = template_document()
 
     # Buffered extent (5% margin)
     bbox = commune_geom.boundingBox()
     bbox.grow(bbox.width() * 0.05 + bbox.height() * 0.05)
 
-    total_pages = 1 + len(result_layers)
+    # The template's map item decides the real extent (aspect ratio) and pixel size
+    probe = _make_page_layout(project, template_doc, commune_name, bbox, [])
+    map_item = probe.itemById("map")
+    if not isinstance(map_item, QgsLayoutItemMap):
+        raise RuntimeError("Le modèle de page n'a pas d'élément carte « map ».")
+    extent = map_item.extent()
+    crs = map_item.crs()
+    size = QSize(round(map_item.rect().width() / 25.4 * dpi), round(map_item.rect().height() / 25.4 * dpi))
+
+    stats = PdfStats()
+    drawn = list(result_layers)
+    if simplify_pixels > 0:
+        drawn = _report_layers(drawn, crs, extent, size, simplify_pixels, stats)
+    pages = [(commune_name, drawn)]
+    pages += [
+        (layer.name().removesuffix(" — résultat") + _clip_summary(layer), [copy])
+        for layer, copy in zip(result_layers, drawn, strict=True)
+    ]
+    total_pages = len(pages)
+
+    start = time.perf_counter()
+    basemap = _basemap_image(crs, extent, size, dpi, tile_cache or get_tile_cache())
+    if raster_layers:
+        foregrounds = _render_all([_map_settings(layers, crs, extent, size, dpi, True) for _, layers in pages])
+    else:
+        foregrounds = [None] * total_pages
+    stats.render_seconds = time.perf_counter() - start
+
+    image_dir = tempfile.mkdtemp(dir=_image_dir())
     report = QgsReport(project)
-
-    # Page 1: overview with all result layers
-    if progress_callback:
-        progress_callback(0, total_pages, commune_name)
-    overview_layout = _make_page_layout(project, template_doc, commune_name, bbox, list(result_layers) + [basemap])
-    overview_section = QgsReportSectionLayout(report)
-    overview_section.setBody(overview_layout)
-    overview_section.setBodyEnabled(True)
-    report.appendChild(overview_section)
-
-    # Pages 2..N: one per result layer
-    for i, layer in enumerate(result_layers):
-        layer_name = layer.name().removesuffix(" — résultat")
+    for i, ((title, layers), foreground) in enumerate(zip(pages, foregrounds, strict=True)):
         if progress_callback:
-            progress_callback(i + 1, total_pages, layer_name)
-        page_layout = _make_page_layout(project, template_doc, layer_name, bbox, [layer, basemap])
+            progress_callback(i, total_pages, title)
+        background = _compose(basemap, foreground, os.path.join(image_dir, f"page_{i}.png"))
+        page_layout = _make_page_layout(
+            project, template_doc, title, bbox, [] if raster_layers else layers, background=background
+        )
         section = QgsReportSectionLayout(report)
         section.setBody(page_layout)
         section.setBodyEnabled(True)
@@ -176,11 +609,15 @@ def export_results_to_pdf(
 
     # Export
     settings = QgsLayoutExporter.PdfExportSettings()
+    settings.dpi = dpi
+    start = time.perf_counter()
     # exportToPdf returns tuple[ExportResult, str] at runtime but qgis-stubs types it as ExportResult
     result, error = QgsLayoutExporter.exportToPdf(report, output_path, settings)  # pyright: ignore[reportGeneralTypeIssues]
+    stats.export_seconds = time.perf_counter() - start
 
-    # Clean up temporary basemap
-    project.removeMapLayer(basemap.id())
+    shutil.rmtree(image_dir, ignore_errors=True)
 
     if result != QgsLayoutExporter.Success:
         raise RuntimeError(f"PDF export failed: {error}")
+    stats.file_bytes = os.path.getsize(output_path)
+    return stats
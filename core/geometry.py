@@ -0,0 +1,173 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from qgis.core import QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsGeometry
+
+# Inner polygon shrink distance, as a fraction of the commune bbox largest side
+INNER_SHRINK = 0.01
+
+# Commune/CRS pairs kept by the shared GeometryVariantCache
+DEFAULT_MAX_VARIANTS = 32
+
+# CommuneMatcher.classify() results
+OUTSIDE = 0
+INSIDE = 1
+CROSSING = 2
+
+
+class CommuneMatcher:
+    """Fast intersects test against a fixed commune polygon.
+
+    Candidates go through three stages, cheapest first:
+    1. bbox rejection against the commune bounding box,
+    2. accept if contained in a simplified polygon strictly inside the commune,
+    3. exact test on a prepared GEOS engine of the full-resolution contour.
+    Only features near the boundary reach stage 3. Not thread-safe: build one per worker.
+    classify() tells features inside the commune from those crossing its boundary.
+    """
+
+    def __init__(self, geom: QgsGeometry):
+        self.geom = geom
+        self.bbox = geom.boundingBox()
+        self._engine = QgsGeometry.createGeometryEngine(geom.constGet())
+        self._engine.prepareGeometry()
+
+        self._inner_engine = None
+        self._inner_bbox = None
+        tolerance = max(self.bbox.width(), self.bbox.height()) * INNER_SHRINK
+        if tolerance > 0:
+            # Shrinking by 2x the simplification tolerance keeps the simplified ring inside the commune
+            inner = geom.buffer(-2 * tolerance, 2).simplify(tolerance)
+            if not inner.isEmpty():
+                self._inner_bbox = inner.boundingBox()
+                self._inner_engine = QgsGeometry.createGeometryEngine(inner.constGet())
+                self._inner_engine.prepareGeometry()
+
+    def intersects(self, geom: QgsGeometry) -> bool:
+        feat_bbox = geom.boundingBox()
+        if not self.bbox.intersects(feat_bbox):
+            return False
+        if (
+            self._inner_engine is not None
+            and self._inner_bbox is not None
+            and self._inner_bbox.contains(feat_bbox)
+            and self._inner_engine.contains(geom.constGet())
+        ):
+            return True
+        return self._engine.intersects(geom.constGet())
+
+    def classify(self, geom: QgsGeometry) -> int:
+        """OUTSIDE, INSIDE (entirely within the commune) or CROSSING (partly outside)."""
+        feat_bbox = geom.boundingBox()
+        if not self.bbox.intersects(feat_bbox):
+            return OUTSIDE
+        if (
+            self._inner_engine is not None
+            and self._inner_bbox is not None
+            and self._inner_bbox.contains(feat_bbox)
+            and self._inner_engine.contains(geom.constGet())
+        ):
+            return INSIDE
+        if not self._engine.intersects(geom.constGet()):
+            return OUTSIDE
+        if self.bbox.contains(feat_bbox) and self._engine.contains(geom.constGet()):
+            return INSIDE
+        return CROSSING
+
+
+def simplified_cover(geom: QgsGeometry, fraction: float) -> QgsGeometry:
+    """A simplified polygon covering geom, tolerance given as a fraction of its bbox largest side.
+
+    Buffering by the tolerance before simplifying keeps the result a superset of geom,
+    so filtering with it never drops a feature the exact test would keep.
+    """
+    bbox = geom.boundingBox()
+    tolerance = max(bbox.width(), bbox.height()) * fraction
+    if tolerance <= 0:
+        return geom
+    return geom.buffer(tolerance, 2).simplify(tolerance)
+
+
+class CommuneVariant:
+    """One commune geometry reprojected to one CRS, with the variants derived from it.
+
+    The reprojected geometry is computed once; simplified covers are built on first
+    request per tolerance; matchers are pooled, each used by one thread at a time.
+    """
+
+    def __init__(self, geom: QgsGeometry, transform: QgsCoordinateTransform | None):
+        local = QgsGeometry(geom)
+        if transform is not None:
+            local.transform(transform)
+        self.geom = local
+        self._lock = threading.Lock()
+        self._simplified: dict[float, QgsGeometry] = {}
+        self._idle: list[CommuneMatcher] = []
+
+    def simplified(self, fraction: float) -> QgsGeometry:
+        with self._lock:
+            if fraction not in self._simplified:
+                self._simplified[fraction] = simplified_cover(self.geom, fraction)
+            return self._simplified[fraction]
+
+    @contextmanager
+    def matcher(self):
+        """Borrow a CommuneMatcher (prepared engines aren't thread-safe), built if none is idle."""
+        with self._lock:
+            matcher = self._idle.pop() if self._idle else None
+        if matcher is None:
+            matcher = CommuneMatcher(self.geom)
+        try:
+            yield matcher
+        finally:
+            with self._lock:
+                self._idle.append(matcher)
+
+
+class GeometryVariantCache:
+    """CommuneVariants keyed by (commune geometry, CRS), least recently used dropped first.
+
+    Layers sharing a CRS share the reprojection, simplification and prepared engines
+    of the commune, within a run and across runs on the same commune. Thread-safe.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_VARIANTS):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], CommuneVariant] = OrderedDict()
+
+    def get(
+        self,
+        geom: QgsGeometry,
+        crs: QgsCoordinateReferenceSystem,
+        transform: QgsCoordinateTransform | None,
+    ) -> CommuneVariant:
+        """Variant of geom in crs; transform (commune CRS to crs) is only used on a miss."""
+        key = (hashlib.sha1(bytes(geom.asWkb())).hexdigest(), crs.authid() or crs.toWkt())
+        with self._lock:
+            variant = self._entries.get(key)
+            if variant is not None:
+                self._entries.move_to_end(key)
+                return variant
+        # Built outside the lock: reprojecting a detailed contour takes a while
+        variant = CommuneVariant(geom, transform)
+        with self._lock:
+            variant = self._entries.setdefault(key, variant)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return variant
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_variants = GeometryVariantCache()
+
+
+def get_variant_cache() -> GeometryVariantCache:
+    """The variant cache shared by all runs."""
+    return _variants
@@ -0,0 +1,236 @@
+import gzip
+import http.client
+import json
+import ssl
+import threading
+import urllib.parse
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_PER_HOST = 4
+DEFAULT_WORKERS = 8
+USER_AGENT = "ecospheres-secateur"
+
+# Errors of a kept-alive connection the server already closed: retried once on a new one
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, BrokenPipeError, ConnectionResetError)
+
+
+class HttpError(Exception):
+    """A failed request. kind is "network", "timeout", "http" (status set) or "decode"."""
+
+    def __init__(self, url: str, kind: str, message: str, status: int | None = None):
+        super().__init__(f"{message} ({url})")
+        self.url = url
+        self.kind = kind
+        self.message = message
+        self.status = status
+
+
+@dataclass
+class Response:
+    """A completed request: body decompressed, header names lowercased."""
+
+    url: str
+    status: int
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """ETag and Last-Modified, to send back with a later conditional request."""
+        return {
+            name: self.headers[header]
+            for name, header in (("etag", "etag"), ("last_modified", "last-modified"))
+            if header in self.headers
+        }
+
+    def json(self):
+        try:
+            return json.loads(self.body.decode())
+        except (UnicodeDecodeError, ValueError) as e:
+            raise HttpError(self.url, "decode", f"Réponse JSON invalide : {e}") from e
+
+
+def _decode(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        return zlib.decompress(body)
+    return body
+
+
+class HttpClient:
+    """Small HTTP/1.1 client keeping connections alive per host. Thread-safe.
+
+    At most max_per_host requests run against a host at once, each on an idle kept-alive
+    connection when there is one. Responses are requested gzip-compressed; get() sends
+    If-None-Match / If-Modified-Since from validators (see Response.validators) and
+    returns 304 responses as such. Failures raise HttpError. get_many() runs requests
+    concurrently on up to max_workers threads. Proxies come from the environment, as
+    with urllib.
+    """
+
+    def __init__(self, max_per_host: int = DEFAULT_MAX_PER_HOST, max_workers: int = DEFAULT_WORKERS):
+        self.max_per_host = max_per_host
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._idle: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = {}
+        self._slots: dict[tuple[str, str, int], threading.BoundedSemaphore] = {}
+        self._ssl = ssl.create_default_context()
+        self.connections_opened = 0
+
+    def _slot(self, key) -> threading.BoundedSemaphore:
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return self._slots[key]
+
+    def _new_connection(self, scheme: str, host: str, port: int, timeout: float) -> http.client.HTTPConnection:
+        proxy = urllib.request.getproxies().get(scheme)
+        if proxy and not urllib.request.proxy_bypass(host):
+            parsed = urllib.parse.urlparse(proxy)
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(
+                    parsed.hostname, parsed.port or 8080, timeout=timeout, context=self._ssl
+                )
+                conn.set_tunnel(host, port)
+            else:
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 8080, timeout=timeout)
+        elif scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+
+    def _checkout(self, key, timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        return self._new_connection(*key, timeout), False
+
+    def _checkin(self, key, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def get(
+        self, url: str, timeout: float = DEFAULT_TIMEOUT, validators: dict[str, str] | None = None, headers=None
+    ) -> Response:
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise HttpError(url, "network", "URL non prise en charge")
+        key = (parsed.scheme, parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80))
+        target = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        if self._proxied_http(parsed):
+            # Plain HTTP proxies take the absolute URL
+            target = url
+        request_headers = {"Accept-Encoding": "gzip, deflate", "User-Agent": USER_AGENT, "Connection": "keep-alive"}
+        if validators:
+            if validators.get("etag"):
+                request_headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                request_headers["If-Modified-Since"] = validators["last_modified"]
+        request_headers.update(headers or {})
+
+        with self._slot(key):
+            conn, reused = self._checkout(key, timeout)
+            try:
+                try:
+                    status, reason, response_headers, body, will_close = self._send(conn, target, request_headers)
+                except _STALE_ERRORS:
+                    conn.close()
+                    if not reused:
+                        raise
+                    conn = self._new_connection(*key, timeout)
+                    status, reason, response_headers, body, will_close = self._send(conn, target, request_headers)
+            except TimeoutError as e:
+                conn.close()
+                raise HttpError(url, "timeout", "Délai dépassé") from e
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise HttpError(url, "network", f"Erreur réseau : {e}") from e
+            if will_close:
+                conn.close()
+            else:
+                self._checkin(key, conn)
+
+        if status >= 400:
+            raise HttpError(url, "http", f"HTTP {status} {reason}", status)
+        try:
+            body = _decode(body, response_headers.get("content-encoding", ""))
+        except (OSError, zlib.error) as e:
+            raise HttpError(url, "decode", f"Réponse compressée invalide : {e}", status) from e
+        return Response(url, status, response_headers, body)
+
+    @staticmethod
+    def _proxied_http(parsed) -> bool:
+        return (
+            parsed.scheme == "http"
+            and bool(urllib.request.getproxies().get("http"))
+            and not urllib.request.proxy_bypass(parsed.hostname)
+        )
+
+    @staticmethod
+    def _send(conn: http.client.HTTPConnection, target: str, headers: dict[str, str]):
+        conn.request("GET", target, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        response_headers = {name.lower(): value for name, value in response.getheaders()}
+        return response.status, response.reason, response_headers, body, response.will_close
+
+    def get_many(
+        self, urls: list[str], timeout: float = DEFAULT_TIMEOUT, validators: list | None = None
+    ) -> list[Response | HttpError]:
+        """Fetch urls concurrently; results (a Response or the HttpError raised) in the same order.
+
+        validators, when given, holds each url's validators (or None) for conditional requests.
+        """
+
+        def fetch(url, url_validators):
+            try:
+                return self.get(url, timeout, url_validators)
+            except HttpError as e:
+                return e
+
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            return list(executor.map(fetch, urls, validators or [None] * len(urls)))
+
+    def close(self):
+        """Close the idle connections."""
+        with self._lock:
+            idle = [conn for conns in self._idle.values() for conn in conns]
+            self._idle.clear()
+        for conn in idle:
+            conn.close()
+
+
+_client: HttpClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """The client shared by the plugin's API calls."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
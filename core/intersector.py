@@ -1,107 +1,678 @@
+import dataclasses
+import hashlib
+import re
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
 from qgis.core import (
     QgsCoordinateReferenceSystem,
     QgsCoordinateTransform,
+    QgsExpression,
     QgsFeature,
     QgsFeatureRequest,
+    QgsFeedback,
+    QgsFields,
     QgsGeometry,
-    QgsLayerTreeGroup,
     QgsLayerTreeLayer,
+    QgsOgcUtils,
     QgsProject,
+    QgsRectangle,
     QgsVectorLayer,
+    QgsVectorLayerFeatureSource,
     QgsWkbTypes,
 )
+from qgis.PyQt.QtXml import QDomDocument  # noqa: UP035
+
+from .clip import MAX_PENDING_CLIPS, CommuneClipper, clip_fields
+from .coverage import CoverageIndex, get_coverage_index
+from .geometry import CROSSING, INSIDE, GeometryVariantCache, get_variant_cache
+from .layer_registry import get_layer_registry
+from .netstats import TransferMeter
+from .source_groups import FanOutSink, SourceMember, source_key
+from .wfs_capabilities import get_capabilities, prefetch_capabilities
+from .wfs_paging import DEFAULT_PAGE_SIZE, PageError, iter_pages, resume_cursor, suspend_cursor
+
+COMMUNE_CRS = "EPSG:4326"
+
+# Maximum number of concurrent feature requests sent to a single WFS host
+DEFAULT_MAX_PER_HOST = 4
+
+# Feature filtering modes: bbox request + local test, or OGC Intersects filter sent to the server
+FILTER_BBOX = "bbox"
+FILTER_SERVER = "server"
+
+# LayerStats.mode of layers ruled out by their coverage (see core.coverage): nothing is requested
+MODE_SKIPPED = "skipped"
+
+# Layer tree group of the result layers, and the layer property holding their fingerprint
+RESULT_GROUP = "Résultats secateur"
+FINGERPRINT_PROPERTY = "secateur/fingerprint"
+
+# Server filter polygon simplification, as a fraction of the commune bbox largest side.
+# Keeps the filter short enough for a GET request; the local exact test still runs.
+SERVER_FILTER_SIMPLIFY = 0.002
 
 
 def find_wfs_layers() -> list[QgsVectorLayer]:
-    """Return visible WFS vector layers by walking the full layer tree."""
-    root = QgsProject.instance().layerTreeRoot()
-    results = []
-    _collect_wfs_layers(root, results)
-    return results
-
-
-def _collect_wfs_layers(group: QgsLayerTreeGroup, out: list[QgsVectorLayer]):
-    for child in group.children():
-        if isinstance(child, QgsLayerTreeGroup):
-            if child.isVisible():
-                _collect_wfs_layers(child, out)
-        elif isinstance(child, QgsLayerTreeLayer):
-            if not child.isVisible():
-                continue
-            layer = child.layer()
-            if isinstance(layer, QgsVectorLayer) and _is_wfs(layer):
-                out.append(layer)
-
-
-def _is_wfs(layer: QgsVectorLayer) -> bool:
-    if layer.providerType().upper() == "WFS":
-        return True
-    # Some WFS layers are loaded via OGR — check source URI
-    src = layer.source().lower()
-    return "service=wfs" in src or "/wfs?" in src or "/wfs/" in src
+    """Return visible WFS vector layers, in layer tree order (see core.layer_registry)."""
+    return get_layer_registry().wfs_layers()
+
+
+def _layer_host(layer: QgsVectorLayer) -> str:
+    """Return the host serving the layer, used to bound per-server concurrency."""
+    match = re.search(r"https?://([^/?'\"\s]+)", layer.source(), re.IGNORECASE)
+    return match.group(1).lower() if match else ""
+
+
+@dataclass
+class LayerStats:
+    """What a layer cost to query: filter mode actually used, transfer volume and timings.
+
+    http_seconds adds up the layer's network requests; fetch_seconds is the time spent
+    waiting for the provider's features (network, server and parsing), test_seconds the
+    intersects tests (and clipping, and streaming to a sink), build_seconds building
+    the result layer. Timings are in seconds. pages and retries count the GetFeature
+    pages of paged WFS fetches (see core.wfs_paging); error is set when a page still
+    failed after its retries, in which case the layer's results are partial.
+    fetched_by names the layer whose fetch also served this one (see run_source_group):
+    the shared fetch's volume and timings are only counted in that layer's stats.
+    """
+
+    mode: str = FILTER_BBOX
+    features_fetched: int = 0
+    features_kept: int = 0
+    bytes_received: int = 0
+    http_seconds: float = 0.0
+    fetch_seconds: float = 0.0
+    test_seconds: float = 0.0
+    build_seconds: float = 0.0
+    pages: int = 0
+    retries: int = 0
+    error: str = ""
+    fetched_by: str = ""
+
+
+@dataclass
+class LayerJob:
+    """Everything a worker thread needs to intersect one layer.
+
+    Built on the main thread: the feature source is a thread-safe snapshot of the
+    layer, so workers never touch the QgsVectorLayer itself. source_fields are the
+    layer's own fields, fields those of the results (with clip attributes if any).
+    page_size is the COUNT of paged WFS requests, 0 to leave paging to the provider.
+    url and wgs84_extent (the layer extent, in WGS84) come from the layer registry,
+    for WFS layers only. Jobs with the same source_key share one fetch (see
+    run_source_group); "" for layers that can't. digest hashes the job's matches as they
+    are collected or written (see digest_match and result_fingerprint).
+    """
+
+    index: int
+    name: str
+    host: str
+    source: QgsVectorLayerFeatureSource
+    fields: QgsFields
+    wkb_type: int
+    crs: QgsCoordinateReferenceSystem
+    transform: QgsCoordinateTransform | None
+    provider: str = ""
+    uri: str = ""
+    typename: str = ""
+    subset: str = ""
+    filter_mode: str = FILTER_BBOX
+    clip: bool = False
+    source_fields: QgsFields | None = None
+    page_size: int = DEFAULT_PAGE_SIZE
+    url: str = ""
+    wgs84_extent: QgsRectangle | None = None
+    source_key: str = ""
+    stats: LayerStats = field(default_factory=LayerStats)
+    digest: "hashlib._Hash" = field(default_factory=hashlib.sha1, repr=False, compare=False)
+
+    def digest_match(self, feat: QgsFeature):
+        """Add a match (WKB geometry and attributes) to the job's result fingerprint."""
+        self.digest.update(bytes(feat.geometry().asWkb()))
+        self.digest.update(repr(feat.attributes()).encode())
+
+
+def prepare_layer_jobs(
+    layers: list[QgsVectorLayer],
+    filter_mode: str = FILTER_BBOX,
+    clip: bool = False,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> list[LayerJob]:
+    """Snapshot layers into LayerJobs. Must be called from the main thread.
+
+    With clip, results are cut to the commune: jobs get multi-part geometries and the
+    extra measurement fields of core.clip.clip_fields.
+    """
+    commune_crs = QgsCoordinateReferenceSystem(COMMUNE_CRS)
+    registry = get_layer_registry()
+    # One transform per CRS, shared by the layers using it
+    transforms: dict[str, QgsCoordinateTransform] = {}
+    jobs = []
+    for i, layer in enumerate(layers):
+        info = registry.info(layer)
+        layer_crs = layer.crs()
+        transform = None
+        if layer_crs != commune_crs:
+            crs_key = layer_crs.authid() or layer_crs.toWkt()
+            if crs_key not in transforms:
+                transforms[crs_key] = QgsCoordinateTransform(commune_crs, layer_crs, QgsProject.instance())
+            transform = transforms[crs_key]
+        source_fields = layer.fields()
+        fields = source_fields
+        wkb_type = layer.wkbType()
+        if clip:
+            fields = QgsFields(fields)
+            for extra in clip_fields(wkb_type):
+                fields.append(extra)
+            wkb_type = QgsWkbTypes.multiType(wkb_type)
+        jobs.append(
+            LayerJob(
+                index=i,
+                name=layer.name(),
+                host=info.host if info is not None else _layer_host(layer),
+                source=QgsVectorLayerFeatureSource(layer),
+                fields=fields,
+                wkb_type=wkb_type,
+                crs=layer_crs,
+                transform=transform,
+                provider=layer.providerType(),
+                uri=layer.source(),
+                typename=info.typename if info is not None else "",
+                subset=layer.subsetString(),
+                filter_mode=filter_mode,
+                clip=clip,
+                source_fields=source_fields,
+                page_size=page_size,
+                url=info.url if info is not None else "",
+                wgs84_extent=info.extent() if info is not None else None,
+                source_key=source_key(layer, info),
+            )
+        )
+    return jobs
+
+
+def _server_filter_expression(filter_geom: QgsGeometry) -> str:
+    """Build an intersects() expression from a polygon covering the commune (see simplified_cover)."""
+    return f"intersects($geometry, geom_from_wkt('{filter_geom.asWkt()}'))"
+
+
+def _server_filtered_source(
+    job: LayerJob, filter_geom: QgsGeometry, feedback: QgsFeedback | None = None
+) -> QgsVectorLayer | None:
+    """Return a private WFS layer clone filtered server-side, or None if the layer can't be.
+
+    Only native WFS layers without their own subset string, on services supporting
+    Intersects filters, qualify; the provider translates the expression into an OGC filter.
+    """
+    if job.provider.upper() != "WFS" or job.subset:
+        return None
+    capabilities = get_capabilities(job.url, feedback=feedback)
+    if capabilities is not None and not capabilities.server_filter:
+        return None
+    expression = _server_filter_expression(filter_geom)
+    ogc_filter, _error = QgsOgcUtils.expressionToOgcFilter(QgsExpression(expression), QDomDocument())
+    if ogc_filter.isNull():
+        return None
+    clone = QgsVectorLayer(job.uri, job.name, "WFS")
+    if not clone.isValid() or not clone.setSubsetString(expression):
+        return None
+    return clone
+
+
+def _page_size(job: LayerJob, feedback: QgsFeedback | None = None) -> int:
+    """COUNT of a bbox-mode job's explicit pages, or 0 when the WFS provider fetches it."""
+    if job.page_size <= 0 or job.provider.upper() != "WFS" or not job.typename or job.subset:
+        return 0
+    capabilities = get_capabilities(job.url, feedback=feedback)
+    if capabilities is None or not capabilities.paging:
+        return 0
+    # Servers cap pages at their default count: a smaller page would look like the last one
+    return min(job.page_size, capabilities.max_features or job.page_size)
+
+
+def _resume_key(job: LayerJob, local_geom: QgsGeometry, page_size: int) -> str:
+    digest = hashlib.sha1()
+    for part in (job.uri, "clip" if job.clip else "", str(page_size)):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(bytes(local_geom.asWkb()))
+    return digest.hexdigest()
+
+
+def run_layer_job(
+    job: LayerJob,
+    commune_geom: QgsGeometry,
+    feedback: QgsFeedback | None = None,
+    sink_factory=None,
+    variants: GeometryVariantCache | None = None,
+) -> list[QgsFeature]:
+    """Fetch and test the features of one layer. Safe to call from any thread.
+
+    Cancelling feedback aborts the pending network request and returns early.
+    With sink_factory, matches are streamed to sink_factory(job).add(feature) as they
+    are found and nothing is kept in memory: the returned list is empty.
+    With job.clip, features inside the commune are kept whole and crossing ones are
+    clipped in the shared clip pool, at most MAX_PENDING_CLIPS at a time, and kept in
+    submission order; both get the clip measurement attributes.
+    The commune's reprojection, server filter polygon and matcher come from variants
+    (default: the shared cache), so layers in the same CRS only build them once.
+    In bbox mode, WFS layers whose server supports it are fetched page by page (see
+    core.wfs_paging), each page tested while the next one downloads. When a page keeps
+    failing, the matches so far are returned, job.stats.error is set and, without a
+    sink, the progress is kept (matches included): the next run of the same layer and
+    commune resumes at the failed page. Sinks write each match once and keep none, so
+    an interrupted fetch with a sink restarts from the first page next time.
+    """
+    variant = (variants or get_variant_cache()).get(commune_geom, job.crs, job.transform)
+    local_geom = variant.geom
+
+    source = None
+    if job.filter_mode == FILTER_SERVER:
+        source = _server_filtered_source(job, variant.simplified(SERVER_FILTER_SIMPLIFY), feedback)
+    cursor = None
+    if source is not None:
+        job.stats.mode = FILTER_SERVER
+        request = QgsFeatureRequest()
+    else:
+        job.stats.mode = FILTER_BBOX
+        source = job.source
+        request = QgsFeatureRequest().setFilterRect(local_geom.boundingBox())
+        page_size = _page_size(job, feedback)
+        if page_size:
+            resume_key = _resume_key(job, local_geom, page_size)
+            cursor = resume_cursor(resume_key)
+    if feedback is not None:
+        request.setFeedback(feedback)
+
+    if cursor is not None:
+        pages = iter_pages(
+            job.uri,
+            job.typename,
+            job.crs,
+            local_geom.boundingBox(),
+            job.source_fields or job.fields,
+            cursor,
+            page_size,
+            feedback,
+        )
+        features = (feat for page in pages for feat in page)
+    else:
+        features = source.getFeatures(request)
+
+    clipper = CommuneClipper(local_geom, job.fields, job.wkb_type, job.crs) if job.clip else None
+    sink = sink_factory(job) if sink_factory is not None else None
+    # Paged fetches without a sink record their matches in the cursor, in case they have to resume
+    matching = cursor.matches if cursor is not None and sink is None else []
+    crossing = deque()
+    fetched = 0
+    kept = len(cursor.matches) if cursor is not None else 0
+    if cursor is not None:
+        # Resumed matches go first; a sink takes them over from the cursor
+        for feat in cursor.matches:
+            if sink is not None:
+                sink.add(feat)
+            else:
+                job.digest_match(feat)
+        if sink is not None:
+            cursor.matches = []
+
+    def keep(feat):
+        nonlocal kept
+        kept += 1
+        if sink is not None:
+            sink.add(feat)
+        else:
+            job.digest_match(feat)
+            matching.append(QgsFeature(feat))
+
+    def drain(pending: int):
+        # Oldest first, so results come in the same order from run to run
+        while len(crossing) > pending:
+            clipped = crossing.popleft().result()
+            if clipped is not None:
+                keep(clipped)
+
+    def test(feat, matcher):
+        if not feat.hasGeometry():
+            return
+        if clipper is None:
+            if matcher.intersects(feat.geometry()):
+                keep(feat)
+            return
+        position = matcher.classify(feat.geometry())
+        if position == INSIDE:
+            keep(clipper.inside(feat))
+        elif position == CROSSING:
+            crossing.append(clipper.submit(feat))
+            drain(MAX_PENDING_CLIPS)
+
+    stats = job.stats
+    try:
+        with variant.matcher() as matcher:
+            last = time.perf_counter()
+            try:
+                for feat in features:
+                    start = time.perf_counter()
+                    stats.fetch_seconds += start - last
+                    if feedback is not None and feedback.isCanceled():
+                        return []
+                    fetched += 1
+                    test(feat, matcher)
+                    last = time.perf_counter()
+                    stats.test_seconds += last - start
+            except PageError as e:
+                if feedback is not None and feedback.isCanceled():
+                    return []
+                stats.error = str(e)
+            stats.fetch_seconds += time.perf_counter() - last
+        start = time.perf_counter()
+        while crossing:
+            if feedback is not None and feedback.isCanceled():
+                return []
+            drain(len(crossing) - 1)
+        stats.test_seconds += time.perf_counter() - start
+    finally:
+        for future in crossing:
+            future.cancel()
+        if sink is not None:
+            sink.close()
+    if cursor is not None:
+        stats.pages = cursor.pages
+        stats.retries = cursor.retries
+        stats.bytes_received = cursor.bytes_received
+        stats.http_seconds = cursor.http_seconds
+        if stats.error and sink is None:
+            suspend_cursor(resume_key, cursor)
+    stats.features_fetched = fetched
+    stats.features_kept = kept
+    return matching
+
+
+def _shared_job(jobs: list[LayerJob]) -> LayerJob | None:
+    """A job fetching the features of all jobs of a group, None if their source can't be opened.
+
+    Its subset is the members' one when they all have the same, else none: a member
+    without subset lends its feature source, or the source is reopened unfiltered.
+    """
+    leader = next((job for job in jobs if not job.subset), jobs[0])
+    subset = leader.subset if len({job.subset for job in jobs}) == 1 else ""
+    source, uri = leader.source, leader.uri
+    if leader.subset and not subset:
+        layer = QgsVectorLayer(leader.uri, leader.name, leader.provider)
+        if not layer.isValid() or not layer.setSubsetString(""):
+            return None
+        source, uri = QgsVectorLayerFeatureSource(layer), layer.source()
+    return dataclasses.replace(leader, source=source, uri=uri, subset=subset, stats=LayerStats(), digest=hashlib.sha1())
+
+
+def run_source_group(
+    jobs: list[LayerJob],
+    commune_geom: QgsGeometry,
+    feedback: QgsFeedback | None = None,
+    sink_factory=None,
+) -> list[tuple[LayerJob, list[QgsFeature]]]:
+    """Run jobs reading the same source (same source_key) with a single fetch and test.
+
+    The shared matches go to each job through its subset expression, evaluated locally,
+    and onto its fields. The first job gets the shared fetch's stats with its own kept
+    count; the others only its mode, pages and error, so the download is counted once.
+    Returns (job, features) per job; features are empty with sink_factory, as with
+    run_layer_job.
+    """
+    shared = _shared_job(jobs) if len(jobs) > 1 else None
+    if shared is None:
+        return [(job, run_layer_job(job, commune_geom, feedback, sink_factory)) for job in jobs]
+    members = [
+        SourceMember(
+            job,
+            shared.fields,
+            job.subset if job.subset != shared.subset else "",
+            sink_factory(job) if sink_factory is not None else None,
+        )
+        for job in jobs
+    ]
+    run_layer_job(shared, commune_geom, feedback, lambda _job: FanOutSink(members))
+    leader = members[0].job
+    for member in members:
+        if member.job is leader:
+            member.job.stats = dataclasses.replace(shared.stats, features_kept=member.count)
+        else:
+            member.job.stats = LayerStats(
+                mode=shared.stats.mode,
+                features_kept=member.count,
+                pages=shared.stats.pages,
+                retries=shared.stats.retries,
+                error=shared.stats.error,
+                fetched_by=leader.name,
+            )
+    return [(member.job, member.features) for member in members]
+
+
+def run_layer_jobs(
+    jobs: list[LayerJob],
+    commune_geom: QgsGeometry,
+    max_per_host: int = DEFAULT_MAX_PER_HOST,
+    feedback: QgsFeedback | None = None,
+    sink_factory=None,
+    coverage: CoverageIndex | None = None,
+):
+    """Run jobs concurrently and yield (job, features) as each layer finishes.
+
+    Jobs that coverage (default: the shared index) rules out for the commune are
+    yielded first, empty and without any feature request. Jobs reading the same
+    source (same source_key) are fetched once, together (see run_source_group). Each
+    host gets its own bounded pool, so slow servers don't hold back others and no
+    server receives more than max_per_host simultaneous requests. Stops yielding once
+    feedback is cancelled. sink_factory is passed on to run_layer_job.
+    """
+    coverage = coverage or get_coverage_index()
+    prefetch_capabilities({job.url for job in jobs}, feedback=feedback)
+    groups: dict[str, list[LayerJob]] = {}
+    for job in jobs:
+        if coverage.excluded(job, commune_geom, feedback):
+            job.stats.mode = MODE_SKIPPED
+            yield job, []
+        else:
+            groups.setdefault(job.source_key or f"#{job.index}", []).append(job)
+    by_host: dict[str, list[list[LayerJob]]] = {}
+    for group in groups.values():
+        by_host.setdefault(group[0].host, []).append(group)
+
+    executors = [ThreadPoolExecutor(max_workers=max(1, max_per_host)) for _ in by_host]
+    try:
+        futures: list[Future] = []
+        for executor, host_groups in zip(executors, by_host.values(), strict=True):
+            for group in host_groups:
+                futures.append(executor.submit(run_source_group, group, commune_geom, feedback, sink_factory))
+        for future in as_completed(futures):
+            if feedback is not None and feedback.isCanceled():
+                return
+            for job, features in future.result():
+                coverage.learn(job, commune_geom)
+                yield job, features
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def build_result_layer(job: LayerJob, features: list[QgsFeature]) -> QgsVectorLayer:
+    """Create the memory layer holding a job's matching features (main thread)."""
+    start = time.perf_counter()
+    geom_type_str = QgsWkbTypes.displayString(job.wkb_type)
+    mem_layer = QgsVectorLayer(
+        f"{geom_type_str}?crs={job.crs.authid()}",
+        f"{job.name} — résultat",
+        "memory",
+    )
+    mem_provider = mem_layer.dataProvider()
+    mem_provider.addAttributes(job.fields.toList())
+    mem_layer.updateFields()
+
+    new_features = []
+    for feat in features:
+        new_feat = QgsFeature(mem_layer.fields())
+        new_feat.setGeometry(feat.geometry())
+        new_feat.setAttributes(feat.attributes())
+        new_features.append(new_feat)
+    mem_provider.addFeatures(new_features)
+    mem_layer.updateExtents()
+    job.stats.build_seconds = time.perf_counter() - start
+    return mem_layer
 
 
 def intersect_commune(
     commune_geom: QgsGeometry,
     layers: list[QgsVectorLayer],
     progress_callback=None,
+    max_per_host: int = DEFAULT_MAX_PER_HOST,
+    feedback: QgsFeedback | None = None,
+    filter_mode: str = FILTER_BBOX,
+    stats_callback=None,
+    result_cache=None,
+    code_insee: str = "",
+    result_store=None,
+    clip: bool = False,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    coverage: CoverageIndex | None = None,
 ) -> list[QgsVectorLayer]:
-    """Intersect commune geometry against each layer. Returns memory layers with matching features."""
-    commune_crs = QgsCoordinateReferenceSystem("EPSG:4326")
-    results = []
-    for i, layer in enumerate(layers):
-        if progress_callback:
-            progress_callback(i, len(layers), layer.name())
+    """Intersect commune geometry against each layer. Returns memory layers with matching features.
 
-        # Reproject commune geometry to layer CRS
-        layer_crs = layer.crs()
-        if layer_crs != commune_crs:
-            transform = QgsCoordinateTransform(commune_crs, layer_crs, QgsProject.instance())
-            local_geom = QgsGeometry(commune_geom)
-            local_geom.transform(transform)
+    Layers are queried concurrently (see run_layer_jobs); results keep the input order.
+    progress_callback(done, total, name) is called each time a layer finishes.
+    With filter_mode=FILTER_SERVER, WFS layers are filtered server-side when possible.
+    stats_callback(name, LayerStats) is called for every layer once the run is over.
+    With a result_cache (core.result_cache.ResultCache), only layers without a fresh
+    cached result for code_insee are fetched.
+    With a result_store (core.result_store.ResultStore), matches are written to its
+    GeoPackage as they are found and the returned layers read from it, instead of
+    memory layers holding a copy of every match.
+    With clip, results are cut to the commune and carry area/length/share attributes.
+    page_size is the size of paged WFS requests (0: let the provider fetch). coverage
+    is passed on to run_layer_jobs.
+    """
+    jobs = prepare_layer_jobs(layers, filter_mode, clip, page_size)
+    total = len(jobs)
+
+    def runner(pending):
+        if result_store is None:
+            return run_layer_jobs(pending, commune_geom, max_per_host, feedback, coverage=coverage)
+        results = run_layer_jobs(pending, commune_geom, max_per_host, feedback, result_store.sink, coverage)
+        # Read back lazily, only if the result cache stores them
+        return ((job, result_store.features(job)) for job, _features in results)
+
+    finished: dict[int, QgsVectorLayer] = {}
+    with TransferMeter() as meter:
+        if result_cache is not None:
+            results = result_cache.run_jobs(code_insee, jobs, commune_geom, runner, feedback)
         else:
-            local_geom = commune_geom
+            results = runner(jobs)
+        for done, (job, features) in enumerate(results, start=1):
+            if result_store is not None:
+                # Cache hits still have to be written; streamed jobs already are
+                result_store.write(job, features)
+                layer = result_store.layer(job)
+                if layer is not None:
+                    finished[job.index] = layer
+            elif features:
+                finished[job.index] = build_result_layer(job, features)
+            if progress_callback:
+                progress_callback(done, total, job.name)
 
-        geom_type_str = QgsWkbTypes.displayString(layer.wkbType())
-        mem_layer = QgsVectorLayer(
-            f"{geom_type_str}?crs={layer.crs().authid()}",
-            f"{layer.name()} — résultat",
-            "memory",
-        )
-        mem_provider = mem_layer.dataProvider()
-        mem_provider.addAttributes(layer.fields().toList())
-        mem_layer.updateFields()
+    record_transfer_stats(jobs, meter)
+    if stats_callback:
+        for job in jobs:
+            stats_callback(job.name, job.stats)
 
-        request = QgsFeatureRequest().setFilterRect(local_geom.boundingBox())
-        matching = []
-        for feat in layer.getFeatures(request):
-            if feat.hasGeometry() and local_geom.intersects(feat.geometry()):
-                new_feat = QgsFeature(mem_layer.fields())
-                new_feat.setGeometry(feat.geometry())
-                new_feat.setAttributes(feat.attributes())
-                matching.append(new_feat)
+    return [finished[i] for i in sorted(finished)]
 
-        if matching:
-            mem_provider.addFeatures(matching)
-            mem_layer.updateExtents()
-            results.append(mem_layer)
 
-    if progress_callback:
-        progress_callback(len(layers), len(layers), "")
+def record_transfer_stats(jobs: list[LayerJob], meter: TransferMeter):
+    """Copy the bytes and request time measured by meter into the stats of provider fetches.
 
-    return results
+    Paged fetches measure their own requests (see core.wfs_paging), and layers served
+    by another one's fetch have nothing to count. meter tells requests apart by host
+    and typename only: jobs sharing them get the totals on the first one, zero on the
+    others.
+    """
+    seen = set()
+    for job in jobs:
+        if job.stats.pages or job.stats.fetched_by:
+            continue
+        key = (job.host, job.typename)
+        first = key not in seen
+        seen.add(key)
+        job.stats.bytes_received = meter.bytes_for(*key) if first else 0
+        job.stats.http_seconds = meter.seconds_for(*key) if first else 0.0
 
 
-def add_results_to_project(result_layers: list[QgsVectorLayer]):
-    """Add result layers to the project under a 'Résultats secateur' group."""
-    root = QgsProject.instance().layerTreeRoot()
+def result_fingerprint(job: LayerJob) -> str:
+    """Fingerprint of a finished job's result: schema, CRS and matches, in order (see LayerJob.digest).
 
-    group = root.findGroup("Résultats secateur")
-    if group:
-        group.removeAllChildren()
-    else:
-        group = root.insertGroup(0, "Résultats secateur")
+    Matches are hashed as they are kept, on the worker threads; used by add_results_to_project.
+    """
+    return f"{job.wkb_type}:{job.crs.authid()}:{','.join(job.fields.names())}:{job.digest.hexdigest()}"
+
+
+def _result_keys(layers) -> list[tuple[str, int]]:
+    """(name, rank among layers of that name): matches a new result with the one it replaces."""
+    seen: dict[str, int] = {}
+    keys = []
+    for layer in layers:
+        seen[layer.name()] = seen.get(layer.name(), -1) + 1
+        keys.append((layer.name(), seen[layer.name()]))
+    return keys
+
+
+def add_results_to_project(
+    result_layers: list[QgsVectorLayer], fingerprints: list[str], canvas=None
+) -> list[QgsVectorLayer]:
+    """Show result layers in the project's 'Résultats secateur' group, replacing the previous ones.
+
+    fingerprints holds each layer's result_fingerprint. Results with the same fingerprint
+    as the layer already shown under the same name keep the existing layer, with its
+    style and tree state. The others are added in one batch, stale layers removed in one
+    batch and the group rebuilt in result order with one layer tree insertion, with
+    canvas (a QgsMapCanvas, if given) frozen meanwhile. Returns the layers now shown.
+    """
+    project = QgsProject.instance()
+    root = project.layerTreeRoot()
+    group = root.findGroup(RESULT_GROUP)
+    if group is None:
+        group = root.insertGroup(0, RESULT_GROUP)
+
+    shown = [node.layer() for node in group.findLayers() if isinstance(node.layer(), QgsVectorLayer)]
+    previous = dict(zip(_result_keys(shown), shown, strict=True))
+    layers = []
+    added = []
+    for key, layer, fingerprint in zip(_result_keys(result_layers), result_layers, fingerprints, strict=True):
+        old = previous.get(key)
+        if old is not None and old.customProperty(FINGERPRINT_PROPERTY) == fingerprint:
+            layers.append(old)
+            continue
+        layer.setCustomProperty(FINGERPRINT_PROPERTY, fingerprint)
+        layers.append(layer)
+        added.append(layer)
+    kept = {layer.id() for layer in layers}
 
-    for layer in result_layers:
-        QgsProject.instance().addMapLayer(layer, False)
-        group.addLayer(layer)
+    if canvas is not None:
+        canvas.freeze(True)
+    try:
+        project.removeMapLayers([layer.id() for layer in shown if layer.id() not in kept])
+        project.addMapLayers(added, False)
+        nodes = []
+        for layer in layers:
+            node = group.findLayer(layer.id())
+            nodes.append(node.clone() if node is not None else QgsLayerTreeLayer(layer))
+        # New nodes first, then the old ones go: kept layers never leave the tree
+        stale = len(group.children())
+        group.insertChildNodes(0, nodes)
+        group.removeChildren(len(nodes), stale)
+    finally:
+        if canvas is not None:
+            canvas.freeze(False)
+            canvas.refresh()
+    return layers
@@ -0,0 +1,229 @@
+import contextlib
+import functools
+import urllib.parse
+from dataclasses import dataclass
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsCsException,
+    QgsDataSourceUri,
+    QgsLayerTreeGroup,
+    QgsLayerTreeLayer,
+    QgsMapLayer,
+    QgsProject,
+    QgsProviderRegistry,
+    QgsRectangle,
+    QgsVectorLayer,
+)
+from qgis.PyQt.QtCore import QObject  # noqa: UP035
+
+from .wfs_capabilities import FeatureTypeCapabilities, ServiceCapabilities, cached_capabilities, get_capabilities
+
+WGS84 = "EPSG:4326"
+
+
+@dataclass
+class LayerInfo:
+    """A WFS layer of the project: service URL, typename, CRS and extent (in WGS84).
+
+    Service capabilities (server filter support, paging, max features, native CRS,
+    advertised extent) are fetched once per service, on first use.
+    """
+
+    layer_id: str
+    provider: str
+    url: str
+    typename: str
+    host: str
+    crs: QgsCoordinateReferenceSystem
+    wgs84_extent: QgsRectangle | None = None
+
+    def capabilities(self) -> ServiceCapabilities | None:
+        """The service's capabilities; may send a GetCapabilities request, so not from the main thread."""
+        return get_capabilities(self.url)
+
+    def feature_type(self) -> FeatureTypeCapabilities | None:
+        capabilities = self.capabilities()
+        return capabilities.feature_type(self.typename) if capabilities is not None else None
+
+    def extent(self) -> QgsRectangle | None:
+        """WGS84 extent: the advertised one once capabilities are known, else the layer's."""
+        capabilities = cached_capabilities(self.url)
+        feature_type = capabilities.feature_type(self.typename) if capabilities is not None else None
+        if feature_type is not None and feature_type.wgs84_extent is not None:
+            return feature_type.wgs84_extent
+        return self.wgs84_extent
+
+
+def _wfs_source(layer: QgsVectorLayer) -> tuple[str, str] | None:
+    """(service URL, typename) of a layer read from a WFS service, natively or through OGR."""
+    provider = layer.providerType().lower()
+    if provider == "wfs":
+        uri = QgsDataSourceUri(layer.source())
+        return uri.param("url"), uri.param("typename")
+    if provider != "ogr":
+        return None
+    parts = QgsProviderRegistry.instance().decodeUri("ogr", layer.source())
+    path = parts.get("path") or ""
+    if path[:4].upper() == "WFS:":
+        return path[4:], parts.get("layerName") or ""
+    parsed = urllib.parse.urlparse(path)
+    if parsed.scheme not in ("http", "https"):
+        return None
+    params = {k.lower(): v for k, v in urllib.parse.parse_qsl(parsed.query)}
+    if params.get("service", "").upper() != "WFS":
+        return None
+    return path, params.get("typenames") or params.get("typename") or parts.get("layerName") or ""
+
+
+def _wgs84_extent(layer: QgsVectorLayer) -> QgsRectangle | None:
+    extent = layer.extent()
+    if extent.isNull() or extent.isEmpty():
+        return None
+    transform = QgsCoordinateTransform(layer.crs(), QgsCoordinateReferenceSystem(WGS84), QgsProject.instance())
+    try:
+        return transform.transformBoundingBox(extent)
+    except QgsCsException:
+        return None
+
+
+def classify(layer: QgsMapLayer) -> LayerInfo | None:
+    """LayerInfo of a WFS-backed vector layer, None for any other layer."""
+    if not isinstance(layer, QgsVectorLayer):
+        return None
+    source = _wfs_source(layer)
+    if source is None:
+        return None
+    url, typename = source
+    return LayerInfo(
+        layer_id=layer.id(),
+        provider=layer.providerType(),
+        url=url,
+        typename=typename,
+        host=urllib.parse.urlparse(url).netloc.lower(),
+        crs=layer.crs(),
+        wgs84_extent=_wgs84_extent(layer),
+    )
+
+
+class LayerRegistry(QObject):
+    """Index of a project's WFS layers, kept up to date from project and layer tree signals.
+
+    Layers are classified once, when added (or when their source or CRS changes), and
+    the ordered list of visible WFS layers is only rebuilt after the layer tree
+    changed. Lives on the main thread; info() also classifies layers outside the project.
+    disconnect() detaches it from the project (plugin unload).
+    """
+
+    def __init__(self, project: QgsProject | None = None):
+        super().__init__()
+        self._project = project or QgsProject.instance()
+        self._infos: dict[str, LayerInfo | None] = {}
+        self._visible: list[str] | None = None
+        # (signal, slot) connected per layer, by layer id
+        self._layer_slots: dict[str, list] = {}
+        root = self._project.layerTreeRoot()
+        self._connections = [
+            (self._project.layersAdded, self._on_layers_added),
+            (self._project.layersWillBeRemoved, self._on_layers_removed),
+            (self._project.cleared, self._on_cleared),
+            (root.visibilityChanged, self._invalidate),
+            (root.addedChildren, self._invalidate),
+            (root.removedChildren, self._invalidate),
+        ]
+        self._on_layers_added(list(self._project.mapLayers().values()))
+        for signal, slot in self._connections:
+            signal.connect(slot)
+
+    def disconnect(self):
+        """Disconnect from the project, its layer tree and its layers."""
+        for signal, slot in self._connections:
+            signal.disconnect(slot)
+        self._connections = []
+        for layer_id in list(self._layer_slots):
+            self._disconnect_layer(layer_id)
+        self._infos.clear()
+        self._invalidate()
+
+    def _disconnect_layer(self, layer_id: str):
+        for signal, slot in self._layer_slots.pop(layer_id, []):
+            # The layer may already be gone, and its signals with it
+            with contextlib.suppress(RuntimeError, TypeError):
+                signal.disconnect(slot)
+
+    def _on_layers_added(self, layers):
+        for layer in layers:
+            self._infos[layer.id()] = classify(layer)
+            if isinstance(layer, QgsVectorLayer) and layer.id() not in self._layer_slots:
+                slot = functools.partial(self._reclassify, layer.id())
+                self._layer_slots[layer.id()] = [(layer.dataSourceChanged, slot), (layer.crsChanged, slot)]
+                layer.dataSourceChanged.connect(slot)
+                layer.crsChanged.connect(slot)
+        self._invalidate()
+
+    def _on_layers_removed(self, layer_ids):
+        for layer_id in layer_ids:
+            self._infos.pop(layer_id, None)
+            self._disconnect_layer(layer_id)
+        self._invalidate()
+
+    def _on_cleared(self):
+        for layer_id in list(self._layer_slots):
+            self._disconnect_layer(layer_id)
+        self._infos.clear()
+        self._invalidate()
+
+    def _reclassify(self, layer_id: str, *_args):
+        layer = self._project.mapLayer(layer_id)
+        if layer is not None:
+            self._infos[layer_id] = classify(layer)
+            self._invalidate()
+
+    def _invalidate(self, *_args):
+        self._visible = None
+
+    def info(self, layer: QgsMapLayer) -> LayerInfo | None:
+        """The layer's LayerInfo, None if it isn't a WFS layer."""
+        if layer.id() in self._infos:
+            return self._infos[layer.id()]
+        return classify(layer)
+
+    def wfs_layers(self) -> list[QgsVectorLayer]:
+        """Visible WFS layers, in layer tree order."""
+        if self._visible is None:
+            self._visible = []
+            self._collect(self._project.layerTreeRoot())
+        layers = (self._project.mapLayer(layer_id) for layer_id in self._visible)
+        return [layer for layer in layers if layer is not None]
+
+    def _collect(self, group: QgsLayerTreeGroup):
+        for child in group.children():
+            if isinstance(child, QgsLayerTreeGroup):
+                if child.isVisible():
+                    self._collect(child)
+            elif (
+                isinstance(child, QgsLayerTreeLayer)
+                and child.isVisible()
+                and self._infos.get(child.layerId()) is not None
+            ):
+                self._visible.append(child.layerId())
+
+
+_registry = None
+
+
+def get_layer_registry() -> LayerRegistry:
+    """The registry of the current project, created on first use (main thread)."""
+    global _registry
+    if _registry is None:
+        _registry = LayerRegistry()
+    return _registry
+
+
+def release_layer_registry():
+    """Disconnect the registry from the project and forget it (plugin unload)."""
+    global _registry
+    if _registry is not None:
+        _registry.disconnect()
+        _registry = None
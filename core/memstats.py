@@ -0,0 +1,71 @@
+import os
+import threading
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def current_rss() -> int | None:
+    """Resident memory of this process in bytes, or None where it can't be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class PeakMemory:
+    """Track the peak resident memory of the process between start() and stop().
+
+    A background thread samples the RSS every interval seconds. peak_delta is the
+    growth of the peak over the memory in use at start(), in bytes (None when the
+    RSS is unavailable on this platform). Also usable as a context manager.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.baseline = None
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.baseline = self.peak = current_rss()
+        if self.baseline is None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="secateur-peak-memory", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self._sample()
+
+    @property
+    def peak_delta(self) -> int | None:
+        if self.baseline is None or self.peak is None:
+            return None
+        return self.peak - self.baseline
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,82 @@
+import threading
+import time
+import urllib.parse
+
+from qgis.core import QgsNetworkAccessManager
+
+
+def request_key(url: str) -> tuple[str, str]:
+    """Return (host, typename) identifying which WFS layer a request belongs to."""
+    parsed = urllib.parse.urlparse(url)
+    params = {k.lower(): v for k, v in urllib.parse.parse_qsl(parsed.query)}
+    typename = params.get("typenames") or params.get("typename") or ""
+    return parsed.netloc.lower(), typename
+
+
+class TransferMeter:
+    """Count bytes received and request time over QgsNetworkAccessManager, grouped by (host, typename).
+
+    Network signals from every thread are relayed to the main-thread manager through
+    queued connections, so counts arrive as the main event loop runs, which the meter
+    never runs itself: read them once a background run is over. Requests made while
+    the main thread is blocked are missed; paged WFS fetches measure their own (see
+    core.wfs_paging). start()/stop() must be called from the main thread; also usable
+    as a context manager.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: dict[int, tuple[str, str]] = {}
+        self._received: dict[int, int] = {}
+        self._started: dict[int, float] = {}
+        self._durations: dict[int, float] = {}
+        self._nam = None
+
+    def start(self):
+        if self._nam is None:
+            self._nam = QgsNetworkAccessManager.instance()
+            self._nam.requestAboutToBeCreated.connect(self._on_request)
+            self._nam.downloadProgress.connect(self._on_progress)
+            self._nam.finished.connect(self._on_finished)
+
+    def stop(self):
+        if self._nam is not None:
+            self._nam.requestAboutToBeCreated.disconnect(self._on_request)
+            self._nam.downloadProgress.disconnect(self._on_progress)
+            self._nam.finished.disconnect(self._on_finished)
+            self._nam = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _on_request(self, params):
+        with self._lock:
+            self._keys[params.requestId()] = request_key(params.request().url().toString())
+            self._started[params.requestId()] = time.perf_counter()
+
+    def _on_progress(self, request_id, received, _total):
+        with self._lock:
+            self._received[request_id] = max(received, self._received.get(request_id, 0))
+
+    def _on_finished(self, reply):
+        with self._lock:
+            started = self._started.pop(reply.requestId(), None)
+            if started is not None:
+                self._durations[reply.requestId()] = time.perf_counter() - started
+
+    def seconds_for(self, host: str, typename: str) -> float:
+        """Total duration of the finished requests matching host and typename."""
+        with self._lock:
+            key = (host, typename)
+            return sum(d for request_id, d in self._durations.items() if self._keys.get(request_id) == key)
+
+    def bytes_for(self, host: str, typename: str) -> int:
+        """Total bytes received for requests matching host and typename."""
+        with self._lock:
+            key = (host, typename)
+            return sum(size for request_id, size in self._received.items() if self._keys.get(request_id) == key)
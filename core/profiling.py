@@ -0,0 +1,41 @@
+import csv
+import dataclasses
+import json
+
+# Column order of exported profiles
+PROFILE_FIELDS = [
+    "layer",
+    "mode",
+    "http_seconds",
+    "bytes_received",
+    "features_fetched",
+    "features_kept",
+    "fetch_seconds",
+    "test_seconds",
+    "build_seconds",
+    "pages",
+    "retries",
+    "error",
+    "fetched_by",
+]
+
+
+def profile_row(name: str, stats) -> dict:
+    """One layer's LayerStats as a flat dict, timings rounded to the millisecond."""
+    row = {"layer": name}
+    for key, value in dataclasses.asdict(stats).items():
+        row[key] = round(value, 3) if isinstance(value, float) else value
+    return row
+
+
+def write_profile(rows: list[dict], path: str) -> str:
+    """Write profile rows as CSV when path ends in .csv, as JSON otherwise."""
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=PROFILE_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"layers": rows}, f, ensure_ascii=False, indent=2)
+    return path
@@ -0,0 +1,260 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from osgeo import ogr
+from qgis.core import (
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsFeedback,
+    QgsGeometry,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+)
+
+from .intersector import LayerJob
+from .result_store import FID_COLUMN, restore_feature
+from .storage import connect, default_path
+from .wfs_capabilities import get_capabilities
+
+MODE_CACHE = "cache"
+
+DEFAULT_TTL = 7 * 24 * 3600
+# Entries kept at most, oldest dropped first (with their tables)
+DEFAULT_MAX_ENTRIES = 2000
+
+
+def _cacheable(job: LayerJob) -> bool:
+    """Whether a finished job's result can be cached.
+
+    Partial results (a page kept failing) are not, nor are empty ones unless they came
+    from explicit WFS pages (see core.wfs_paging): the WFS provider reports failed
+    requests as empty results.
+    """
+    stats = job.stats
+    return not stats.error and (stats.features_kept > 0 or stats.pages > 0)
+
+
+class ResultCache:
+    """Per-layer intersection results stored in a local GeoPackage.
+
+    Entries are keyed by (INSEE code, layer source URI, subset string, clip mode,
+    commune geometry hash). An entry is stale once older than ttl, or, when check_update_sequence is set,
+    once the WFS service advertises a different GetCapabilities updateSequence than when
+    it was stored (read from core.wfs_capabilities, refreshed once per refresh()).
+    clear() drops everything. Empty results are only cached when they come from
+    explicit WFS pages (see _cacheable). Each store drops expired entries and the
+    oldest ones beyond max_entries, with their tables.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ttl: float = DEFAULT_TTL,
+        check_update_sequence: bool = True,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = path or default_path("results.gpkg")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.check_update_sequence = check_update_sequence
+        self._lock = threading.Lock()
+        self._sequences: dict[str, str] = {}
+        self._create()
+
+    def _create(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if not os.path.exists(self.path):
+            # Must be a real GeoPackage for GDAL to add result tables to it
+            datasource = ogr.GetDriverByName("GPKG").CreateDataSource(self.path)
+            datasource = None  # noqa: F841 — closing flushes the file
+        with connect(self.path, timeout=10) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS secateur_results (
+                    key TEXT PRIMARY KEY,
+                    table_name TEXT,
+                    feature_count INTEGER NOT NULL,
+                    update_sequence TEXT NOT NULL DEFAULT '',
+                    created REAL NOT NULL
+                )
+                """
+            )
+
+    @staticmethod
+    def key(code_insee: str, job: LayerJob, commune_geom: QgsGeometry) -> str:
+        digest = hashlib.sha1()
+        for part in (code_insee, job.uri, job.subset, "clip" if job.clip else ""):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        digest.update(bytes(commune_geom.asWkb()))
+        return digest.hexdigest()
+
+    def _update_sequence(self, job: LayerJob, feedback: QgsFeedback | None = None) -> str:
+        """Current updateSequence of the job's service, asked again once per URL after refresh().
+
+        The refreshed capabilities replace the shared ones, so the run itself doesn't ask
+        again. Cancelling feedback aborts the request ("" is returned and not remembered).
+        """
+        url = job.url
+        if not url or not self.check_update_sequence:
+            return ""
+        with self._lock:
+            if url in self._sequences:
+                return self._sequences[url]
+        capabilities = get_capabilities(url, refresh=True, feedback=feedback)
+        sequence = capabilities.update_sequence if capabilities is not None else ""
+        if feedback is not None and feedback.isCanceled():
+            return sequence
+        with self._lock:
+            self._sequences[url] = sequence
+        return sequence
+
+    def refresh(self):
+        """Forget the updateSequence values seen so far, so the next lookup checks again."""
+        with self._lock:
+            self._sequences.clear()
+
+    def lookup(self, key: str, job: LayerJob, feedback: QgsFeedback | None = None) -> list[QgsFeature] | None:
+        """Return cached matching features for the job, or None on a miss or stale entry."""
+        with connect(self.path, timeout=10) as conn:
+            row = conn.execute(
+                "SELECT table_name, feature_count, update_sequence, created FROM secateur_results WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        table_name, feature_count, stored_sequence, created = row
+        if time.time() - created > self.ttl:
+            return None
+        current = self._update_sequence(job, feedback)
+        if current and stored_sequence and current != stored_sequence:
+            return None
+        if not feature_count:
+            return []
+
+        cached = QgsVectorLayer(f"{self.path}|layername={table_name}", job.name, "ogr")
+        if not cached.isValid():
+            return None
+        names = job.fields.names()
+        features = []
+        for feat in cached.getFeatures():
+            restored = restore_feature(feat, job.fields, names)
+            job.digest_match(restored)
+            features.append(restored)
+        return features
+
+    def store(self, key: str, job: LayerJob, features, feedback: QgsFeedback | None = None):
+        """Save a job's matching features (any iterable). Writes are serialized (single GeoPackage file)."""
+        table_name = f"r_{key[:20]}"
+        # Fetched now on a miss, so that the entry can be invalidated by the next one
+        sequence = self._update_sequence(job, feedback)
+        with self._lock:
+            count = self._write_table(table_name, job, features)
+            now = time.time()
+            with connect(self.path, timeout=10) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO secateur_results "
+                    "(key, table_name, feature_count, update_sequence, created) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        table_name if count else None,
+                        count,
+                        sequence,
+                        now,
+                    ),
+                )
+                stale = self._prune(conn, now)
+            # An empty result replacing a stored one leaves its table behind
+            if not count:
+                stale.append(table_name)
+            self._drop_tables(stale)
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> list[str]:
+        """Delete expired entries and the oldest beyond max_entries. Returns their table names."""
+        rows = conn.execute(
+            "SELECT key, table_name FROM secateur_results WHERE created < ? "
+            "UNION SELECT key, table_name FROM ("
+            "SELECT key, table_name FROM secateur_results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (now - self.ttl, self.max_entries),
+        ).fetchall()
+        conn.executemany("DELETE FROM secateur_results WHERE key = ?", [(key,) for key, _table in rows])
+        return [table for _key, table in rows if table]
+
+    def _drop_tables(self, table_names: list[str]):
+        """Delete result tables (those that exist) from the GeoPackage. Called with the lock held."""
+        if not table_names:
+            return
+        datasource = ogr.Open(self.path, update=1)
+        if datasource is None:
+            return
+        wanted = set(table_names)
+        # Backwards: indexes of the following layers shift on each deletion
+        for i in reversed(range(datasource.GetLayerCount())):
+            if datasource.GetLayerByIndex(i).GetName() in wanted:
+                datasource.DeleteLayer(i)
+        datasource = None  # noqa: F841 — closing flushes the file
+
+    def _write_table(self, table_name, job: LayerJob, features) -> int:
+        """Write features to table_name, created on the first one. Returns the number written."""
+        writer = None
+        count = 0
+        for feat in features:
+            if writer is None:
+                options = QgsVectorFileWriter.SaveVectorOptions()
+                options.driverName = "GPKG"
+                options.layerName = table_name
+                options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer
+                # Source layers may have their own "fid" attribute
+                options.layerOptions = [f"FID={FID_COLUMN}"]
+                writer = QgsVectorFileWriter.create(
+                    self.path,
+                    job.fields,
+                    job.wkb_type,
+                    job.crs,
+                    QgsCoordinateTransformContext(),
+                    options,
+                )
+            writer.addFeature(feat)
+            count += 1
+        del writer
+        return count
+
+    def run_jobs(
+        self,
+        code_insee: str,
+        jobs: list[LayerJob],
+        commune_geom: QgsGeometry,
+        runner,
+        feedback: QgsFeedback | None = None,
+    ):
+        """Yield (job, features): cache hits first, then runner(missed_jobs) results, stored as they come.
+
+        runner(missed_jobs) runs the jobs that missed, typically by calling run_layer_jobs.
+        Its features may be any iterable (e.g. read back from a ResultStore). Cancelling
+        feedback aborts the freshness checks' GetCapabilities requests.
+        """
+        keys = {job.index: self.key(code_insee, job, commune_geom) for job in jobs}
+        missed = []
+        for job in jobs:
+            features = self.lookup(keys[job.index], job, feedback)
+            if features is None:
+                missed.append(job)
+                continue
+            job.stats.mode = MODE_CACHE
+            job.stats.features_kept = len(features)
+            yield job, features
+        for job, features in runner(missed):
+            if _cacheable(job):
+                self.store(keys[job.index], job, features, feedback)
+            yield job, features
+
+    def clear(self):
+        """Drop every cached result (manual invalidation)."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._sequences.clear()
+            self._create()
@@ -0,0 +1,184 @@
+import atexit
+import contextlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from qgis.core import (
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+)
+
+RESULT_MEMORY = "memory"
+RESULT_GPKG = "gpkg"
+
+# Matches buffered per layer before being written, and read back at a time
+FLUSH_SIZE = 1000
+
+# Primary key of the result tables, named so that it can't clash with a source "fid" attribute
+FID_COLUMN = "secateur_fid"
+
+_session_dir = None
+
+
+def _session_path() -> str:
+    global _session_dir
+    if _session_dir is None or not os.path.isdir(_session_dir):
+        _session_dir = tempfile.mkdtemp(prefix="secateur-results-")
+    return os.path.join(_session_dir, f"resultats_{uuid.uuid4().hex[:8]}.gpkg")
+
+
+def _remove_session_dir():
+    if _session_dir is not None:
+        shutil.rmtree(_session_dir, ignore_errors=True)
+
+
+# Stores not removed during the session (e.g. results still shown) go at exit
+atexit.register(_remove_session_dir)
+
+
+def restore_feature(feat: QgsFeature, fields, names: list[str]) -> QgsFeature:
+    """A feature read from a result table, back on its job's fields (names: fields.names())."""
+    restored = QgsFeature(fields)
+    restored.setGeometry(feat.geometry())
+    restored.setAttributes([feat[name] for name in names])
+    return restored
+
+
+class _TableSink:
+    """Append one job's matches to its table, FLUSH_SIZE features at a time, adding them to its digest."""
+
+    def __init__(self, store: "ResultStore", job, digest: bool = True):
+        self._store = store
+        self._job = job
+        self._digest = digest
+        self._buffer = []
+        self.count = 0
+
+    def add(self, feat: QgsFeature):
+        if self._digest:
+            self._job.digest_match(feat)
+        self._buffer.append(QgsFeature(feat))
+        self.count += 1
+        if len(self._buffer) >= FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._store._append(self._job, self._buffer)
+            self._buffer = []
+
+    def close(self):
+        self._flush()
+        self._store._counts[self._job.index] = self.count
+
+
+class ResultStore:
+    """Intersection results in one GeoPackage, one table per layer, instead of memory layers.
+
+    Matches are written as they are found (sink() plugs into run_layer_job's
+    sink_factory), so they are never all held in memory; layer() then opens a table
+    as a regular layer for the project and the exporters. Writes to the file are
+    serialized. The default file lives in a temporary directory for the session and is
+    deleted by remove() once no layer reads it.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or _session_path()
+        self._lock = threading.Lock()
+        self._counts: dict[int, int] = {}
+
+    @staticmethod
+    def table_name(job) -> str:
+        return f"layer_{job.index}"
+
+    def sink(self, job) -> _TableSink:
+        return _TableSink(self, job)
+
+    def _append(self, job, features: list[QgsFeature]):
+        with self._lock:
+            options = QgsVectorFileWriter.SaveVectorOptions()
+            options.driverName = "GPKG"
+            options.layerName = self.table_name(job)
+            if not os.path.exists(self.path):
+                options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteFile
+            elif job.index in self._counts:
+                options.actionOnExistingFile = QgsVectorFileWriter.AppendToLayerNoNewFields
+            else:
+                options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer
+            # Source layers may have their own "fid" attribute
+            options.layerOptions = [f"FID={FID_COLUMN}"]
+            writer = QgsVectorFileWriter.create(
+                self.path, job.fields, job.wkb_type, job.crs, QgsCoordinateTransformContext(), options
+            )
+            if writer.hasError() != QgsVectorFileWriter.NoError:
+                raise RuntimeError(f"Écriture de {self.path} impossible : {writer.errorMessage()}")
+            writer.addFeatures(features)
+            del writer
+            # The table exists from now on: later flushes append to it
+            self._counts.setdefault(job.index, 0)
+
+    def write(self, job, features):
+        """Store already computed matches (e.g. result cache hits); no-op for jobs streamed via sink()."""
+        if job.index in self._counts:
+            return
+        # Already hashed where they come from (e.g. the result cache)
+        sink = _TableSink(self, job, digest=False)
+        for feat in features:
+            sink.add(feat)
+        sink.close()
+
+    def count(self, job) -> int:
+        return self._counts.get(job.index, 0)
+
+    def features(self, job):
+        """Iterate over a job's stored matches, read back from the file FLUSH_SIZE at a time.
+
+        The lock is only held while a chunk is read, not while the caller works on it,
+        so writers of other layers aren't blocked.
+        """
+        if not self.count(job):
+            return
+        with self._lock:
+            layer = QgsVectorLayer(f"{self.path}|layername={self.table_name(job)}", job.name, "ogr")
+        names = job.fields.names()
+        last = 0
+        while True:
+            request = QgsFeatureRequest().setFilterExpression(f'"{FID_COLUMN}" > {last}')
+            request.addOrderBy(f'"{FID_COLUMN}"')
+            request.setLimit(FLUSH_SIZE)
+            with self._lock:
+                chunk = list(layer.getFeatures(request))
+            for feat in chunk:
+                yield restore_feature(feat, job.fields, names)
+            if len(chunk) < FLUSH_SIZE:
+                return
+            last = chunk[-1].id()
+
+    def layer(self, job) -> QgsVectorLayer | None:
+        """Result layer of a job (main thread), or None when it had no match."""
+        if not self.count(job):
+            return None
+        start = time.perf_counter()
+        layer = QgsVectorLayer(f"{self.path}|layername={self.table_name(job)}", f"{job.name} — résultat", "ogr")
+        job.stats.build_seconds = time.perf_counter() - start
+        return layer
+
+    def owns(self, layer) -> bool:
+        """Whether layer reads one of this store's tables."""
+        return layer.providerType() == "ogr" and layer.source().split("|")[0] == self.path
+
+    def remove(self):
+        """Delete the GeoPackage; layers reading it must have been removed from the project."""
+        with self._lock:
+            for path in (self.path, self.path + "-wal", self.path + "-shm"):
+                # Still open elsewhere (Windows): left for the system's temporary files cleanup
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+            self._counts.clear()
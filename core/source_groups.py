@@ -0,0 +1,111 @@
+import urllib.parse
+
+from qgis.core import QgsExpression, QgsExpressionContext, QgsFeature, QgsFeatureRequest, QgsFields, QgsVectorLayer
+
+# Query parameters naming the request rather than the data, ignored when comparing service URLs
+_REQUEST_PARAMS = {"service", "request"}
+
+
+def normalize_url(url: str) -> str:
+    """Service URL with scheme and host lowercased, query parameters sorted and request ones dropped."""
+    parts = urllib.parse.urlsplit(url.strip())
+    query = sorted(
+        (key.lower(), value)
+        for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _REQUEST_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urllib.parse.urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), path, urllib.parse.urlencode(query), "")
+    )
+
+
+def local_filter_ok(subset: str, fields: QgsFields) -> bool:
+    """Whether a subset string can be evaluated as a QGIS expression on features with fields.
+
+    SQL subsets (SELECT ... of the WFS provider) and expressions on unknown fields can't.
+    """
+    if subset.lstrip()[:6].upper() == "SELECT":
+        return False
+    expression = QgsExpression(subset)
+    if expression.hasParserError():
+        return False
+    names = set(fields.names())
+    return all(
+        column in names for column in expression.referencedColumns() if column != QgsFeatureRequest.ALL_ATTRIBUTES
+    )
+
+
+def source_key(layer: QgsVectorLayer, info) -> str:
+    """Identity of the features a WFS layer reads: provider, normalised URL, typename and CRS.
+
+    Layers with the same key fetch the same features and only differ by their subset
+    string, applied locally (see SourceMember). "" for layers that can't share a fetch:
+    not WFS (info is their core.layer_registry.LayerInfo), with expression or joined
+    fields, or filtered by a subset string that isn't a plain expression.
+    """
+    if info is None or not info.url or not info.typename:
+        return ""
+    fields = layer.fields()
+    if any(fields.fieldOrigin(i) != QgsFields.OriginProvider for i in range(fields.count())):
+        return ""
+    subset = layer.subsetString()
+    if subset and not local_filter_ok(subset, fields):
+        return ""
+    crs = layer.crs()
+    return "\0".join((info.provider.lower(), normalize_url(info.url), info.typename, crs.authid() or crs.toWkt()))
+
+
+class SourceMember:
+    """One layer's share of a fetch made for several layers of the same source.
+
+    Features of the shared fetch (with fields) go through add(): those passing the
+    layer's subset expression are copied onto the layer's fields, matched by name, and
+    go to sink (or to features without one).
+    """
+
+    def __init__(self, job, fields: QgsFields, subset: str = "", sink=None):
+        self.job = job
+        self.sink = sink
+        self.features: list[QgsFeature] = []
+        self.count = 0
+        self._mapping = [fields.lookupField(job.fields.at(i).name()) for i in range(job.fields.count())]
+        self._expression = QgsExpression(subset) if subset else None
+        self._context = QgsExpressionContext()
+        self._context.setFields(fields)
+        if self._expression is not None:
+            self._expression.prepare(self._context)
+
+    def add(self, feat: QgsFeature):
+        if self._expression is not None:
+            self._context.setFeature(feat)
+            if not self._expression.evaluate(self._context):
+                return
+        copy = QgsFeature(self.job.fields, feat.id())
+        copy.setGeometry(feat.geometry())
+        copy.setAttributes([feat.attribute(i) if i >= 0 else None for i in self._mapping])
+        self.count += 1
+        if self.sink is not None:
+            self.sink.add(copy)
+        else:
+            self.job.digest_match(copy)
+            self.features.append(copy)
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
+
+
+class FanOutSink:
+    """Sink of a shared fetch (see intersector.run_layer_job): hands each match to every member."""
+
+    def __init__(self, members: list[SourceMember]):
+        self.members = members
+
+    def add(self, feat: QgsFeature):
+        for member in self.members:
+            member.add(feat)
+
+    def close(self):
+        for member in self.members:
+            member.close()
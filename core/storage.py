@@ -0,0 +1,24 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+from qgis.core import QgsApplication
+
+
+def default_path(name: str) -> str:
+    """Path of a plugin data file kept in the QGIS profile directory, under secateur/."""
+    return os.path.join(QgsApplication.qgisSettingsDirPath(), "secateur", name)
+
+
+@contextmanager
+def connect(path: str, timeout: float = 5):
+    """SQLite connection to path, committed (or rolled back) and closed on exit.
+
+    Each caller gets its own connection, so the stores built on it are safe across threads.
+    """
+    conn = sqlite3.connect(path, timeout=timeout)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,192 @@
+import time
+
+from qgis.core import QgsFeedback, QgsTask, QgsVectorLayer
+from qgis.PyQt.QtCore import pyqtSignal  # noqa: UP035
+
+from .batch import export_batch_to_csv, intersect_communes_batch
+from .commune_api import fetch_commune_geometries, fetch_commune_geometry, resolve_communes
+from .http_client import HttpError
+from .intersector import (
+    DEFAULT_MAX_PER_HOST,
+    FILTER_BBOX,
+    prepare_layer_jobs,
+    record_transfer_stats,
+    result_fingerprint,
+    run_layer_jobs,
+)
+from .memstats import PeakMemory
+from .netstats import TransferMeter
+
+
+class RunTask(QgsTask):
+    """Background "Interroger" pipeline: commune contour, then concurrent layer intersections.
+
+    Layer jobs are prepared in the constructor (main thread). Each finished layer is
+    streamed through layerFinished(job, features); memory layers are built by the
+    receiver on the main thread. cancel() aborts in-flight WFS requests via a QgsFeedback.
+    Per-layer LayerStats (job.stats) are complete once the task has finished. With a
+    result_cache, layers with a fresh cached result are streamed first, without network.
+    With a result_store, matches are written to its GeoPackage as they are found and
+    features only reads them back lazily, when the result cache stores them (see
+    ResultStore.features and ResultStore.write).
+    peak_memory is the growth of the process peak RSS during run(), in bytes. timings
+    holds the durations (s) of preparing the jobs, fetching the contour, getting the
+    first layer's result and the whole intersection. fingerprints holds each finished
+    job's result_fingerprint by job index, set before layerFinished is emitted.
+    """
+
+    stageChanged = pyqtSignal(str)
+    geometryReady = pyqtSignal(object)
+    layerFinished = pyqtSignal(object, object)
+
+    def __init__(
+        self,
+        code_insee: str,
+        layers: list[QgsVectorLayer],
+        max_per_host: int = DEFAULT_MAX_PER_HOST,
+        filter_mode: str = FILTER_BBOX,
+        result_cache=None,
+        result_store=None,
+        clip: bool = False,
+    ):
+        super().__init__(f"Secateur : interrogation {code_insee}", QgsTask.CanCancel)
+        self.code_insee = code_insee
+        start = time.perf_counter()
+        self.jobs = prepare_layer_jobs(layers, filter_mode, clip)
+        self.timings = {"prepare": time.perf_counter() - start}
+        self.max_per_host = max_per_host
+        self.result_cache = result_cache
+        self.result_store = result_store
+        self.peak_memory = None
+        self.fingerprints: dict[int, str] = {}
+        self.commune_geom = None
+        self.error = None
+        self._feedback = QgsFeedback()
+        # Connected here: network signals are delivered on the main thread
+        self._meter = TransferMeter()
+        self._meter.start()
+
+    def run(self) -> bool:
+        with PeakMemory() as memory:
+            try:
+                ok = self._run()
+            except Exception as e:
+                self.error = str(e)
+                ok = False
+        self.peak_memory = memory.peak_delta
+        return ok
+
+    def _run(self) -> bool:
+        self.stageChanged.emit("Récupération de la géométrie de la commune…")
+        start = time.perf_counter()
+        try:
+            geom = fetch_commune_geometry(self.code_insee)
+            self.timings["geometry"] = time.perf_counter() - start
+        except HttpError as e:
+            self.error = f"impossible de récupérer la géométrie ({e.message})."
+            return False
+        if self.isCanceled():
+            return False
+        if geom is None or geom.isEmpty():
+            self.error = "impossible de récupérer la géométrie."
+            return False
+        self.commune_geom = geom
+        self.geometryReady.emit(geom)
+
+        total = len(self.jobs)
+        self.stageChanged.emit(f"Intersection avec {total} couche(s) WFS…")
+
+        def runner(pending):
+            if self.result_store is None:
+                return run_layer_jobs(pending, geom, self.max_per_host, self._feedback)
+            results = run_layer_jobs(pending, geom, self.max_per_host, self._feedback, self.result_store.sink)
+            # Read back lazily, only if the result cache stores them
+            return ((job, self.result_store.features(job)) for job, _features in results)
+
+        if self.result_cache is not None:
+            results = self.result_cache.run_jobs(self.code_insee, self.jobs, geom, runner, self._feedback)
+        else:
+            results = runner(self.jobs)
+        start = time.perf_counter()
+        for done, (job, features) in enumerate(results, start=1):
+            if done == 1:
+                self.timings["first_layer"] = time.perf_counter() - start
+            self.fingerprints[job.index] = result_fingerprint(job)
+            self.layerFinished.emit(job, features)
+            self.setProgress(100.0 * done / total)
+        self.timings["intersect"] = time.perf_counter() - start
+        return not self.isCanceled()
+
+    def finished(self, result):
+        self._meter.stop()
+        record_transfer_stats(self.jobs, self._meter)
+
+    def cancel(self):
+        self._feedback.cancel()
+        super().cancel()
+
+
+class BatchTask(QgsTask):
+    """Background batch run: resolve communes, intersect all layers once, write CSVs per commune.
+
+    Layer jobs are prepared in the constructor (main thread). stageChanged reports
+    progress text; written holds the CSV paths once done.
+    """
+
+    stageChanged = pyqtSignal(str)
+
+    def __init__(
+        self,
+        spec: str,
+        layers: list[QgsVectorLayer],
+        output_dir: str,
+        max_per_host: int = DEFAULT_MAX_PER_HOST,
+    ):
+        super().__init__(f"Secateur : lot {spec}", QgsTask.CanCancel)
+        self.spec = spec
+        self.jobs = prepare_layer_jobs(layers)
+        self.output_dir = output_dir
+        self.max_per_host = max_per_host
+        self.communes = []
+        self.written = []
+        self.error = None
+        self._feedback = QgsFeedback()
+
+    def run(self) -> bool:
+        try:
+            self.stageChanged.emit("Résolution des communes…")
+            self.communes = resolve_communes(self.spec)
+            if not self.communes:
+                self.error = "aucune commune trouvée."
+                return False
+
+            self.stageChanged.emit(f"Contours de {len(self.communes)} commune(s)…")
+            geoms, errors = fetch_commune_geometries([commune["code"] for commune in self.communes])
+            for commune in self.communes:
+                if commune["code"] in errors:
+                    error = errors[commune["code"]]
+                    self.error = f"impossible de récupérer la géométrie de {commune['nom']} ({error.message})."
+                    return False
+            if self.isCanceled():
+                return False
+
+            def progress(done, total, name):
+                self.stageChanged.emit(f"Intersection {done}/{total} terminée(s) : {name}")
+                self.setProgress(100.0 * done / total)
+
+            results = intersect_communes_batch(
+                geoms, self.jobs, progress, max_per_host=self.max_per_host, feedback=self._feedback
+            )
+            if self.isCanceled():
+                return False
+            self.stageChanged.emit("Écriture des fichiers CSV…")
+            names = {c["code"]: c["nom"] for c in self.communes}
+            self.written = export_batch_to_csv(results, names, self.output_dir)
+            return True
+        except Exception as e:
+            self.error = str(e)
+            return False
+
+    def cancel(self):
+        self._feedback.cancel()
+        super().cancel()
@@ -0,0 +1,227 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from qgis.core import (
+    QgsBlockingNetworkRequest,
+    QgsRasterLayer,
+    QgsRectangle,
+)
+from qgis.PyQt.QtCore import QUrl  # noqa: UP035
+from qgis.PyQt.QtNetwork import QNetworkRequest  # noqa: UP035
+
+from .storage import connect, default_path
+
+# IGN Plan IGN v2, web mercator XYZ tiles
+DEFAULT_TILE_URL = (
+    "https://data.geopf.fr/wmts"
+    "?REQUEST=GetTile&SERVICE=WMTS&VERSION=1.0.0"
+    "&TILEMATRIXSET=PM"
+    "&LAYER=GEOGRAPHICALGRIDSYSTEMS.PLANIGNV2"
+    "&STYLE=normal&FORMAT=image/png"
+    "&TILECOL={x}&TILEROW={y}&TILEMATRIX={z}"
+)
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_FETCHERS = 8
+MAX_ZOOM = 19
+
+# Web mercator ground resolution (m/px) at zoom 0, and the earth's circumference
+_RESOLUTION_Z0 = 156543.03392804097
+_EARTH_CIRCUMFERENCE = 40075016.68557849
+_MAX_LAT = 85.0511287798
+
+
+def tile_range(bbox: QgsRectangle, zoom: int) -> tuple[int, int, int, int]:
+    """XYZ tile columns and rows (x_min, y_min, x_max, y_max) covering a WGS84 bbox."""
+    n = 2**zoom
+
+    def col(lon):
+        return min(n - 1, max(0, math.floor((lon + 180.0) / 360.0 * n)))
+
+    def row(lat):
+        lat = math.radians(max(-_MAX_LAT, min(_MAX_LAT, lat)))
+        return min(n - 1, max(0, math.floor((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n)))
+
+    return col(bbox.xMinimum()), row(bbox.yMaximum()), col(bbox.xMaximum()), row(bbox.yMinimum())
+
+
+def zooms_for(bbox: QgsRectangle, width_px: int) -> list[int]:
+    """Tile zoom levels a renderer may pick for a WGS84 bbox drawn width_px wide."""
+    resolution = bbox.width() / 360.0 * _EARTH_CIRCUMFERENCE / max(1, width_px)
+    level = math.log2(_RESOLUTION_Z0 / resolution) if resolution > 0 else MAX_ZOOM
+    low = min(MAX_ZOOM, max(0, math.floor(level)))
+    return sorted({low, min(MAX_ZOOM, low + 1)})
+
+
+class TileCache:
+    """Persistent basemap tile cache in an MBTiles file.
+
+    seed() downloads the tiles missing for an extent (or, when offline, only reports
+    them); layer() reads tiles straight from the file, so rendering never hits the
+    network. Tiles are evicted least recently used first once the file holds more
+    than max_bytes of tiles. url is an XYZ template ({x}, {y}, {z}), which can point
+    to a local tile server.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        url: str = DEFAULT_TILE_URL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        offline: bool = False,
+        max_workers: int = DEFAULT_FETCHERS,
+    ):
+        self.path = path or default_path("tiles.mbtiles")
+        self.url = url
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with connect(self.path, timeout=10) as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS tiles (
+                    zoom_level INTEGER NOT NULL,
+                    tile_column INTEGER NOT NULL,
+                    tile_row INTEGER NOT NULL,
+                    tile_data BLOB NOT NULL,
+                    accessed REAL NOT NULL,
+                    PRIMARY KEY (zoom_level, tile_column, tile_row)
+                );
+                CREATE INDEX IF NOT EXISTS tiles_accessed ON tiles (accessed);
+                """
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)",
+                [
+                    ("name", "Plan IGN"),
+                    ("format", "png"),
+                    ("type", "baselayer"),
+                    ("minzoom", "0"),
+                    ("maxzoom", str(MAX_ZOOM)),
+                    ("bounds", f"-180,{-_MAX_LAT},180,{_MAX_LAT}"),
+                ],
+            )
+
+    @staticmethod
+    def _tms_row(zoom: int, y: int) -> int:
+        # MBTiles rows count from the bottom (TMS), XYZ rows from the top
+        return 2**zoom - 1 - y
+
+    def get(self, zoom: int, x: int, y: int) -> bytes | None:
+        with connect(self.path, timeout=10) as conn:
+            row = conn.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (zoom, x, self._tms_row(zoom, y)),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tiles SET accessed = ? WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (time.time(), zoom, x, self._tms_row(zoom, y)),
+            )
+            return row[0]
+
+    def put(self, zoom: int, x: int, y: int, data: bytes):
+        with self._lock, connect(self.path, timeout=10) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (zoom, x, self._tms_row(zoom, y), data, time.time()),
+            )
+
+    def _fetch(self, zoom: int, x: int, y: int) -> bytes | None:
+        url = self.url.replace("{x}", str(x)).replace("{y}", str(y)).replace("{z}", str(zoom))
+        request = QgsBlockingNetworkRequest()
+        if request.get(QNetworkRequest(QUrl(url))) != QgsBlockingNetworkRequest.NoError:
+            return None
+        data = bytes(request.reply().content())
+        return data or None
+
+    def seed(self, bbox: QgsRectangle, zooms: list[int], feedback=None) -> dict:
+        """Make sure the tiles covering a WGS84 bbox at the given zooms are cached.
+
+        Cached tiles are marked as used; missing ones are downloaded concurrently unless
+        offline. Returns {"cached", "fetched", "missing"} tile counts; missing tiles are
+        simply left blank by layer().
+        """
+        wanted = []
+        for zoom in zooms:
+            x_min, y_min, x_max, y_max = tile_range(bbox, zoom)
+            wanted += [(zoom, x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)]
+
+        now = time.time()
+        missing = []
+        with self._lock, connect(self.path, timeout=10) as conn:
+            for zoom, x, y in wanted:
+                updated = conn.execute(
+                    "UPDATE tiles SET accessed = ? WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                    (now, zoom, x, self._tms_row(zoom, y)),
+                ).rowcount
+                if not updated:
+                    missing.append((zoom, x, y))
+        stats = {"cached": len(wanted) - len(missing), "fetched": 0, "missing": len(missing)}
+        if self.offline or not missing:
+            return stats
+
+        def fetch(tile):
+            if feedback is not None and feedback.isCanceled():
+                return tile, None
+            return tile, self._fetch(*tile)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for (zoom, x, y), data in executor.map(fetch, missing):
+                if data is not None:
+                    self.put(zoom, x, y, data)
+                    stats["fetched"] += 1
+        stats["missing"] -= stats["fetched"]
+        self.evict()
+        return stats
+
+    def evict(self):
+        """Drop least recently used tiles until the cache is back under max_bytes."""
+        with self._lock, connect(self.path, timeout=10) as conn:
+            total = conn.execute("SELECT COALESCE(SUM(LENGTH(tile_data)), 0) FROM tiles").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = conn.execute(
+                "SELECT zoom_level, tile_column, tile_row, LENGTH(tile_data) FROM tiles ORDER BY accessed"
+            ).fetchall()
+            for zoom, x, row, size in rows:
+                conn.execute(
+                    "DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                    (zoom, x, row),
+                )
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def clear(self):
+        with self._lock, connect(self.path, timeout=10) as conn:
+            conn.execute("DELETE FROM tiles")
+
+    def layer(self, name: str = "Plan IGN") -> QgsRasterLayer:
+        """Raster layer reading the cached tiles only."""
+        uri = f"type=mbtiles&url={quote(QUrl.fromLocalFile(self.path).toString(), safe=':/')}"
+        return QgsRasterLayer(uri, name, "wms")
+
+
+_tile_cache: TileCache | None = None
+
+
+def get_tile_cache() -> TileCache:
+    global _tile_cache
+    if _tile_cache is None:
+        _tile_cache = TileCache()
+    return _tile_cache
+
+
+def set_tile_cache(cache: TileCache | None):
+    """Replace the shared tile cache (e.g. another file, tile server or offline mode); None resets it."""
+    global _tile_cache
+    _tile_cache = cache
@@ -0,0 +1,48 @@
+import time
+
+from qgis.core import Qgis, QgsFeedback, QgsMessageLog, QgsTask
+
+from .commune_api import load_index
+from .export import template_document
+from .wfs_capabilities import prefetch_capabilities
+
+
+class WarmupTask(QgsTask):
+    """Background warm-up when the panel opens, so the first "Interroger" doesn't pay for it.
+
+    Loads the offline commune index (opening the cache, downloading the list once if
+    needed), fetches the capabilities of the services in urls and parses the PDF report
+    template. Steps run in that order and cancel() stops before the next one, aborting
+    pending capabilities requests. A failing step (e.g. offline) is logged and skipped:
+    its work is simply done again when needed. timings holds each successful step's
+    duration in seconds.
+    """
+
+    def __init__(self, urls: list[str]):
+        super().__init__("Secateur : préparation", QgsTask.CanCancel)
+        self.urls = urls
+        self.timings: dict[str, float] = {}
+        self._feedback = QgsFeedback()
+
+    def run(self) -> bool:
+        steps = [
+            ("communes", lambda: load_index(download=True)),
+            ("capabilities", lambda: prefetch_capabilities(self.urls, feedback=self._feedback)),
+            ("template", template_document),
+        ]
+        for i, (name, step) in enumerate(steps):
+            if self.isCanceled():
+                return False
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                QgsMessageLog.logMessage(f"Préparation ({name}) impossible : {e}", "Secateur", Qgis.Warning)
+            else:
+                self.timings[name] = time.perf_counter() - start
+            self.setProgress(100.0 * (i + 1) / len(steps))
+        return True
+
+    def cancel(self):
+        self._feedback.cancel()
+        super().cancel()
@@ -0,0 +1,183 @@
+import io
+import re
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from qgis.core import QgsBlockingNetworkRequest, QgsFeedback, QgsRectangle
+from qgis.PyQt.QtCore import QUrl, QUrlQuery  # noqa: UP035
+from qgis.PyQt.QtNetwork import QNetworkRequest  # noqa: UP035
+
+# Services asked for their capabilities at the same time
+DEFAULT_FETCHERS = 8
+
+_capabilities: dict[str, "ServiceCapabilities"] = {}
+_capabilities_lock = threading.Lock()
+
+
+@dataclass
+class FeatureTypeCapabilities:
+    """One feature type of a service: native CRS (authid) and WGS84 extent, when advertised."""
+
+    name: str
+    default_crs: str = ""
+    wgs84_extent: QgsRectangle | None = None
+
+
+@dataclass
+class ServiceCapabilities:
+    """What a WFS service advertises in its GetCapabilities document.
+
+    max_features is the default page size or feature limit (0: none advertised);
+    spatial_operators lists the filter operators the server evaluates.
+    """
+
+    version: str = ""
+    update_sequence: str = ""
+    paging: bool = False
+    max_features: int = 0
+    spatial_operators: set[str] = field(default_factory=set)
+    feature_types: dict[str, FeatureTypeCapabilities] = field(default_factory=dict)
+
+    @property
+    def server_filter(self) -> bool:
+        """Whether OGC Intersects filters are supported (see intersector.FILTER_SERVER)."""
+        return "Intersects" in self.spatial_operators
+
+    def feature_type(self, typename: str) -> FeatureTypeCapabilities | None:
+        """A feature type by name, with or without its namespace prefix."""
+        if typename in self.feature_types:
+            return self.feature_types[typename]
+        local = typename.split(":")[-1]
+        for name, feature_type in self.feature_types.items():
+            if name.split(":")[-1] == local:
+                return feature_type
+        return None
+
+
+# Filter Encoding 1.0 spatial operator elements (WFS 1.0), by the names used from FE 1.1 on
+_FE10_OPERATORS = {"Intersect": "Intersects", "Intersects": "Intersects", "BBOX": "BBOX"}
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(element, name: str) -> str:
+    """Text of the first descendant of element with the given local name."""
+    for child in element.iter():
+        if _local(child.tag) == name:
+            return (child.text or "").strip()
+    return ""
+
+
+def _authid(crs: str) -> str:
+    """EPSG:2154 from urn:ogc:def:crs:EPSG::2154, http://www.opengis.net/def/crs/EPSG/0/2154, etc."""
+    match = re.search(r"EPSG\D+(?:\d+\D+)?(\d+)$", crs, re.IGNORECASE)
+    return f"EPSG:{match.group(1)}" if match else crs
+
+
+def _wgs84_extent(feature_type) -> QgsRectangle | None:
+    lower, upper = _text(feature_type, "LowerCorner"), _text(feature_type, "UpperCorner")
+    try:
+        if lower and upper:
+            xmin, ymin = (float(v) for v in lower.split())
+            xmax, ymax = (float(v) for v in upper.split())
+            return QgsRectangle(xmin, ymin, xmax, ymax)
+        for child in feature_type.iter():
+            # WFS 1.0
+            if _local(child.tag) == "LatLongBoundingBox":
+                return QgsRectangle(*(float(child.get(key)) for key in ("minx", "miny", "maxx", "maxy")))
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def parse_capabilities(data: bytes) -> ServiceCapabilities:
+    """Read a WFS 1.0, 1.1 or 2.0 GetCapabilities document. Raises ET.ParseError."""
+    capabilities = ServiceCapabilities()
+    root = None
+    for event, element in ET.iterparse(io.BytesIO(data), events=("start", "end")):
+        name = _local(element.tag)
+        if event == "start":
+            if root is None:
+                root = element
+                capabilities.version = element.get("version", "")
+                capabilities.update_sequence = element.get("updateSequence", "")
+            continue
+        if name == "Constraint":
+            value = _text(element, "DefaultValue") or _text(element, "Value")
+            if element.get("name") == "ImplementsResultPaging":
+                capabilities.paging = value.upper() == "TRUE"
+            elif element.get("name") in ("CountDefault", "DefaultMaxFeatures") and value.isdigit():
+                capabilities.max_features = int(value)
+        elif name == "SpatialOperator":
+            capabilities.spatial_operators.add(element.get("name", ""))
+        elif name in _FE10_OPERATORS and not element.get("name"):
+            # WFS 1.0 lists operators as empty elements, with Filter Encoding 1.0 names
+            capabilities.spatial_operators.add(_FE10_OPERATORS[name])
+        elif name == "FeatureType":
+            feature_type = FeatureTypeCapabilities(
+                _text(element, "Name"),
+                _authid(_text(element, "DefaultCRS") or _text(element, "DefaultSRS") or _text(element, "SRS")),
+                _wgs84_extent(element),
+            )
+            capabilities.feature_types[feature_type.name] = feature_type
+            # Feature type lists can be long: don't keep the parsed elements
+            element.clear()
+    return capabilities
+
+
+def get_capabilities(
+    url: str, refresh: bool = False, feedback: QgsFeedback | None = None
+) -> ServiceCapabilities | None:
+    """Capabilities of a WFS service, fetched once per URL. None when unreachable (asked again next time).
+
+    refresh fetches them again (e.g. to check their updateSequence), replacing the known ones.
+    Cancelling feedback aborts the request (None is returned).
+    """
+    if not url:
+        return None
+    with _capabilities_lock:
+        if url in _capabilities and not refresh:
+            return _capabilities[url]
+    qurl = QUrl(url)
+    query = QUrlQuery(qurl)
+    query.addQueryItem("SERVICE", "WFS")
+    query.addQueryItem("REQUEST", "GetCapabilities")
+    query.addQueryItem("ACCEPTVERSIONS", "2.0.0,1.1.0,1.0.0")
+    qurl.setQuery(query)
+    request = QgsBlockingNetworkRequest()
+    if request.get(QNetworkRequest(qurl), False, feedback) != QgsBlockingNetworkRequest.NoError:
+        return None
+    try:
+        capabilities = parse_capabilities(bytes(request.reply().content()))
+    except ET.ParseError:
+        return None
+    with _capabilities_lock:
+        _capabilities[url] = capabilities
+    return capabilities
+
+
+def prefetch_capabilities(urls, max_workers: int = DEFAULT_FETCHERS, feedback: QgsFeedback | None = None):
+    """Fetch the capabilities of several services concurrently, skipping those already known.
+
+    Cancelling feedback aborts the pending requests.
+    """
+    missing = {url for url in urls if url and cached_capabilities(url) is None}
+    if not missing:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+        list(executor.map(lambda url: get_capabilities(url, feedback=feedback), missing))
+
+
+def cached_capabilities(url: str) -> ServiceCapabilities | None:
+    """Capabilities already fetched for url, without any network request."""
+    with _capabilities_lock:
+        return _capabilities.get(url)
+
+
+def clear_capabilities():
+    with _capabilities_lock:
+        _capabilities.clear()
@@ -0,0 +1,253 @@
+import base64
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from osgeo import gdal
+from qgis.core import (
+    QgsBlockingNetworkRequest,
+    QgsCoordinateReferenceSystem,
+    QgsDataSourceUri,
+    QgsFeature,
+    QgsFeedback,
+    QgsFields,
+    QgsGeometry,
+    QgsRectangle,
+)
+from qgis.PyQt.QtCore import QUrl, QUrlQuery  # noqa: UP035
+from qgis.PyQt.QtNetwork import QNetworkRequest  # noqa: UP035
+
+DEFAULT_PAGE_SIZE = 1000
+
+# Attempts per page after the first one; waits double from BACKOFF_SECONDS
+PAGE_RETRIES = 4
+BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+
+# OWS exception codes of server-side failures worth retrying; others (unknown typename,
+# InvalidParameterValue...) would fail the same way again
+TRANSIENT_EXCEPTION_CODES = {"NoApplicableCode", "OperationProcessingFailed"}
+
+# Interrupted layers kept for resuming, oldest dropped first
+MAX_SUSPENDED = 32
+
+_suspended: OrderedDict[str, "PageCursor"] = OrderedDict()
+_suspended_lock = threading.Lock()
+
+
+class PageError(Exception):
+    """A page that could not be fetched, after retries when the error was transient."""
+
+
+@dataclass
+class PageCursor:
+    """Progress of a paged fetch: STARTINDEX of the next page and matches from the pages done.
+
+    bytes_received and http_seconds add up the page requests, retries included.
+    """
+
+    next_index: int = 0
+    matches: list = field(default_factory=list)
+    pages: int = 0
+    retries: int = 0
+    bytes_received: int = 0
+    http_seconds: float = 0.0
+
+
+def resume_cursor(key: str) -> PageCursor:
+    """The cursor left by an interrupted fetch for key, or a fresh one."""
+    with _suspended_lock:
+        return _suspended.pop(key, None) or PageCursor()
+
+
+def suspend_cursor(key: str, cursor: PageCursor):
+    """Keep an interrupted fetch's cursor, so the next run for key resumes from it."""
+    with _suspended_lock:
+        _suspended[key] = cursor
+        while len(_suspended) > MAX_SUSPENDED:
+            _suspended.popitem(last=False)
+
+
+def _service_url(uri: str) -> str:
+    return QgsDataSourceUri(uri).param("url")
+
+
+def _crs_urn(crs: QgsCoordinateReferenceSystem) -> str:
+    authority, _sep, code = crs.authid().partition(":")
+    return f"urn:ogc:def:crs:{authority}::{code}"
+
+
+def page_url(uri: str, typename: str, crs: QgsCoordinateReferenceSystem, bbox: QgsRectangle, start: int, count: int):
+    """GetFeature URL of one page of a WFS 2.0 layer, bbox and features in the layer CRS."""
+    coords = [bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum()]
+    if crs.hasAxisInverted():
+        # URN CRSs follow the authority axis order (e.g. latitude first for EPSG:4326)
+        coords = [coords[1], coords[0], coords[3], coords[2]]
+    qurl = QUrl(_service_url(uri))
+    query = QUrlQuery(qurl)
+    for key, value in (
+        ("SERVICE", "WFS"),
+        ("VERSION", "2.0.0"),
+        ("REQUEST", "GetFeature"),
+        ("TYPENAMES", typename),
+        ("SRSNAME", _crs_urn(crs)),
+        ("BBOX", ",".join(repr(c) for c in coords) + "," + _crs_urn(crs)),
+        ("STARTINDEX", str(start)),
+        ("COUNT", str(count)),
+    ):
+        query.addQueryItem(key, value)
+    qurl.setQuery(query)
+    return qurl
+
+
+def _exception_code(data: bytes) -> str:
+    """exceptionCode of an OWS exception report (code of a WFS 1.0 ServiceException), or ""."""
+    match = re.search(rb'(?:exceptionCode|code)="([^"]*)"', data[:2048])
+    return match.group(1).decode(errors="replace") if match else ""
+
+
+def _wait(seconds: float, feedback: QgsFeedback | None) -> bool:
+    """Sleep, waking up early (False) when feedback is cancelled."""
+    end = time.monotonic() + seconds
+    while (remaining := end - time.monotonic()) > 0:
+        if feedback is not None and feedback.isCanceled():
+            return False
+        time.sleep(min(0.1, remaining))
+    return True
+
+
+def fetch_page(uri: str, qurl: QUrl, feedback: QgsFeedback | None = None, cursor: PageCursor | None = None) -> bytes:
+    """Download one page, retrying transient failures with exponential backoff.
+
+    Network errors, timeouts, HTTP 429/5xx and OWS exception reports with a code in
+    TRANSIENT_EXCEPTION_CODES are retried up to PAGE_RETRIES times; other errors,
+    exception reports and cancellation raise PageError at once. Retries, bytes and
+    request time are counted in cursor.
+    """
+    source = QgsDataSourceUri(uri)
+    request = QNetworkRequest(qurl)
+    if source.username():
+        credentials = f"{source.username()}:{source.password()}".encode()
+        request.setRawHeader(b"Authorization", b"Basic " + base64.b64encode(credentials))
+    delay = BACKOFF_SECONDS
+    for attempt in range(PAGE_RETRIES + 1):
+        blocking = QgsBlockingNetworkRequest()
+        if source.authConfigId():
+            blocking.setAuthCfg(source.authConfigId())
+        start = time.perf_counter()
+        error = blocking.get(request, False, feedback)
+        elapsed = time.perf_counter() - start
+        if feedback is not None and feedback.isCanceled():
+            raise PageError("Requête annulée")
+        reply = blocking.reply()
+        data = bytes(reply.content())
+        if cursor is not None:
+            cursor.bytes_received += len(data)
+            cursor.http_seconds += elapsed
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute) or 0
+        report = b"ExceptionReport" in data[:1024]
+        if error == QgsBlockingNetworkRequest.NoError and not report:
+            return data
+        message = blocking.errorMessage() or data[:200].decode(errors="replace")
+        transient = error == QgsBlockingNetworkRequest.TimeoutError or status in (0, 429) or status >= 500
+        if report and not transient:
+            code = _exception_code(data)
+            if code not in TRANSIENT_EXCEPTION_CODES:
+                raise PageError(f"Exception {code or 'OWS'} : {message}")
+        elif not transient:
+            raise PageError(f"HTTP {status} : {message}")
+        if attempt == PAGE_RETRIES:
+            raise PageError(f"Échec après {PAGE_RETRIES + 1} tentatives : {message}")
+        if cursor is not None:
+            cursor.retries += 1
+        if not _wait(delay, feedback):
+            raise PageError("Requête annulée")
+        delay = min(delay * 2, MAX_BACKOFF_SECONDS)
+
+
+def parse_page(data: bytes, fields: QgsFields, first_id: int = 0) -> list[QgsFeature]:
+    """Read the features of a GetFeature response (GML or GeoJSON) with OGR, as features with fields.
+
+    Attributes are matched by name and converted to the field types; feature ids
+    count up from first_id (the page's STARTINDEX) so they stay unique across pages.
+    """
+    path = f"/vsimem/secateur_{uuid.uuid4().hex}.gml"
+    gdal.FileFromMemBuffer(path, data)
+    try:
+        dataset = gdal.OpenEx(
+            path, gdal.OF_VECTOR, open_options=["DOWNLOAD_SCHEMA=NO", "WRITE_GFS=NO", "EXPOSE_GML_ID=NO"]
+        )
+    except RuntimeError:
+        # GDAL built with exceptions enabled
+        dataset = None
+    try:
+        if dataset is None:
+            raise PageError("Réponse GetFeature illisible")
+        if dataset.GetLayerCount() == 0:
+            return []
+        layer = dataset.GetLayer(0)
+        definition = layer.GetLayerDefn()
+        columns = {definition.GetFieldDefn(i).GetName(): i for i in range(definition.GetFieldCount())}
+        mapping = [(i, columns.get(fields.at(i).name())) for i in range(fields.count())]
+        features = []
+        for n, ogr_feature in enumerate(layer):
+            feat = QgsFeature(fields, first_id + n)
+            ogr_geometry = ogr_feature.GetGeometryRef()
+            if ogr_geometry is not None:
+                geom = QgsGeometry()
+                geom.fromWkb(bytes(ogr_geometry.ExportToIsoWkb()))
+                feat.setGeometry(geom)
+            for i, column in mapping:
+                if column is None or not ogr_feature.IsFieldSetAndNotNull(column):
+                    continue
+                try:
+                    value = fields.at(i).convertCompatible(ogr_feature.GetField(column))
+                except ValueError:
+                    # Left NULL, as the provider does
+                    continue
+                feat.setAttribute(i, value)
+            features.append(feat)
+        return features
+    finally:
+        dataset = None
+        gdal.Unlink(path)
+
+
+def iter_pages(
+    uri: str,
+    typename: str,
+    crs: QgsCoordinateReferenceSystem,
+    bbox: QgsRectangle,
+    fields: QgsFields,
+    cursor: PageCursor,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    feedback: QgsFeedback | None = None,
+):
+    """Yield the pages of features in bbox, from cursor.next_index on.
+
+    The next page is downloaded and parsed in the background while the caller works on
+    the current one. cursor.next_index moves past a page once the caller asks for the
+    next, so after a PageError it points at the first page not fully processed.
+    """
+
+    def load(start):
+        data = fetch_page(uri, page_url(uri, typename, crs, bbox, start, page_size), feedback, cursor)
+        return parse_page(data, fields, start)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="secateur-page") as prefetch:
+        pending = prefetch.submit(load, cursor.next_index)
+        while True:
+            features = pending.result()
+            cursor.pages += 1
+            # Short (or unpaged, oversized) pages are the last one
+            full = len(features) == page_size
+            if full:
+                pending = prefetch.submit(load, cursor.next_index + page_size)
+            yield features
+            cursor.next_index += len(features)
+            if not full:
+                return
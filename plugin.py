@@ -1,19 +1,42 @@
 import os
+import sys
+import time
 
+from qgis.core import Qgis, QgsApplication, QgsMessageLog
 from qgis.PyQt.QtCore import Qt  # noqa: UP035
 from qgis.PyQt.QtGui import QIcon  # noqa: UP035
 from qgis.PyQt.QtWidgets import QAction  # noqa: UP035
 
-from .ui.panel import SecateurPanel
+from .processing_provider.provider import SecateurProvider
+
+
+def _log_timing(text: str, start: float):
+    QgsMessageLog.logMessage(f"{text} : {(time.perf_counter() - start) * 1000:.0f} ms", "Secateur", Qgis.Info)
+
+
+def _loaded(module: str):
+    """The plugin's module if it was imported (see Plugin.unload), else None."""
+    return sys.modules.get(f"{__package__}.{module}")
 
 
 class Plugin:
+    """Toolbar action and panel. The panel (and the core modules it needs) is only
+    imported on first toggle; opening it starts the background warm-up (see core.warmup).
+    """
+
     def __init__(self, iface):
         self.iface = iface
         self.action = None
         self.panel = None
+        self.provider = None
+
+    def initProcessing(self):
+        self.provider = SecateurProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
 
     def initGui(self):
+        start = time.perf_counter()
+        self.initProcessing()
         icon_path = os.path.join(os.path.dirname(__file__), "resources", "icon.png")
         icon = QIcon(icon_path) if os.path.exists(icon_path) else QIcon()
         self.action = QAction(icon, "Ecosphères Secateur", self.iface.mainWindow())
@@ -21,22 +44,43 @@ class Plugin:
         self.action.triggered.connect(self._toggle_panel)
         self.iface.addToolBarIcon(self.action)
         self.iface.addPluginToMenu("&Ecosphères Secateur", self.action)
+        _log_timing("Démarrage du plugin", start)
 
     def unload(self):
+        if self.provider:
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+            self.provider = None
         if self.action:
             self.iface.removeToolBarIcon(self.action)
             self.iface.removePluginMenu("Ecosphères Secateur", self.action)
         if self.panel:
+            self.panel.cancel_warmup()
+            self.panel.remove_result_files()
             self.iface.removeDockWidget(self.panel)
             self.panel.deleteLater()
             self.panel = None
+        # Only modules already imported hold temporary files, threads or signal connections to release
+        export = _loaded("core.export")
+        if export is not None:
+            export.clear_report_cache()
+        clip = _loaded("core.clip")
+        if clip is not None:
+            clip.shutdown()
+        registry = _loaded("core.layer_registry")
+        if registry is not None:
+            registry.release_layer_registry()
 
     def _toggle_panel(self, checked):
         if self.panel is None:
+            start = time.perf_counter()
+            from .ui.panel import SecateurPanel
+
+            _log_timing("Chargement du panneau (imports)", start)
             self.panel = SecateurPanel(self.iface)
             self.iface.addDockWidget(Qt.RightDockWidgetArea, self.panel)
             if self.action:
                 self.panel.visibilityChanged.connect(self.action.setChecked)
+            _log_timing("Ouverture du panneau", start)
         if checked:
             self.panel.show()
         else:
@@ -0,0 +1,185 @@
+from qgis.core import (
+    QgsProcessing,
+    QgsProcessingAlgorithm,
+    QgsProcessingException,
+    QgsProcessingOutputNumber,
+    QgsProcessingParameterBoolean,
+    QgsProcessingParameterFileDestination,
+    QgsProcessingParameterFolderDestination,
+    QgsProcessingParameterMultipleLayers,
+    QgsProcessingParameterString,
+    QgsVectorLayer,
+)
+
+
+def _input_layers(alg: QgsProcessingAlgorithm, parameters, context) -> list[QgsVectorLayer]:
+    """Selected layers, or every visible WFS layer of the project when none are given."""
+    # Core modules are imported when an algorithm runs, not when the provider registers at QGIS startup
+    from ..core.intersector import find_wfs_layers
+
+    layers = [
+        layer for layer in alg.parameterAsLayerList(parameters, "LAYERS", context) if isinstance(layer, QgsVectorLayer)
+    ]
+    return layers or find_wfs_layers()
+
+
+class IntersectCommuneAlgorithm(QgsProcessingAlgorithm):
+    """Processing counterpart of the panel's "Interroger" + exports."""
+
+    def name(self):
+        return "intersect_commune"
+
+    def displayName(self):
+        return "Intersecter une commune"
+
+    def shortHelpString(self):
+        return (
+            "Intersecte le contour d'une commune (code INSEE) avec les couches choisies, ou avec toutes "
+            "les couches WFS visibles du projet, et écrit un CSV par couche. Le rapport PDF est optionnel."
+        )
+
+    def createInstance(self):
+        return IntersectCommuneAlgorithm()
+
+    def flags(self):
+        # The PDF report renders layouts and map images: main thread only
+        return super().flags() | QgsProcessingAlgorithm.FlagNoThreading
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterString("CODE", "Code INSEE"))
+        self.addParameter(
+            QgsProcessingParameterMultipleLayers(
+                "LAYERS",
+                "Couches (par défaut : couches WFS visibles)",
+                QgsProcessing.TypeVectorAnyGeometry,
+                optional=True,
+            )
+        )
+        self.addParameter(QgsProcessingParameterBoolean("SERVER_FILTER", "Filtre spatial côté serveur", False))
+        self.addParameter(QgsProcessingParameterBoolean("CLIP", "Découper à la commune (surfaces, longueurs)", False))
+        self.addParameter(QgsProcessingParameterFolderDestination("OUTPUT_FOLDER", "Dossier CSV"))
+        self.addParameter(
+            QgsProcessingParameterFileDestination("OUTPUT_PDF", "Rapport PDF", "PDF (*.pdf)", optional=True)
+        )
+        self.addOutput(QgsProcessingOutputNumber("LAYER_COUNT", "Couches avec résultats"))
+        self.addOutput(QgsProcessingOutputNumber("FEATURE_COUNT", "Entités trouvées"))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        from ..core.commune_api import fetch_commune_geometry, fetch_commune_name
+        from ..core.export import export_results_to_csv, export_results_to_pdf
+        from ..core.http_client import HttpError
+        from ..core.intersector import FILTER_BBOX, FILTER_SERVER, intersect_commune
+
+        code = self.parameterAsString(parameters, "CODE", context).strip()
+        layers = _input_layers(self, parameters, context)
+        server_filter = self.parameterAsBoolean(parameters, "SERVER_FILTER", context)
+        clip = self.parameterAsBoolean(parameters, "CLIP", context)
+        output_folder = self.parameterAsString(parameters, "OUTPUT_FOLDER", context)
+        output_pdf = self.parameterAsFileOutput(parameters, "OUTPUT_PDF", context)
+
+        try:
+            geom = fetch_commune_geometry(code)
+        except HttpError as e:
+            raise QgsProcessingException(f"Impossible de récupérer la géométrie de la commune {code} : {e}") from e
+        if geom is None or geom.isEmpty():
+            raise QgsProcessingException(f"Impossible de récupérer la géométrie de la commune {code}.")
+
+        def progress(done, total, name):
+            feedback.setProgress(100.0 * done / total)
+            feedback.pushInfo(f"{name} : terminé")
+
+        results = intersect_commune(
+            geom,
+            layers,
+            progress_callback=progress,
+            feedback=feedback,
+            filter_mode=FILTER_SERVER if server_filter else FILTER_BBOX,
+            clip=clip,
+        )
+        if feedback.isCanceled():
+            return {}
+
+        export_results_to_csv(results, output_folder)
+        if output_pdf and results:
+            try:
+                name = fetch_commune_name(code)
+            except HttpError as e:
+                feedback.pushWarning(f"Nom de la commune {code} introuvable, titre du rapport par code : {e}")
+                name = code
+            export_results_to_pdf(results, name, geom, output_pdf)
+
+        return {
+            "OUTPUT_FOLDER": output_folder,
+            "OUTPUT_PDF": output_pdf,
+            "LAYER_COUNT": len(results),
+            "FEATURE_COUNT": sum(r.featureCount() for r in results),
+        }
+
+
+class BatchCsvAlgorithm(QgsProcessingAlgorithm):
+    """Processing counterpart of the panel's batch mode."""
+
+    def name(self):
+        return "batch_csv"
+
+    def displayName(self):
+        return "Intersecter un lot de communes (CSV)"
+
+    def shortHelpString(self):
+        return (
+            "Codes INSEE, code EPCI (SIREN) ou code département. Chaque couche n'est téléchargée qu'une "
+            "fois sur l'emprise du lot ; un dossier CSV est écrit par commune."
+        )
+
+    def createInstance(self):
+        return BatchCsvAlgorithm()
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterString("SPEC", "Codes INSEE, EPCI ou département"))
+        self.addParameter(
+            QgsProcessingParameterMultipleLayers(
+                "LAYERS",
+                "Couches (par défaut : couches WFS visibles)",
+                QgsProcessing.TypeVectorAnyGeometry,
+                optional=True,
+            )
+        )
+        self.addParameter(QgsProcessingParameterFolderDestination("OUTPUT_FOLDER", "Dossier de sortie"))
+        self.addOutput(QgsProcessingOutputNumber("COMMUNE_COUNT", "Communes traitées"))
+
+    def prepareAlgorithm(self, parameters, context, feedback):
+        from ..core.intersector import prepare_layer_jobs
+
+        # Runs on the main thread: snapshot the layers before processAlgorithm's worker thread
+        self._jobs = prepare_layer_jobs(_input_layers(self, parameters, context))
+        return True
+
+    def processAlgorithm(self, parameters, context, feedback):
+        from ..core.batch import export_batch_to_csv, intersect_communes_batch
+        from ..core.commune_api import fetch_commune_geometries, resolve_communes
+
+        spec = self.parameterAsString(parameters, "SPEC", context)
+        output_folder = self.parameterAsString(parameters, "OUTPUT_FOLDER", context)
+
+        try:
+            communes = resolve_communes(spec)
+        except Exception as e:
+            raise QgsProcessingException(str(e)) from e
+
+        geoms, errors = fetch_commune_geometries([commune["code"] for commune in communes])
+        for commune in communes:
+            if commune["code"] in errors:
+                error = errors[commune["code"]]
+                raise QgsProcessingException(f"Impossible de récupérer la géométrie de {commune['nom']} : {error}")
+        if feedback.isCanceled():
+            return {}
+
+        def progress(done, total, name):
+            feedback.setProgress(100.0 * done / total)
+            feedback.pushInfo(f"{name} : terminé")
+
+        results = intersect_communes_batch(geoms, self._jobs, progress, feedback=feedback)
+        if feedback.isCanceled():
+            return {}
+        export_batch_to_csv(results, {c["code"]: c["nom"] for c in communes}, output_folder)
+        return {"OUTPUT_FOLDER": output_folder, "COMMUNE_COUNT": len(communes)}
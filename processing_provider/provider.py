@@ -0,0 +1,22 @@
+import os
+
+from qgis.core import QgsProcessingProvider
+from qgis.PyQt.QtGui import QIcon  # noqa: UP035
+
+from .algorithms import BatchCsvAlgorithm, IntersectCommuneAlgorithm
+
+
+class SecateurProvider(QgsProcessingProvider):
+    def loadAlgorithms(self):
+        self.addAlgorithm(IntersectCommuneAlgorithm())
+        self.addAlgorithm(BatchCsvAlgorithm())
+
+    def id(self):
+        return "secateur"
+
+    def name(self):
+        return "Ecosphères Secateur"
+
+    def icon(self):
+        icon_path = os.path.join(os.path.dirname(__file__), os.pardir, "resources", "icon.png")
+        return QIcon(icon_path) if os.path.exists(icon_path) else QgsProcessingProvider.icon(self)
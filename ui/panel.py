@@ -1,5 +1,10 @@
+import time
+
+from qgis.core import Qgis, QgsApplication, QgsMessageLog, QgsProject, QgsTask
+from qgis.gui import QgsCollapsibleGroupBox
 from qgis.PyQt.QtCore import QStringListModel, Qt, QTimer  # noqa: UP035
 from qgis.PyQt.QtWidgets import (  # noqa: UP035
+    QCheckBox,
     QCompleter,
     QDockWidget,
     QFileDialog,
@@ -8,13 +13,45 @@ from qgis.PyQt.QtWidgets import (  # noqa: UP035
     QLineEdit,
     QProgressBar,
     QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
     QVBoxLayout,
     QWidget,
 )
 
-from ..core.commune_api import fetch_commune_geometry, search_communes
+from ..core.commune_api import get_index, preload_communes, search_communes
+from ..core.coverage import get_coverage_index
 from ..core.export import export_results_to_csv, export_results_to_pdf
-from ..core.intersector import add_results_to_project, find_wfs_layers, intersect_commune
+from ..core.intersector import (
+    FILTER_BBOX,
+    FILTER_SERVER,
+    add_results_to_project,
+    build_result_layer,
+    find_wfs_layers,
+)
+from ..core.layer_registry import get_layer_registry
+from ..core.profiling import profile_row, write_profile
+from ..core.result_cache import ResultCache
+from ..core.result_store import ResultStore
+from ..core.tasks import BatchTask, RunTask
+from ..core.tile_cache import get_tile_cache
+from ..core.warmup import WarmupTask
+
+# Profile table columns: (profile_row key, header)
+PROFILE_COLUMNS = [
+    ("layer", "Couche"),
+    ("mode", "Mode"),
+    ("http_seconds", "HTTP (s)"),
+    ("bytes_received", "Reçu (Kio)"),
+    ("features_fetched", "Reçues"),
+    ("features_kept", "Gardées"),
+    ("fetch_seconds", "Lecture (s)"),
+    ("test_seconds", "Tests (s)"),
+    ("build_seconds", "Couche (s)"),
+    ("pages", "Pages"),
+    ("retries", "Relances"),
+    ("fetched_by", "Lue avec"),
+]
 
 
 class SecateurPanel(QDockWidget):
@@ -28,12 +65,21 @@ class SecateurPanel(QDockWidget):
         self._result_layers = []
         self._commune_name = None
         self._commune_geom = None
+        self._task = None
+        self._batch_task = None
+        self._preload_task = None
+        self._result_cache = None
+        # GeoPackages of the runs made with "on disk" results, deleted once unused
+        self._result_stores = []
+        self._partial_results = []
+        self._profile = []
         self._debounce_timer = QTimer(self)
         self._debounce_timer.setSingleShot(True)
         self._debounce_timer.setInterval(300)
         self._debounce_timer.timeout.connect(self._do_search)
 
         self._build_ui()
+        self._start_warmup()
 
     def _build_ui(self):
         container = QWidget()
@@ -49,14 +95,63 @@ class SecateurPanel(QDockWidget):
 
         self._completer_model = QStringListModel()
         self._completer = QCompleter(self._completer_model, self)
-        self._completer.setCaseSensitivity(Qt.CaseInsensitive)
-        self._completer.setFilterMode(Qt.MatchContains)
+        # Results are already matched (accent-insensitively) by the search: show them as is
+        self._completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
         self._completer.activated[str].connect(self._on_commune_selected)
         self.search_input.setCompleter(self._completer)
 
         search_row.addWidget(self.search_input)
+
+        self.preload_button = QPushButton("Hors ligne")
+        self.preload_button.setToolTip("Télécharger la liste complète des communes pour une recherche hors ligne")
+        self.preload_button.clicked.connect(self._on_preload)
+        search_row.addWidget(self.preload_button)
         layout.addLayout(search_row)
 
+        self.server_filter_check = QCheckBox("Filtre spatial côté serveur (WFS)")
+        self.server_filter_check.setToolTip(
+            "Envoie le contour simplifié de la commune au serveur WFS (filtre OGC Intersects) "
+            "au lieu de télécharger toute l'emprise."
+        )
+        layout.addWidget(self.server_filter_check)
+
+        self.clip_check = QCheckBox("Découper à la commune (surfaces, longueurs)")
+        self.clip_check.setToolTip(
+            "Ne garde que la partie des entités située dans la commune et ajoute sa surface ou sa "
+            "longueur et la part de l'entité qu'elle représente."
+        )
+        layout.addWidget(self.clip_check)
+
+        cache_row = QHBoxLayout()
+        self.use_cache_check = QCheckBox("Réutiliser les résultats en cache")
+        self.use_cache_check.setChecked(True)
+        self.use_cache_check.setToolTip(
+            "Ne réinterroge que les couches modifiées depuis la dernière requête sur cette commune."
+        )
+        cache_row.addWidget(self.use_cache_check)
+        self.clear_cache_button = QPushButton("Vider le cache")
+        self.clear_cache_button.clicked.connect(self._on_clear_cache)
+        cache_row.addWidget(self.clear_cache_button)
+        layout.addLayout(cache_row)
+
+        self.on_disk_check = QCheckBox("Résultats sur disque (GeoPackage)")
+        self.on_disk_check.setToolTip(
+            "Écrit les entités trouvées dans un GeoPackage temporaire au lieu de les copier en mémoire : "
+            "recommandé pour les couches volumineuses."
+        )
+        layout.addWidget(self.on_disk_check)
+
+        self.offline_tiles_check = QCheckBox("Fond de carte hors ligne")
+        self.offline_tiles_check.setToolTip("Le rapport PDF n'utilise que les tuiles déjà en cache, sans accès réseau.")
+        layout.addWidget(self.offline_tiles_check)
+
+        self.vector_pdf_check = QCheckBox("Rapport PDF vectoriel")
+        self.vector_pdf_check.setToolTip(
+            "Dessine les résultats en vecteurs dans le PDF au lieu d'images : tracés nets à tout zoom, "
+            "mais fichier plus lourd et plus long à produire."
+        )
+        layout.addWidget(self.vector_pdf_check)
+
         # Buttons
         btn_row = QHBoxLayout()
         self.run_button = QPushButton("Interroger")
@@ -64,6 +159,11 @@ class SecateurPanel(QDockWidget):
         self.run_button.clicked.connect(self._on_run)
         btn_row.addWidget(self.run_button)
 
+        self.cancel_button = QPushButton("Annuler")
+        self.cancel_button.setVisible(False)
+        self.cancel_button.clicked.connect(self._on_cancel)
+        btn_row.addWidget(self.cancel_button)
+
         self.export_csv_button = QPushButton("Exporter CSV")
         self.export_csv_button.setEnabled(False)
         self.export_csv_button.clicked.connect(self._on_export_csv)
@@ -76,6 +176,18 @@ class SecateurPanel(QDockWidget):
 
         layout.addLayout(btn_row)
 
+        # Batch
+        layout.addWidget(QLabel("Lot (codes INSEE, EPCI ou département) :"))
+        batch_row = QHBoxLayout()
+        self.batch_input = QLineEdit()
+        self.batch_input.setPlaceholderText("21231, 21054… ou 242100410 ou 21")
+        batch_row.addWidget(self.batch_input)
+        self.batch_button = QPushButton("Lot → CSV")
+        self.batch_button.setToolTip("Interroge toutes les communes du lot et écrit un dossier CSV par commune")
+        self.batch_button.clicked.connect(self._on_batch)
+        batch_row.addWidget(self.batch_button)
+        layout.addLayout(batch_row)
+
         # Progress
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -86,16 +198,37 @@ class SecateurPanel(QDockWidget):
         self.status_label.setWordWrap(True)
         layout.addWidget(self.status_label)
 
+        # Per-layer profile of the last run
+        self.profile_group = QgsCollapsibleGroupBox("Performances de la dernière requête")
+        self.profile_group.setCollapsed(True)
+        profile_layout = QVBoxLayout(self.profile_group)
+        self.profile_table = QTableWidget(0, len(PROFILE_COLUMNS))
+        self.profile_table.setHorizontalHeaderLabels([label for _key, label in PROFILE_COLUMNS])
+        self.profile_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.profile_table.setSortingEnabled(True)
+        profile_layout.addWidget(self.profile_table)
+        self.export_profile_button = QPushButton("Exporter (JSON/CSV)")
+        self.export_profile_button.setEnabled(False)
+        self.export_profile_button.clicked.connect(self._on_export_profile)
+        profile_layout.addWidget(self.export_profile_button)
+        layout.addWidget(self.profile_group)
+
         layout.addStretch()
         self.setWidget(container)
 
     def _on_text_changed(self, text):
         self._selected_code = None
         self.run_button.setEnabled(False)
-        if len(text) >= 2:
-            self._debounce_timer.start()
-        else:
+        if text in self._completer_model.stringList():
+            # Text set by the completer itself: _on_commune_selected follows
+            return
+        if len(text) < 2:
             self._completer_model.setStringList([])
+        elif get_index() is not None:
+            # Offline index answers in microseconds: no need to debounce
+            self._do_search()
+        else:
+            self._debounce_timer.start()
 
     def _do_search(self):
         if self._selected_code:
@@ -103,11 +236,80 @@ class SecateurPanel(QDockWidget):
         text = self.search_input.text().strip()
         if len(text) < 2:
             return
-        self._communes = search_communes(text)
+        self._communes = search_communes(text, limit=None)
         display = [f"{c['nom']} ({c['code']})" for c in self._communes]
         self._completer_model.setStringList(display)
         self._completer.complete()
 
+    def _start_warmup(self):
+        """Warm up in the background: commune index, WFS capabilities, report template (see WarmupTask)."""
+        start = time.perf_counter()
+        registry = get_layer_registry()
+        urls = sorted({info.url for info in map(registry.info, registry.wfs_layers()) if info is not None})
+        task = WarmupTask(urls)
+        task.timings["layers"] = time.perf_counter() - start
+        # Also guards the manual commune list download, which the index load may do
+        self._preload_task = task
+        task.taskCompleted.connect(lambda: self._on_warmup_done(task))
+        task.taskTerminated.connect(lambda: self._on_warmup_done(task))
+        QgsApplication.taskManager().addTask(task)
+
+    def _on_warmup_done(self, task: WarmupTask):
+        if self._preload_task is task:
+            self._preload_task = None
+        timings = ", ".join(f"{name} {seconds:.2f} s" for name, seconds in task.timings.items())
+        QgsMessageLog.logMessage(
+            f"Préparation{' (interrompue)' if task.isCanceled() else ''} : {timings}", "Secateur", Qgis.Info
+        )
+
+    def cancel_warmup(self):
+        """Stop the warm-up, e.g. when the plugin unloads."""
+        if isinstance(self._preload_task, WarmupTask):
+            self._preload_task.cancel()
+
+    def _release_result_stores(self, remove_layers: bool = False):
+        """Delete the GeoPackages of finished runs that no project layer reads any more.
+
+        With remove_layers (plugin unload), their layers are removed from the project first.
+        """
+        project = QgsProject.instance()
+        running = self._task.result_store if self._task is not None else None
+        for store in list(self._result_stores):
+            if store is running:
+                continue
+            layers = [layer for layer in project.mapLayers().values() if store.owns(layer)]
+            if layers and not remove_layers:
+                continue
+            project.removeMapLayers([layer.id() for layer in layers])
+            store.remove()
+            self._result_stores.remove(store)
+
+    def remove_result_files(self):
+        """Remove the on-disk results and their layers, when the plugin unloads."""
+        self._release_result_stores(remove_layers=True)
+
+    def _on_preload(self):
+        if self._preload_task is not None:
+            return
+        self.preload_button.setEnabled(False)
+        self.status_label.setText("Téléchargement de la liste des communes…")
+
+        def on_finished(exception, count=None):
+            self._preload_task = None
+            self.preload_button.setEnabled(True)
+            if exception is not None:
+                self.status_label.setText(f"Erreur de téléchargement des communes : {exception}")
+            else:
+                self.status_label.setText(f"{count} communes disponibles hors ligne.")
+
+        task = QgsTask.fromFunction(
+            "Secateur : liste des communes",
+            lambda _task: preload_communes(),
+            on_finished=on_finished,
+        )
+        self._preload_task = task
+        QgsApplication.taskManager().addTask(task)
+
     def _on_commune_selected(self, text):
         for c in self._communes:
             display = f"{c['nom']} ({c['code']})"
@@ -119,50 +321,232 @@ class SecateurPanel(QDockWidget):
                 return
 
     def _on_run(self):
-        if not self._selected_code:
+        if not self._selected_code or self._task is not None or self._batch_task is not None:
             return
 
-        self.run_button.setEnabled(False)
-        self.status_label.setText("Récupération de la géométrie de la commune…")
-        self._force_repaint()
-
-        geom = fetch_commune_geometry(self._selected_code)
-        if geom is None or geom.isEmpty():
-            self.status_label.setText("Erreur : impossible de récupérer la géométrie.")
-            self.run_button.setEnabled(True)
+        layers = find_wfs_layers()
+        if not layers:
+            self.status_label.setText("Aucune couche WFS trouvée dans le projet.")
             return
 
-        self._commune_geom = geom
+        self.run_button.setEnabled(False)
+        self.cancel_button.setVisible(True)
+        self._partial_results = []
+        self._start_progress(len(layers))
 
+        filter_mode = FILTER_SERVER if self.server_filter_check.isChecked() else FILTER_BBOX
+        result_cache = self._get_result_cache() if self.use_cache_check.isChecked() else None
+        if result_cache is not None:
+            # New run: ask the services again whether their data changed
+            result_cache.refresh()
+        result_store = ResultStore() if self.on_disk_check.isChecked() else None
+        if result_store is not None:
+            self._result_stores.append(result_store)
+        task = RunTask(
+            self._selected_code,
+            layers,
+            filter_mode=filter_mode,
+            result_cache=result_cache,
+            result_store=result_store,
+            clip=self.clip_check.isChecked(),
+        )
+        task.stageChanged.connect(self.status_label.setText)
+        task.geometryReady.connect(self._on_geometry_ready)
+        task.layerFinished.connect(self._on_layer_finished)
+        task.taskCompleted.connect(self._on_run_finished)
+        task.taskTerminated.connect(self._on_run_finished)
+        # Keep a Python reference: the task manager doesn't own the wrapper
+        self._task = task
+        QgsApplication.taskManager().addTask(task)
+
+    def _get_result_cache(self):
+        if self._result_cache is None:
+            self._result_cache = ResultCache()
+        return self._result_cache
+
+    def _on_clear_cache(self):
+        if self._task is not None:
+            return
+        self._get_result_cache().clear()
+        # Learned empty areas go with the results they were learned from
+        get_coverage_index().clear()
+        self.status_label.setText("Cache des résultats vidé.")
+
+    def _on_cancel(self):
+        for task in (self._task, self._batch_task):
+            if task is not None:
+                self.cancel_button.setEnabled(False)
+                self.status_label.setText("Annulation…")
+                task.cancel()
+
+    def _on_batch(self):
+        spec = self.batch_input.text().strip()
+        if not spec or self._task is not None or self._batch_task is not None:
+            return
         layers = find_wfs_layers()
         if not layers:
             self.status_label.setText("Aucune couche WFS trouvée dans le projet.")
-            self.run_button.setEnabled(True)
+            return
+        folder = QFileDialog.getExistingDirectory(self, "Dossier d'export du lot")
+        if not folder:
             return
 
-        self._start_progress(len(layers))
-        self._update_progress(0, len(layers), f"Intersection avec {len(layers)} couche(s) WFS…")
+        self.batch_button.setEnabled(False)
+        self.run_button.setEnabled(False)
+        self.cancel_button.setVisible(True)
+        self._start_progress(100)
+
+        task = BatchTask(spec, layers, folder)
+        task.stageChanged.connect(self.status_label.setText)
+        task.progressChanged.connect(lambda value: self.progress_bar.setValue(int(value)))
+        task.taskCompleted.connect(self._on_batch_finished)
+        task.taskTerminated.connect(self._on_batch_finished)
+        self._batch_task = task
+        QgsApplication.taskManager().addTask(task)
+
+    def _on_batch_finished(self):
+        task = self._batch_task
+        self._batch_task = None
+        self.cancel_button.setVisible(False)
+        self.cancel_button.setEnabled(True)
+        self.batch_button.setEnabled(True)
+        self.run_button.setEnabled(bool(self._selected_code))
+        if task is None:
+            return
+        if task.error:
+            self._finish_progress(f"Erreur lot : {task.error}")
+        elif task.isCanceled():
+            self._finish_progress("Lot annulé.")
+        else:
+            self._finish_progress(
+                f"Lot terminé — {len(task.communes)} commune(s), {len(task.written)} fichier(s) dans {task.output_dir}"
+            )
+
+    def _on_geometry_ready(self, geom):
+        self._commune_geom = geom
 
-        def progress(current, total, name):
-            if current < total:
-                self._update_progress(current, total, f"Intersection {current + 1}/{total} : {name}")
+    def _on_layer_finished(self, job, features):
+        store = self._task.result_store if self._task is not None else None
+        if store is not None:
+            store.write(job, features)
+            layer = store.layer(job)
+            if layer is not None:
+                self._partial_results.append((job.index, layer))
+        elif features:
+            self._partial_results.append((job.index, build_result_layer(job, features)))
+        done = self.progress_bar.value() + 1
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"Intersection {done}/{self.progress_bar.maximum()} terminée(s) : {job.name}")
+
+    def _on_run_finished(self):
+        task = self._task
+        self._task = None
+        self.cancel_button.setVisible(False)
+        self.cancel_button.setEnabled(True)
+        self.run_button.setEnabled(bool(self._selected_code))
+        if task is None:
+            return
+
+        if task.error:
+            self._finish_progress(f"Erreur : {task.error}")
+            return
+
+        self._log_stats(task.jobs)
+        self._show_profile(task.jobs)
+        QgsMessageLog.logMessage(
+            "Interroger : " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in task.timings.items()),
+            "Secateur",
+            Qgis.Info,
+        )
+        if task.peak_memory is not None:
+            mode = "GeoPackage" if task.result_store is not None else "mémoire"
+            QgsMessageLog.logMessage(
+                f"Pic mémoire (résultats en {mode}) : +{task.peak_memory / 1024 / 1024:.1f} Mio",
+                "Secateur",
+                Qgis.Info,
+            )
 
-        results = intersect_commune(geom, layers, progress_callback=progress)
+        partial = sorted(self._partial_results, key=lambda r: r[0])
+        results = [layer for _, layer in partial]
+        fingerprints = [task.fingerprints[index] for index, _ in partial]
+        self._partial_results = []
+        canceled = task.isCanceled()
 
         if results:
-            add_results_to_project(results)
-            self._result_layers = results
+            start = time.perf_counter()
+            shown = add_results_to_project(results, fingerprints, self.iface.mapCanvas())
+            new_ids = {layer.id() for layer in results}
+            replaced = sum(1 for layer in shown if layer.id() in new_ids)
+            QgsMessageLog.logMessage(
+                f"Couches résultat : {replaced} remplacée(s), {len(shown) - replaced} inchangée(s) "
+                f"({time.perf_counter() - start:.2f} s)",
+                "Secateur",
+                Qgis.Info,
+            )
+            self._result_layers = shown
             self.export_csv_button.setEnabled(True)
             self.export_pdf_button.setEnabled(True)
             total_feats = sum(r.featureCount() for r in results)
-            self._finish_progress(f"Terminé — {total_feats} entité(s) trouvée(s) dans {len(results)} couche(s).")
+            prefix = "Annulé (résultats partiels)" if canceled else "Terminé"
+            self._finish_progress(f"{prefix} — {total_feats} entité(s) trouvée(s) dans {len(results)} couche(s).")
         else:
             self._result_layers = []
             self.export_csv_button.setEnabled(False)
             self.export_pdf_button.setEnabled(False)
-            self._finish_progress("Aucune intersection trouvée.")
-
-        self.run_button.setEnabled(True)
+            self._finish_progress("Annulé." if canceled else "Aucune intersection trouvée.")
+        self._release_result_stores()
+
+    def _show_profile(self, jobs):
+        self._profile = [profile_row(job.name, job.stats) for job in jobs]
+        table = self.profile_table
+        table.setSortingEnabled(False)
+        table.setRowCount(len(self._profile))
+        for row, values in enumerate(self._profile):
+            for column, (key, _label) in enumerate(PROFILE_COLUMNS):
+                value = values[key]
+                if key == "bytes_received":
+                    value = round(value / 1024, 1)
+                item = QTableWidgetItem()
+                # Numbers as data, so that columns sort numerically
+                item.setData(Qt.DisplayRole, value)
+                table.setItem(row, column, item)
+        table.setSortingEnabled(True)
+        table.resizeColumnsToContents()
+        self.export_profile_button.setEnabled(bool(self._profile))
+
+    def _on_export_profile(self):
+        if not self._profile:
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Exporter les performances", "", "JSON (*.json);;CSV (*.csv)", options=QFileDialog.Options()
+        )
+        if not path:
+            return
+        try:
+            write_profile(self._profile, path)
+            self.status_label.setText(f"Performances exportées : {path}")
+        except OSError as e:
+            self.status_label.setText(f"Erreur export des performances : {e}")
+
+    def _log_stats(self, jobs):
+        for job in jobs:
+            stats = job.stats
+            QgsMessageLog.logMessage(
+                f"{job.name} : mode {stats.mode}, {stats.features_fetched} entité(s) reçue(s), "
+                f"{stats.features_kept} conservée(s), {stats.bytes_received / 1024:.1f} Kio, "
+                f"HTTP {stats.http_seconds:.2f} s, lecture {stats.fetch_seconds:.2f} s, "
+                f"tests {stats.test_seconds:.2f} s, couche {stats.build_seconds:.2f} s, "
+                f"{stats.pages} page(s), {stats.retries} relance(s)"
+                + (f", requête partagée avec {stats.fetched_by}" if stats.fetched_by else ""),
+                "Secateur",
+                Qgis.Info,
+            )
+            if stats.error:
+                QgsMessageLog.logMessage(
+                    f"{job.name} : résultats partiels, la prochaine requête reprendra au point d'arrêt ({stats.error})",
+                    "Secateur",
+                    Qgis.Warning,
+                )
 
     def _on_export_csv(self):
         if not self._result_layers:
@@ -201,12 +585,24 @@ class SecateurPanel(QDockWidget):
             def progress(current, total, name):
                 self._update_progress(current, total, f"Export PDF {current + 1}/{total} : {name}")
 
-            export_results_to_pdf(
+            tile_cache = get_tile_cache()
+            tile_cache.offline = self.offline_tiles_check.isChecked()
+            stats = export_results_to_pdf(
                 self._result_layers,
                 self._commune_name or "",
                 self._commune_geom,
                 path,
                 progress_callback=progress,
+                raster_layers=not self.vector_pdf_check.isChecked(),
+                tile_cache=tile_cache,
+            )
+            QgsMessageLog.logMessage(
+                f"Rapport PDF : {stats.file_bytes / 1024 / 1024:.1f} Mio, "
+                f"{stats.vertices} sommet(s) simplifié(s) en {stats.simplified_vertices} "
+                f"({stats.simplify_seconds:.2f} s), rendu {stats.render_seconds:.2f} s, "
+                f"export {stats.export_seconds:.2f} s",
+                "Secateur",
+                Qgis.Info,
             )
             self._finish_progress(f"Export PDF : {path}")
         except Exception as e: